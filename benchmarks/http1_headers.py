@@ -0,0 +1,162 @@
+"""Microbenchmark for HTTP/1 message head parsing.
+
+Compares the single-read fast path used by read_request_head() and
+read_response_head() with the line-by-line parser it falls back to,
+over a corpus of heads captured from real browser sessions.
+"""
+import argparse
+import socket
+import timeit
+
+from seleniumwire.thirdparty.mitmproxy.net import tcp
+from seleniumwire.thirdparty.mitmproxy.net.http.http1 import read
+
+REQUEST_HEADS = [
+    b'GET https://www.google.com/ HTTP/1.1\r\n'
+    b'Host: www.google.com\r\n'
+    b'Connection: keep-alive\r\n'
+    b'sec-ch-ua: "Chromium";v="106", "Google Chrome";v="106", "Not;A=Brand";v="99"\r\n'
+    b'sec-ch-ua-mobile: ?0\r\n'
+    b'sec-ch-ua-platform: "Linux"\r\n'
+    b'Upgrade-Insecure-Requests: 1\r\n'
+    b'User-Agent: Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) '
+    b'Chrome/106.0.0.0 Safari/537.36\r\n'
+    b'Accept: text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,'
+    b'image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.9\r\n'
+    b'Sec-Fetch-Site: none\r\n'
+    b'Sec-Fetch-Mode: navigate\r\n'
+    b'Sec-Fetch-User: ?1\r\n'
+    b'Sec-Fetch-Dest: document\r\n'
+    b'Accept-Encoding: gzip, deflate, br\r\n'
+    b'Accept-Language: en-GB,en-US;q=0.9,en;q=0.8\r\n'
+    b'Cookie: CONSENT=PENDING+987; AEC=AakniGP5Xb1Dxk0dQ8FQnBTvqmm7d2LbWQ; '
+    b'NID=511=ZbvRPA5m8tq0Ol2u2lMx3w4Vb8yyH2qyqXbO6n1-Rk6JpEmlWqFQ\r\n'
+    b'\r\n',
+    b'GET /images/branding/googlelogo/2x/googlelogo_color_272x92dp.png HTTP/1.1\r\n'
+    b'Host: www.google.com\r\n'
+    b'Connection: keep-alive\r\n'
+    b'User-Agent: Mozilla/5.0 (X11; Linux x86_64; rv:105.0) Gecko/20100101 Firefox/105.0\r\n'
+    b'Accept: image/avif,image/webp,*/*\r\n'
+    b'Accept-Language: en-GB,en;q=0.5\r\n'
+    b'Accept-Encoding: gzip, deflate, br\r\n'
+    b'Referer: https://www.google.com/\r\n'
+    b'Sec-Fetch-Dest: image\r\n'
+    b'Sec-Fetch-Mode: no-cors\r\n'
+    b'Sec-Fetch-Site: same-origin\r\n'
+    b'\r\n',
+    b'POST /gen_204?s=webaft&atyp=csi&ei=kgRJW7DBONKTlwTK77wQ HTTP/1.1\r\n'
+    b'Host: www.google.com\r\n'
+    b'Connection: keep-alive\r\n'
+    b'Content-Length: 0\r\n'
+    b'Origin: https://www.google.com\r\n'
+    b'User-Agent: Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) '
+    b'Chrome/106.0.0.0 Safari/537.36 Edg/106.0.1370.42\r\n'
+    b'Content-Type: text/plain;charset=UTF-8\r\n'
+    b'Accept: */*\r\n'
+    b'Referer: https://www.google.com/\r\n'
+    b'Accept-Encoding: gzip, deflate, br\r\n'
+    b'Accept-Language: en-US,en;q=0.9\r\n'
+    b'\r\n',
+    b'CONNECT fonts.gstatic.com:443 HTTP/1.1\r\n'
+    b'Host: fonts.gstatic.com:443\r\n'
+    b'Proxy-Connection: keep-alive\r\n'
+    b'User-Agent: Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) '
+    b'Chrome/106.0.0.0 Safari/537.36\r\n'
+    b'\r\n',
+]
+
+RESPONSE_HEADS = [
+    b'HTTP/1.1 200 OK\r\n'
+    b'Date: Sat, 15 Oct 2022 10:14:22 GMT\r\n'
+    b'Expires: -1\r\n'
+    b'Cache-Control: private, max-age=0\r\n'
+    b'Content-Type: text/html; charset=UTF-8\r\n'
+    b'Strict-Transport-Security: max-age=31536000\r\n'
+    b'Content-Security-Policy-Report-Only: object-src \'none\';base-uri \'self\';'
+    b'script-src \'nonce-Yh2Q1-Ho-7lHpTCq4mGqXg\' \'strict-dynamic\' \'report-sample\' '
+    b'\'unsafe-eval\' \'unsafe-inline\' https: http:;report-uri https://csp.withgoogle.com/csp/gws/other-hp\r\n'
+    b'Cross-Origin-Opener-Policy: same-origin-allow-popups; report-to="gws"\r\n'
+    b'Report-To: {"group":"gws","max_age":2592000,'
+    b'"endpoints":[{"url":"https://csp.withgoogle.com/csp/report-to/gws/other"}]}\r\n'
+    b'P3P: CP="This is not a P3P policy! See g.co/p3phelp for more info."\r\n'
+    b'Content-Encoding: br\r\n'
+    b'Server: gws\r\n'
+    b'X-XSS-Protection: 0\r\n'
+    b'X-Frame-Options: SAMEORIGIN\r\n'
+    b'Set-Cookie: 1P_JAR=2022-10-15-10; expires=Mon, 14-Nov-2022 10:14:22 GMT; path=/; domain=.google.com; Secure\r\n'
+    b'Set-Cookie: AEC=AakniGP5Xb1Dxk0dQ8FQnBTvqmm7d2LbWQ; expires=Thu, 13-Apr-2023 10:14:22 GMT; path=/; '
+    b'domain=.google.com; Secure; HttpOnly; SameSite=lax\r\n'
+    b'Alt-Svc: h3=":443"; ma=2592000,h3-29=":443"; ma=2592000,h3-Q050=":443"; ma=2592000\r\n'
+    b'Transfer-Encoding: chunked\r\n'
+    b'\r\n',
+    b'HTTP/1.1 200 OK\r\n'
+    b'Accept-Ranges: bytes\r\n'
+    b'Content-Type: image/png\r\n'
+    b'Cross-Origin-Resource-Policy: cross-origin\r\n'
+    b'Content-Length: 13504\r\n'
+    b'Date: Fri, 14 Oct 2022 22:31:05 GMT\r\n'
+    b'Expires: Sat, 14 Oct 2023 22:31:05 GMT\r\n'
+    b'Last-Modified: Tue, 22 Oct 2019 18:30:00 GMT\r\n'
+    b'X-Content-Type-Options: nosniff\r\n'
+    b'Server: sffe\r\n'
+    b'X-XSS-Protection: 0\r\n'
+    b'Cache-Control: public, max-age=31536000\r\n'
+    b'Age: 42197\r\n'
+    b'\r\n',
+    b'HTTP/1.1 204 No Content\r\n'
+    b'Content-Type: text/html; charset=UTF-8\r\n'
+    b'Date: Sat, 15 Oct 2022 10:14:23 GMT\r\n'
+    b'Server: gws\r\n'
+    b'Content-Length: 0\r\n'
+    b'X-XSS-Protection: 0\r\n'
+    b'X-Frame-Options: SAMEORIGIN\r\n'
+    b'\r\n',
+    b'HTTP/1.1 304 Not Modified\r\n'
+    b'Date: Sat, 15 Oct 2022 10:14:23 GMT\r\n'
+    b'Connection: keep-alive\r\n'
+    b'ETag: "5d2f2f8f-34c0"\r\n'
+    b'Cache-Control: max-age=600\r\n'
+    b'Vary: Accept-Encoding\r\n'
+    b'\r\n',
+]
+
+
+class LineByLineReader(tcp.Reader):
+    """A reader that can't be peeked into, which forces the line-by-line parser."""
+
+    def peek(self, length):
+        raise NotImplementedError()
+
+
+def parse_all(reader_cls):
+    """Send each head in the corpus over a socket pair and parse it from the
+    receiving end, as the proxy does with a client or server connection.
+    """
+    a, b = socket.socketpair()
+    try:
+        rfile = reader_cls(socket.SocketIO(b, 'rb'))
+        for head in REQUEST_HEADS:
+            a.sendall(head)
+            read.read_request_head(rfile)
+        for head in RESPONSE_HEADS:
+            a.sendall(head)
+            read.read_response_head(rfile)
+    finally:
+        a.close()
+        b.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-n', '--number', type=int, default=2000, help='Iterations over the corpus')
+    args = parser.parse_args()
+
+    heads = len(REQUEST_HEADS) + len(RESPONSE_HEADS)
+
+    for name, reader_cls in (('single read', tcp.Reader), ('line by line', LineByLineReader)):
+        elapsed = timeit.timeit(lambda: parse_all(reader_cls), number=args.number)
+        print(f'{name:>12}: {elapsed / (args.number * heads) * 1e6:8.2f} us/head')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Import time of Selenium Wire in a fresh interpreter.
+
+Each run starts a new Python process, as a test shard does, and times the
+import of the given module. Also lists the slowest imports (from
+python -X importtime) and which of the heavy optional dependencies were
+loaded, since those should only be imported once they're needed.
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+
+# Dependencies that are only needed for particular protocols or encodings
+DEFERRED = [
+    'h2',
+    'hyperframe',
+    'hpack',
+    'wsproto',
+    'kaitaistruct',
+    'pyasn1',
+    'pyparsing',
+    'pkg_resources',
+    'brotli',
+    'zstandard',
+]
+
+TIMER = '''
+import sys, time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+print(','.join(m for m in {deferred!r} if m in sys.modules))
+'''
+
+
+def run_once(module):
+    out = subprocess.run(
+        [sys.executable, '-c', TIMER.format(module=module, deferred=DEFERRED)],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout.splitlines()
+    return float(out[0]), [m for m in out[1].split(',') if m]
+
+
+def slowest_imports(module, top):
+    """The imports that took longest, including the time taken by what they import."""
+    err = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stderr
+
+    timings = []
+    for line in err.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split(':', 1)[1].split('|')
+        timings.append((int(cumulative), name.rstrip()))
+
+    return sorted(timings, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-m', '--module', default='seleniumwire.webdriver', help='Module to import')
+    parser.add_argument('-n', '--number', type=int, default=10, help='Interpreters to start')
+    parser.add_argument('--top', type=int, default=15, help='Slowest imports to list')
+    args = parser.parse_args()
+
+    run_once(args.module)  # warm the filesystem and bytecode caches
+    times = []
+    for _ in range(args.number):
+        elapsed, loaded = run_once(args.module)
+        times.append(elapsed)
+
+    print(f'import {args.module}: min {min(times) * 1000:.1f} ms, median {statistics.median(times) * 1000:.1f} ms')
+    print(f'deferred dependencies loaded: {", ".join(loaded) or "none"}')
+    print()
+    for cumulative, name in slowest_imports(args.module, args.top):
+        print(f'{cumulative / 1000:8.1f} ms {name}')
+
+
+if __name__ == '__main__':
+    main()
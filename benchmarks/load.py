@@ -0,0 +1,230 @@
+"""Load generator for the proxy benchmarks.
+
+Clients that send requests through the proxy to the local origin server in
+benchmarks/origin.py. Each client holds one connection open and sends its
+requests one after another, so the number of clients is the concurrency.
+"""
+import asyncio
+import socket
+import ssl
+import statistics
+import time
+
+import h2.config
+import h2.connection
+import h2.events
+from wsproto import ConnectionType, WSConnection
+from wsproto.events import AcceptConnection, BytesMessage, Request
+
+READ_SIZE = 64 * 1024
+
+
+def client_ssl_context(alpn):
+    # The proxy presents certificates signed by its own CA, which aren't verified here
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    context.set_alpn_protocols([alpn])
+    return context
+
+
+async def open_connection(proxy, origin, tls, alpn='http/1.1'):
+    """Open a connection to the origin through the proxy.
+
+    TLS connections are tunnelled with CONNECT. Plain connections go straight
+    to the proxy, and requests sent on them use an absolute URL.
+    """
+    if not tls:
+        return await asyncio.open_connection(*proxy)
+
+    loop = asyncio.get_running_loop()
+    sock = socket.socket()
+    sock.setblocking(False)
+    await loop.sock_connect(sock, proxy)
+    await loop.sock_sendall(sock, 'CONNECT {0}:{1} HTTP/1.1\r\nHost: {0}:{1}\r\n\r\n'.format(*origin).encode())
+
+    head = b''
+    while b'\r\n\r\n' not in head:
+        data = await loop.sock_recv(sock, READ_SIZE)
+        if not data:
+            raise ConnectionError('Proxy closed the connection during CONNECT')
+        head += data
+    if not head.startswith(b'HTTP/1.1 200'):
+        raise ConnectionError('CONNECT failed: {}'.format(head.split(b'\r\n')[0]))
+
+    return await asyncio.open_connection(sock=sock, ssl=client_ssl_context(alpn), server_hostname=origin[0])
+
+
+async def read_http1_response(reader):
+    head = await reader.readuntil(b'\r\n\r\n')
+    headers = {}
+    for line in head.decode('latin-1').split('\r\n')[1:]:
+        if line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip()
+
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if not size:
+                break
+    else:
+        await reader.readexactly(int(headers.get('content-length', 0)))
+
+    return int(head[9:12])
+
+
+class Http1Client:
+    def __init__(self, proxy, origin, tls, path):
+        self.proxy = proxy
+        self.origin = origin
+        self.tls = tls
+        target = path if tls else 'http://{}:{}{}'.format(*origin, path)
+        self.request = 'GET {} HTTP/1.1\r\nHost: {}:{}\r\nUser-Agent: benchmark\r\n\r\n'.format(
+            target, *origin
+        ).encode()
+
+    async def connect(self):
+        self.reader, self.writer = await open_connection(self.proxy, self.origin, self.tls)
+
+    async def send(self):
+        self.writer.write(self.request)
+        status = await read_http1_response(self.reader)
+        if status != 200:
+            raise RuntimeError('Unexpected status {}'.format(status))
+
+    async def close(self):
+        self.writer.close()
+
+
+class Http2Client:
+    def __init__(self, proxy, origin, tls, path):
+        self.proxy = proxy
+        self.origin = origin
+        self.headers = [
+            (':method', 'GET'),
+            (':scheme', 'https'),
+            (':authority', '{}:{}'.format(*origin)),
+            (':path', path),
+            ('user-agent', 'benchmark'),
+        ]
+
+    async def connect(self):
+        self.reader, self.writer = await open_connection(self.proxy, self.origin, True, alpn='h2')
+        if self.writer.get_extra_info('ssl_object').selected_alpn_protocol() != 'h2':
+            raise RuntimeError('The proxy did not negotiate HTTP/2')
+        self.conn = h2.connection.H2Connection(h2.config.H2Configuration(client_side=True))
+        self.conn.initiate_connection()
+        self.writer.write(self.conn.data_to_send())
+
+    async def send(self):
+        stream_id = self.conn.get_next_available_stream_id()
+        self.conn.send_headers(stream_id, self.headers, end_stream=True)
+        self.writer.write(self.conn.data_to_send())
+
+        while True:
+            data = await self.reader.read(READ_SIZE)
+            if not data:
+                raise ConnectionError('Connection closed by the proxy')
+            ended = False
+            for event in self.conn.receive_data(data):
+                if isinstance(event, h2.events.DataReceived):
+                    self.conn.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+                elif isinstance(event, h2.events.StreamEnded) and event.stream_id == stream_id:
+                    ended = True
+                elif isinstance(event, h2.events.StreamReset) and event.stream_id == stream_id:
+                    raise RuntimeError('Stream reset by the proxy')
+            self.writer.write(self.conn.data_to_send())
+            if ended:
+                return
+
+    async def close(self):
+        self.conn.close_connection()
+        self.writer.write(self.conn.data_to_send())
+        self.writer.close()
+
+
+class WebSocketClient:
+    def __init__(self, proxy, origin, tls, path, message_size=64):
+        self.proxy = proxy
+        self.origin = origin
+        self.tls = tls
+        self.path = path
+        self.message = b'x' * message_size
+
+    async def connect(self):
+        self.reader, self.writer = await open_connection(self.proxy, self.origin, self.tls)
+        self.ws = WSConnection(ConnectionType.CLIENT)
+        self.writer.write(self.ws.send(Request(host='{}:{}'.format(*self.origin), target=self.path)))
+        await self._receive(AcceptConnection)
+
+    async def send(self):
+        self.writer.write(self.ws.send(BytesMessage(data=self.message)))
+        await self._receive(BytesMessage)
+
+    async def _receive(self, event_type):
+        while True:
+            for event in self.ws.events():
+                if isinstance(event, event_type):
+                    return event
+            data = await self.reader.read(READ_SIZE)
+            if not data:
+                raise ConnectionError('Connection closed by the proxy')
+            self.ws.receive_data(data)
+
+    async def close(self):
+        self.writer.close()
+
+
+class Result:
+    """The outcome of a run of the load generator.
+
+    Attributes:
+        count: The number of requests (or websocket round trips) made.
+        elapsed: The wall clock time taken in seconds.
+        latencies: The time taken by each request in seconds.
+    """
+
+    def __init__(self, count, elapsed, latencies):
+        self.count = count
+        self.elapsed = elapsed
+        self.latencies = sorted(latencies)
+
+    @property
+    def rate(self):
+        return self.count / self.elapsed if self.elapsed else 0.0
+
+    def percentile(self, p):
+        if not self.latencies:
+            return 0.0
+        return self.latencies[min(len(self.latencies) - 1, int(len(self.latencies) * p / 100))]
+
+    @property
+    def mean(self):
+        return statistics.mean(self.latencies) if self.latencies else 0.0
+
+
+async def run(clients, requests):
+    """Connect the clients, then have each send the given number of requests
+    concurrently.
+
+    Each client sends one request before timing starts, so that connection
+    setup and certificate generation aren't counted.
+    """
+    await asyncio.gather(*(client.connect() for client in clients))
+    await asyncio.gather(*(client.send() for client in clients))
+
+    latencies = []
+
+    async def worker(client):
+        for _ in range(requests):
+            start = time.perf_counter()
+            await client.send()
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(client) for client in clients))
+    elapsed = time.perf_counter() - start
+
+    return Result(len(latencies), elapsed, latencies)
@@ -0,0 +1,256 @@
+"""Local origin server for the proxy benchmarks.
+
+An asyncio server that speaks HTTP/1.1, HTTP/2 (over TLS, negotiated with
+ALPN) and websockets, so that benchmarks measure the proxy rather than a
+remote server or the network. It serves:
+
+    /bytes/<n>      A body of n bytes with a Content-Length
+    /chunked/<n>    A body of n bytes with chunked transfer encoding
+    /ws             A websocket that echoes messages back
+
+Run it on its own to try it out:
+
+    python -m benchmarks.origin
+"""
+import asyncio
+import os
+import ssl
+import threading
+
+import h2.config
+import h2.connection
+import h2.events
+from wsproto import ConnectionType, WSConnection
+from wsproto.events import AcceptConnection, BytesMessage, CloseConnection, Ping, Request, TextMessage
+
+CERT = os.path.join(os.path.dirname(__file__), '..', 'tests', 'server.crt')
+KEY = os.path.join(os.path.dirname(__file__), '..', 'tests', 'server.key')
+
+CHUNK_SIZE = 16 * 1024
+READ_SIZE = 64 * 1024
+
+_body_cache = {}
+
+
+def _body(size):
+    if size not in _body_cache:
+        _body_cache[size] = b'x' * size
+    return _body_cache[size]
+
+
+def _route(path):
+    """Return (kind, size) for a request path."""
+    parts = path.split('?')[0].strip('/').split('/')
+    if parts[0] in ('bytes', 'chunked') and len(parts) == 2 and parts[1].isdigit():
+        return parts[0], int(parts[1])
+    if parts[0] == 'ws':
+        return 'ws', 0
+    return None, 0
+
+
+async def _serve_http1(reader, writer):
+    while True:
+        try:
+            head = await reader.readuntil(b'\r\n\r\n')
+        except (asyncio.IncompleteReadError, ConnectionError):
+            return
+
+        request_line, *header_lines = head.decode('latin-1').split('\r\n')
+        method, path, _ = request_line.split(' ', 2)
+        headers = {}
+        for line in header_lines:
+            if line:
+                name, value = line.split(':', 1)
+                headers[name.strip().lower()] = value.strip()
+
+        length = int(headers.get('content-length', 0))
+        if length:
+            await reader.readexactly(length)
+
+        kind, size = _route(path)
+
+        if kind == 'ws' and headers.get('upgrade', '').lower() == 'websocket':
+            await _serve_websocket(head, reader, writer)
+            return
+
+        if kind == 'bytes':
+            writer.write(
+                b'HTTP/1.1 200 OK\r\nContent-Type: application/octet-stream\r\nContent-Length: %d\r\n\r\n' % size
+            )
+            writer.write(_body(size))
+        elif kind == 'chunked':
+            writer.write(
+                b'HTTP/1.1 200 OK\r\nContent-Type: application/octet-stream\r\nTransfer-Encoding: chunked\r\n\r\n'
+            )
+            remaining = size
+            while remaining:
+                n = min(remaining, CHUNK_SIZE)
+                writer.write(b'%x\r\n' % n + _body(n) + b'\r\n')
+                remaining -= n
+                await writer.drain()
+            writer.write(b'0\r\n\r\n')
+        else:
+            writer.write(b'HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\n\r\n')
+
+        await writer.drain()
+
+        if headers.get('connection', '').lower() == 'close':
+            return
+
+
+async def _serve_websocket(head, reader, writer):
+    ws = WSConnection(ConnectionType.SERVER)
+    ws.receive_data(head)
+
+    while True:
+        out = []
+        for event in ws.events():
+            if isinstance(event, Request):
+                out.append(ws.send(AcceptConnection()))
+            elif isinstance(event, (TextMessage, BytesMessage)):
+                out.append(ws.send(type(event)(data=event.data, message_finished=event.message_finished)))
+            elif isinstance(event, Ping):
+                out.append(ws.send(event.response()))
+            elif isinstance(event, CloseConnection):
+                writer.write(ws.send(event.response()))
+                await writer.drain()
+                return
+        if out:
+            writer.write(b''.join(out))
+            await writer.drain()
+
+        data = await reader.read(READ_SIZE)
+        if not data:
+            return
+        ws.receive_data(data)
+
+
+async def _serve_h2(reader, writer):
+    conn = h2.connection.H2Connection(h2.config.H2Configuration(client_side=False, header_encoding='utf-8'))
+    conn.initiate_connection()
+    writer.write(conn.data_to_send())
+
+    # stream id -> the part of the response body still to be sent
+    pending = {}
+
+    while True:
+        await writer.drain()
+
+        data = await reader.read(READ_SIZE)
+        if not data:
+            return
+
+        for event in conn.receive_data(data):
+            if isinstance(event, h2.events.RequestReceived):
+                path = dict(event.headers).get(':path', '/')
+                kind, size = _route(path)
+                status = '200' if kind in ('bytes', 'chunked') else '404'
+                size = size if status == '200' else 0
+                conn.send_headers(
+                    event.stream_id,
+                    [
+                        (':status', status),
+                        ('content-type', 'application/octet-stream'),
+                        ('content-length', str(size)),
+                    ],
+                    end_stream=not size,
+                )
+                if size:
+                    pending[event.stream_id] = memoryview(_body(size))
+            elif isinstance(event, h2.events.DataReceived):
+                conn.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+            elif isinstance(event, h2.events.StreamReset):
+                pending.pop(event.stream_id, None)
+            elif isinstance(event, h2.events.ConnectionTerminated):
+                writer.write(conn.data_to_send())
+                return
+
+        # Send as much of the pending bodies as flow control allows
+        for stream_id, body in list(pending.items()):
+            while body:
+                window = min(conn.local_flow_control_window(stream_id), conn.max_outbound_frame_size)
+                if window <= 0:
+                    break
+                chunk, body = body[:window], body[window:]
+                conn.send_data(stream_id, chunk.tobytes(), end_stream=not body)
+            if body:
+                pending[stream_id] = body
+            else:
+                del pending[stream_id]
+
+        writer.write(conn.data_to_send())
+
+
+async def _handle(reader, writer):
+    try:
+        ssl_object = writer.get_extra_info('ssl_object')
+        if ssl_object is not None and ssl_object.selected_alpn_protocol() == 'h2':
+            await _serve_h2(reader, writer)
+        else:
+            await _serve_http1(reader, writer)
+    except (ConnectionError, ssl.SSLError):
+        pass
+    finally:
+        writer.close()
+
+
+def server_ssl_context():
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(CERT, KEY)
+    context.set_alpn_protocols(['h2', 'http/1.1'])
+    return context
+
+
+class OriginServer:
+    """Run the origin server on a background thread.
+
+    Attributes:
+        http_port: The port serving plain HTTP/1.1 and websockets.
+        https_port: The port serving HTTP/1.1 and HTTP/2 over TLS.
+    """
+
+    def __init__(self, host='127.0.0.1'):
+        self.host = host
+        self.http_port = None
+        self.https_port = None
+        self._loop = asyncio.new_event_loop()
+        self._started = threading.Event()
+        self._thread = threading.Thread(name='Benchmark origin server', target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        self._started.wait()
+        return self
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        http = self._loop.run_until_complete(asyncio.start_server(_handle, self.host, 0))
+        https = self._loop.run_until_complete(asyncio.start_server(_handle, self.host, 0, ssl=server_ssl_context()))
+        self.http_port = http.sockets[0].getsockname()[1]
+        self.https_port = https.sockets[0].getsockname()[1]
+        self._started.set()
+        self._loop.run_forever()
+
+    def stop(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+
+def serve(conn):
+    """Run the origin server in a child process, sending its ports over a pipe
+    and stopping when anything is received back.
+    """
+    server = OriginServer().start()
+    conn.send((server.http_port, server.https_port))
+    conn.recv()
+    server.stop()
+
+
+if __name__ == '__main__':
+    server = OriginServer().start()
+    print(f'HTTP/1.1 and websockets on http://{server.host}:{server.http_port}')
+    print(f'HTTP/1.1 and HTTP/2 over TLS on https://{server.host}:{server.https_port}')
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.stop()
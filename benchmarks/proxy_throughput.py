@@ -0,0 +1,182 @@
+"""Throughput and latency of the proxy under load.
+
+Starts the local origin server in benchmarks/origin.py, then for each
+combination of storage backend and option set creates a proxy with
+backend.create() and sends it traffic with the load generator in
+benchmarks/load.py. Reports requests per second, p50 and p99 latency and
+the proxy's memory use and thread count for each traffic scenario.
+
+The origin server and each proxy run in their own process, so that the
+load generator doesn't compete with the proxy for the GIL and the memory
+and thread figures are the proxy's alone.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import resource
+import shutil
+import tempfile
+import threading
+
+from benchmarks import load, origin
+
+# name -> (client class, use TLS, path, requests per client relative to --requests)
+SCENARIOS = {
+    'http': (load.Http1Client, False, '/bytes/1024', 1),
+    'https': (load.Http1Client, True, '/bytes/1024', 1),
+    'https-large': (load.Http1Client, True, '/bytes/1048576', 0.1),
+    'https-chunked': (load.Http1Client, True, '/chunked/262144', 0.25),
+    'h2': (load.Http2Client, True, '/bytes/1024', 1),
+    'websocket': (load.WebSocketClient, True, '/ws', 1),
+}
+
+STORAGE = {
+    'disk': {},
+    'memory': {'request_storage': 'memory'},
+}
+
+# name -> (options, install interceptors, scopes)
+OPTION_SETS = {
+    'default': ({}, False, None),
+    'har': ({'enable_har': True}, False, None),
+    'interceptors': ({}, True, None),
+    # Nagle's algorithm left on, to compare with the default
+    'nagle': ({'socket_options': {'nodelay': False}}, False, None),
+    'out-of-scope': ({}, False, [r'.*\.example\.com.*']),
+    # Scopes that name the host let out of scope connections bypass interception
+    'passthrough': ({}, False, [r'^https://example\.com/']),
+}
+
+
+def _request_interceptor(request):
+    request.headers['X-Benchmark'] = '1'
+
+
+def _response_interceptor(request, response):
+    response.headers['X-Benchmark'] = '1'
+
+
+def _rss_mb():
+    """The current resident set size, or the peak where that isn't available."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def serve_proxy(conn, options, interceptors, scopes):
+    """Run a proxy in a child process, sending its port over a pipe. Then
+    answer 'stats' with the proxy's memory use and thread count until told
+    to 'stop'.
+    """
+    from seleniumwire import backend
+
+    proxy = backend.create(options=options)
+    if interceptors:
+        proxy.request_interceptor = _request_interceptor
+        proxy.response_interceptor = _response_interceptor
+    if scopes:
+        proxy.scopes = scopes
+
+    conn.send(proxy.address()[1])
+
+    while conn.recv() == 'stats':
+        conn.send((_rss_mb(), threading.active_count()))
+
+    proxy.shutdown()
+
+
+class Process:
+    """A child process that reports back over a pipe."""
+
+    def __init__(self, target, *args):
+        context = multiprocessing.get_context('spawn')
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=target, args=(child_conn,) + args, daemon=True)
+        self.process.start()
+        self.ready = self.conn.recv()
+
+    def request(self, message):
+        self.conn.send(message)
+        return self.conn.recv()
+
+    def stop(self):
+        self.conn.send('stop')
+        self.process.join(10)
+        if self.process.is_alive():
+            self.process.terminate()
+
+
+async def _run_scenario(client_cls, proxy, origin_addr, tls, path, concurrency, requests, proxy_process):
+    clients = [client_cls(proxy, origin_addr, tls, path) for _ in range(concurrency)]
+    try:
+        result = await load.run(clients, requests)
+        # Measure while the connections are still open, as the proxy uses a thread per connection
+        rss, threads = proxy_process.request('stats')
+    finally:
+        await asyncio.gather(*(client.close() for client in clients), return_exceptions=True)
+    return result, rss, threads
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-c', '--concurrency', type=int, default=8, help='Concurrent client connections')
+    parser.add_argument('-n', '--requests', type=int, default=200, help='Requests sent by each client')
+    parser.add_argument('-s', '--scenario', action='append', choices=SCENARIOS, help='Traffic to send (repeatable)')
+    parser.add_argument('--storage', action='append', choices=STORAGE, help='Storage backend (repeatable)')
+    parser.add_argument('--options', action='append', choices=OPTION_SETS, help='Option set (repeatable)')
+    args = parser.parse_args()
+
+    origin_process = Process(origin.serve)
+    http_port, https_port = origin_process.ready
+
+    print(
+        f'{"scenario":<14} {"storage":<8} {"options":<13} {"req/s":>9} {"p50 ms":>8} {"p99 ms":>8} '
+        f'{"RSS MB":>8} {"threads":>8}'
+    )
+
+    try:
+        for storage in args.storage or STORAGE:
+            for option_set in args.options or OPTION_SETS:
+                options, interceptors, scopes = OPTION_SETS[option_set]
+                for scenario in args.scenario or SCENARIOS:
+                    client_cls, tls, path, weight = SCENARIOS[scenario]
+                    origin_addr = ('127.0.0.1', https_port if tls else http_port)
+                    requests = max(1, int(args.requests * weight))
+
+                    base_dir = tempfile.mkdtemp()
+                    proxy_options = dict(options, request_storage_base_dir=base_dir, **STORAGE[storage])
+                    proxy_process = Process(serve_proxy, proxy_options, interceptors, scopes)
+                    try:
+                        result, rss, threads = asyncio.run(
+                            _run_scenario(
+                                client_cls,
+                                ('127.0.0.1', proxy_process.ready),
+                                origin_addr,
+                                tls,
+                                path,
+                                args.concurrency,
+                                requests,
+                                proxy_process,
+                            )
+                        )
+                    finally:
+                        proxy_process.stop()
+                        shutil.rmtree(base_dir, ignore_errors=True)
+
+                    print(
+                        f'{scenario:<14} {storage:<8} {option_set:<13} {result.rate:9.1f} '
+                        f'{result.percentile(50) * 1000:8.2f} {result.percentile(99) * 1000:8.2f} '
+                        f'{rss:8.1f} {threads:8d}',
+                        flush=True,
+                    )
+    finally:
+        origin_process.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -7,7 +7,7 @@ from seleniumwire.request import Request, Response, WebSocketMessage
 from seleniumwire.thirdparty.mitmproxy.http import HTTPResponse
 from seleniumwire.thirdparty.mitmproxy.net import websockets
 from seleniumwire.thirdparty.mitmproxy.net.http.headers import Headers
-from seleniumwire.utils import is_list_alike
+from seleniumwire.utils import DECODE_MAX_SIZE, is_list_alike
 
 log = logging.getLogger(__name__)
 
@@ -26,14 +26,6 @@ class InterceptRequestHandler:
             flow.request.stream = False
 
     def request(self, flow):
-        if flow.server_conn.via:
-            if flow.server_conn.via.address != self.proxy.master.server.config.upstream_server.address:
-                # If the flow's upstream proxy doesn't match what's currently configured
-                # (which may happen if the proxy configuration has been changed since the
-                # flow was started) we need to tell the client to re-establish a connection.
-                flow.client_conn.finish()
-                return
-
         # Make any modifications to the original request
         # DEPRECATED. This will be replaced by request_interceptor
         self.proxy.modifier.modify_request(flow.request, bodyattr='raw_content')
@@ -64,14 +56,16 @@ class InterceptRequestHandler:
 
         log.info('Capturing request: %s', request.url)
 
-        self.proxy.storage.save_request(request)
+        with self.proxy.metrics.storage_write.time():
+            self.proxy.storage.save_request(request)
 
         if request.id is not None:  # Will not be None when captured
             flow.request.id = request.id
 
         if request.response:
             # This response will be a mocked response. Capture it for completeness.
-            self.proxy.storage.save_response(request.id, request.response)
+            with self.proxy.metrics.storage_write.time():
+                self.proxy.storage.save_response(request.id, request.response)
 
         # Could possibly use mitmproxy's 'anticomp' option instead of this
         if self.proxy.options.get('disable_encoding') is True:
@@ -127,10 +121,13 @@ class InterceptRequestHandler:
 
         log.info('Capturing response: %s %s %s', flow.request.url, response.status_code, response.reason)
 
-        self.proxy.storage.save_response(flow.request.id, response)
+        with self.proxy.metrics.storage_write.time():
+            self.proxy.storage.save_response(flow.request.id, response)
 
         if self.proxy.options.get('enable_har', False):
-            self.proxy.storage.save_har_entry(flow.request.id, har.create_har_entry(flow))
+            har_entry = har.create_har_entry(flow, self.proxy.options.get('decode_max_size', DECODE_MAX_SIZE))
+            with self.proxy.metrics.storage_write.time():
+                self.proxy.storage.save_har_entry(flow.request.id, har_entry)
 
     def _create_request(self, flow, response=None):
         request = Request(
@@ -187,7 +184,12 @@ class InterceptRequestHandler:
                 date=datetime.fromtimestamp(message.timestamp),
             )
 
-            self.proxy.storage.save_ws_message(flow.handshake_flow.request.id, ws_message)
+            with self.proxy.metrics.storage_write.time():
+                self.proxy.storage.save_ws_message(flow.handshake_flow.request.id, ws_message)
+
+            # The handshake request is captured with a wss scheme (see _create_request)
+            url = flow.handshake_flow.request.url.replace('https://', 'wss://', 1)
+            self.proxy.ws_subscriptions.publish(flow.handshake_flow.request.id, url, ws_message)
 
             if message.from_client:
                 direction = '(client -> server)'
@@ -5,24 +5,27 @@ This code has been taken from the har_dump.py addon in the mitmproxy project.
 import base64
 import json
 from datetime import datetime, timezone
-from typing import List, Set
+from typing import List, Optional, Set
 
 import seleniumwire
 from seleniumwire.thirdparty.mitmproxy import connections
 from seleniumwire.thirdparty.mitmproxy.http import HTTPFlow
 from seleniumwire.thirdparty.mitmproxy.net.http import cookies
 from seleniumwire.thirdparty.mitmproxy.utils import strutils
+from seleniumwire.utils import DECODE_MAX_SIZE
 
 # A list of server seen till now is maintained so we can avoid
 # using 'connect' time for entries that use an existing connection.
 SERVERS_SEEN: Set[connections.ServerConnection] = set()
 
 
-def create_har_entry(flow: HTTPFlow) -> dict:
+def create_har_entry(flow: HTTPFlow, max_size: Optional[int] = DECODE_MAX_SIZE) -> dict:
     """Create a HAR entry from the supplied flow.
 
     Args:
         flow: The current flow.
+        max_size: The most bytes a compressed body is decoded to. A body
+            that decodes to more is included as it was received.
     Returns: The HAR entry as a dictionary.
     """
     # -1 indicates that these values do not apply to current request
@@ -60,9 +63,11 @@ def create_har_entry(flow: HTTPFlow) -> dict:
 
     started_date_time = datetime.fromtimestamp(flow.request.timestamp_start, timezone.utc).isoformat()
 
-    # Response body size and encoding
+    # Response body size and encoding. The content is decoded once and
+    # reused below, as each access to flow.response.content decodes afresh.
+    response_content = flow.response.get_content(strict=False, max_size=max_size)
     response_body_size = len(flow.response.raw_content) if flow.response.raw_content else 0
-    response_body_decoded_size = len(flow.response.content) if flow.response.content else 0
+    response_body_decoded_size = len(response_content) if response_content else 0
     response_body_compression = response_body_decoded_size - response_body_size
 
     entry = {
@@ -98,17 +103,17 @@ def create_har_entry(flow: HTTPFlow) -> dict:
     }
 
     # Store binary data as base64
-    if strutils.is_mostly_bin(flow.response.content):
-        entry["response"]["content"]["text"] = base64.b64encode(flow.response.content).decode()
+    if strutils.is_mostly_bin(response_content):
+        entry["response"]["content"]["text"] = base64.b64encode(response_content).decode()
         entry["response"]["content"]["encoding"] = "base64"
     else:
-        entry["response"]["content"]["text"] = flow.response.get_text(strict=False)
+        entry["response"]["content"]["text"] = flow.response.get_text(strict=False, max_size=max_size)
 
     if flow.request.method in ["POST", "PUT", "PATCH"]:
         params = [{"name": a, "value": b} for a, b in flow.request.urlencoded_form.items(multi=True)]
         entry["request"]["postData"] = {
             "mimeType": flow.request.headers.get("Content-Type", ""),
-            "text": flow.request.get_text(strict=False),
+            "text": flow.request.get_text(strict=False, max_size=max_size),
             "params": params,
         }
 
@@ -1,11 +1,12 @@
 import inspect
 import time
-from typing import Iterator, List, Optional, Union
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
 
 from selenium.common.exceptions import TimeoutException
 
 from seleniumwire import har
-from seleniumwire.request import Request
+from seleniumwire.request import Request, WebSocketMessage
+from seleniumwire.websocket import WebSocketSubscription
 
 
 class InspectRequestsMixin:
@@ -82,6 +83,91 @@ class InspectRequestsMixin:
 
         raise TimeoutException('Timed out after {}s waiting for request matching {}'.format(timeout, pat))
 
+    def iter_ws_messages(
+        self,
+        request_or_pat: Union[Request, str, None] = None,
+        timeout: Optional[Union[int, float]] = 10,
+        maxsize: int = 1000,
+    ) -> WebSocketSubscription:
+        """Return an iterator of websocket messages as they are sent and received.
+
+        Messages are yielded for the specified websocket handshake request, or for
+        any websocket whose handshake request URL matches the specified pattern.
+        When neither is given, messages for all websockets are yielded. Only
+        messages sent after this method is called are seen.
+
+        Up to maxsize messages are held until they are consumed. When that limit
+        is reached, the oldest unread message is dropped for each new one.
+
+        Close the iterator when finished with it, or use it as a context manager:
+
+            with driver.iter_ws_messages('/socket') as messages:
+                message = next(messages)
+
+        Args:
+            request_or_pat: A websocket handshake request, or a pattern (substring
+                or regex) to search for in the handshake request URL. Default None.
+            timeout: The maximum time in seconds to wait for each message. Default
+                10s. None waits indefinitely.
+            maxsize: The maximum number of unread messages to hold. Default 1000.
+
+        Returns: An iterator of WebSocketMessage objects.
+        Raises:
+            TimeoutException if a message is not seen within the timeout period.
+        """
+        return self.backend.ws_subscriptions.subscribe(
+            **self._ws_subscription_target(request_or_pat), timeout=timeout, maxsize=maxsize
+        )
+
+    def on_ws_message(
+        self, request_or_pat: Union[Request, str, None], callback: Callable[[WebSocketMessage], None]
+    ) -> WebSocketSubscription:
+        """Call a function with each websocket message as it is sent and received.
+
+        The callback is called on a thread belonging to the subscription, with one
+        message at a time in the order they were seen. The proxy doesn't wait for
+        it, so messages are relayed while it runs. Should the callback fall 1000
+        messages behind, the oldest messages it has yet to see are dropped.
+
+        Args:
+            request_or_pat: A websocket handshake request, or a pattern (substring
+                or regex) to search for in the handshake request URL. None
+                means all websockets.
+            callback: A callable that accepts a single WebSocketMessage argument.
+
+        Returns: A subscription which can be closed to stop receiving messages.
+        """
+        return self.backend.ws_subscriptions.subscribe(
+            **self._ws_subscription_target(request_or_pat), callback=callback
+        )
+
+    def _ws_subscription_target(self, request_or_pat):
+        if isinstance(request_or_pat, Request):
+            return {'request_id': request_or_pat.id}
+
+        return {'pat': request_or_pat}
+
+    def proxy_stats(self) -> Dict[str, Any]:
+        """Get metrics describing the work done by the proxy server.
+
+        Useful for telling whether slow tests are waiting on the browser or
+        on the proxy. Counters (names ending _total) and gauges are numbers.
+        Timings (names ending _seconds) are dictionaries with the count, sum,
+        avg and max of the recorded times, plus cumulative bucket counts.
+
+        Returns: A dictionary of metric name to value.
+        """
+        return self.backend.stats()
+
+    def prefetch_dns(self, hosts: List[str]) -> None:
+        """Look up the addresses of hosts in the background, ahead of the
+        browser connecting to them.
+
+        Args:
+            hosts: The host names to resolve.
+        """
+        self.backend.prefetch_dns(hosts)
+
     @property
     def har(self) -> str:
         """Get a HAR archive of HTTP transactions that have taken place.
@@ -197,6 +197,10 @@ class RequestModifier:
         with self._lock:
             self._rewrite_rules.clear()
 
+    def is_active(self):
+        """Whether any modifications have been configured."""
+        return bool(self._headers or self._params or self._querystring is not None or self._rewrite_rules)
+
     def modify_request(self, request, urlattr='url', methodattr='method', headersattr='headers', bodyattr='body'):
         """Performs modifications to the request.
 
@@ -209,6 +209,8 @@ class WebSocketMessage:
     or vice versa.
     """
 
+    __slots__ = ('from_client', 'content', 'date')
+
     def __init__(self, *, from_client: bool, content: Union[str, bytes], date: datetime):
         """Initialise a new websocket message.
 
@@ -1,5 +1,9 @@
 import asyncio
 import logging
+import socket
+import threading
+import weakref
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
 from seleniumwire import storage
 from seleniumwire.handler import InterceptRequestHandler
@@ -8,12 +12,22 @@ from seleniumwire.thirdparty.mitmproxy import addons
 from seleniumwire.thirdparty.mitmproxy.master import Master
 from seleniumwire.thirdparty.mitmproxy.options import Options
 from seleniumwire.thirdparty.mitmproxy.server import ProxyConfig, ProxyServer
-from seleniumwire.utils import build_proxy_args, extract_cert_and_key, get_upstream_proxy
+from seleniumwire.utils import (
+    NO_SCOPE,
+    build_proxy_args,
+    extract_cert_and_key,
+    get_upstream_proxy,
+    host_patterns,
+    hosts_in_scope,
+)
+from seleniumwire.websocket import WebSocketSubscriptions
 
 logger = logging.getLogger(__name__)
 
 DEFAULT_VERIFY_SSL = False
 DEFAULT_STREAM_WEBSOCKETS = True
+# Messages are captured one at a time, so the flow doesn't need to keep older ones
+DEFAULT_WEBSOCKET_MESSAGE_HISTORY = 1
 DEFAULT_SUPPRESS_CONNECTION_ERRORS = True
 
 
@@ -31,19 +45,29 @@ class MitmProxy:
         # DEPRECATED. Will be superceded by request/response interceptors.
         self.modifier = RequestModifier()
 
+        # Decides which connections can bypass interception, based on the scopes
+        self.passthrough = ScopePassthrough(self, enabled=options.get('passthrough_out_of_scope', True))
+
         # The scope of requests we're interested in capturing.
         self.scopes = []
 
         self.request_interceptor = None
         self.response_interceptor = None
 
+        # Used to push websocket messages to subscribers as they are captured
+        self.ws_subscriptions = WebSocketSubscriptions()
+
         self._event_loop = asyncio.new_event_loop()
 
         mitmproxy_opts = Options()
 
         self.master = Master(self._event_loop, mitmproxy_opts)
+        self.metrics = self.master.metrics
         self.master.addons.add(*addons.default_addons())
-        self.master.addons.add(SendToLogger())
+        send_to_logger = SendToLogger()
+        self.master.addons.add(send_to_logger)
+        # Skip formatting and dispatching mitmproxy log messages that our logger would discard
+        self.master.log.level_filter = send_to_logger.enabled
         self.master.addons.add(InterceptRequestHandler(self))
 
         mitmproxy_opts.update(
@@ -52,16 +76,34 @@ class MitmProxy:
             listen_port=port,
             ssl_insecure=not options.get('verify_ssl', DEFAULT_VERIFY_SSL),
             stream_websockets=DEFAULT_STREAM_WEBSOCKETS,
+            websocket_message_history=DEFAULT_WEBSOCKET_MESSAGE_HISTORY,
+            http2_upstream=options.get('http2_upstream', False),
+            block_hosts=options.get('block_hosts', []),
+            listen_backlog=options.get('listen_backlog'),
             suppress_connection_errors=options.get('suppress_connection_errors', DEFAULT_SUPPRESS_CONNECTION_ERRORS),
             **build_proxy_args(get_upstream_proxy(self.options)),
-            # Options that are prefixed mitm_ are passed through to mitmproxy
-            **{k[5:]: v for k, v in options.items() if k.startswith('mitm_')},
+            **self._get_mitm_args(),
         )
 
         self.master.server = ProxyServer(ProxyConfig(mitmproxy_opts))
+        self.master.server.config.check_passthrough = self.passthrough
 
         if options.get('disable_capture', False):
-            self.scopes = ['$^']
+            self.scopes = [NO_SCOPE]
+
+        self._metrics_server = None
+
+        if options.get('metrics_port') is not None:
+            self._metrics_server = MetricsServer(host, options['metrics_port'], self.metrics)
+
+    @property
+    def scopes(self):
+        return self._scopes
+
+    @scopes.setter
+    def scopes(self, scopes):
+        self._scopes = scopes
+        self.passthrough.update(scopes)
 
     def serve_forever(self):
         """Run the server."""
@@ -74,22 +116,174 @@ class MitmProxy:
         """
         return self.master.server.address
 
+    def stats(self):
+        """Get a dictionary of the current proxy metrics."""
+        return self.metrics.snapshot()
+
+    def prefetch_dns(self, hosts):
+        """Resolve the addresses of hosts in the background."""
+        self.master.server.config.resolver.prefetch(hosts)
+
     def shutdown(self):
         """Shutdown the server and perform any cleanup."""
+        if self._metrics_server is not None:
+            self._metrics_server.shutdown()
+            self._metrics_server.server_close()
         self.master.shutdown()
+        # The master shuts down the server on its event loop, which may not
+        # have happened yet, so close the shared upstream connections here
+        http2_upstream = self.master.server.config.http2_upstream
+        if http2_upstream is not None:
+            http2_upstream.close()
+        self.ws_subscriptions.close()
         self.storage.cleanup()
 
+    def _get_mitm_args(self):
+        # The socket options map onto mitmproxy's tcp_ options, e.g. nodelay -> tcp_nodelay
+        mitm_args = {'tcp_' + k: v for k, v in self.options.get('socket_options', {}).items()}
+
+        # Options that are prefixed mitm_ are passed through to mitmproxy
+        mitm_args.update({k[5:]: v for k, v in self.options.items() if k.startswith('mitm_')})
+
+        if 'dns_cache_ttl' in self.options:
+            mitm_args['dns_cache_ttl'] = self.options['dns_cache_ttl']
+
+        dns_overrides = self.options.get('dns_overrides')
+        if dns_overrides:
+            mitm_args['dns_overrides'] = ['{}={}'.format(host, address) for host, address in dns_overrides.items()]
+
+        passthrough_hosts = self.options.get('passthrough_hosts')
+
+        if passthrough_hosts:
+            mitm_args['ignore_hosts'] = host_patterns(passthrough_hosts) + list(mitm_args.get('ignore_hosts', []))
+
+        return mitm_args
+
     def _get_storage_args(self):
         storage_args = {
             'memory_only': self.options.get('request_storage') == 'memory',
             'base_dir': self.options.get('request_storage_base_dir'),
             'maxsize': self.options.get('request_storage_max_size'),
+            'ws_max_messages': self.options.get('ws_max_messages'),
+            'ws_max_bytes': self.options.get('ws_max_bytes'),
         }
 
         return storage_args
 
 
+class ScopePassthrough:
+    """Decides which connections can be relayed to the server without being
+    intercepted, because none of their requests could be in scope.
+
+    This saves generating a certificate, two TLS handshakes and decrypting and
+    re-encrypting everything sent over the connection. It's only possible when
+    every scope names the host, and isn't done while deprecated request
+    modifications (e.g. header_overrides) are set or an upstream proxy is used.
+
+    Used by mitmproxy as its check_passthrough hook.
+    """
+
+    def __init__(self, proxy, enabled=True):
+        self.proxy = proxy
+        self.enabled = enabled
+        # A regex of the hosts that may have requests in scope, or None for any host
+        self.hosts = None
+        # Client connections that have been passed through, and the host they're to
+        self._connections = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def update(self, scopes):
+        """Recalculate the hosts in scope after the scopes have changed.
+
+        Connections already passed through to hosts that may now be in scope
+        are closed, so that the browser reconnects and they are intercepted.
+        """
+        self.hosts = hosts_in_scope(scopes) if self.enabled else None
+
+        with self._lock:
+            connections = list(self._connections.items())
+
+        for client_conn, host in connections:
+            if not (self and self.hosts.search(host) is None):
+                self._close(client_conn)
+
+    def __bool__(self):
+        return (
+            self.hosts is not None
+            and self.proxy.master.options.mode == 'regular'
+            and not self.proxy.modifier.is_active()
+        )
+
+    def __call__(self, address, client_conn):
+        host = address[0]
+
+        if self.hosts.search(host) is not None:
+            return False
+
+        logger.debug('Passing through connection to %s:%s', host, address[1])
+
+        with self._lock:
+            self._connections[client_conn] = host
+
+        return True
+
+    def _close(self, client_conn):
+        with self._lock:
+            self._connections.pop(client_conn, None)
+
+        try:
+            client_conn.connection.shutdown(socket.SHUT_RDWR)
+        except (AttributeError, OSError):
+            pass
+
+
+class MetricsServer(ThreadingHTTPServer):
+    """Serve the proxy metrics in the Prometheus text format at /metrics."""
+
+    daemon_threads = True
+
+    def __init__(self, host, port, metrics):
+        self.metrics = metrics
+        super().__init__((host, port), _MetricsRequestHandler)
+
+        t = threading.Thread(name='Selenium Wire Metrics Server', target=self.serve_forever)
+        t.daemon = True
+        t.start()
+
+        logger.info('Serving proxy metrics on http://%s:%s/metrics', *self.server_address[:2])
+
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+
+        body = self.server.metrics.to_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(format, *args)
+
+
 class SendToLogger:
+    # Mitmproxy log levels and their logging equivalents
+    LEVELS = {
+        'error': logging.ERROR,
+        'warn': logging.WARNING,
+        'info': logging.INFO,
+        'alert': logging.INFO,
+        'debug': logging.DEBUG,
+    }
+
+    def enabled(self, level):
+        """Whether mitmproxy log messages of the given level will be output by our logger."""
+        return logger.isEnabledFor(self.LEVELS.get(level, logging.INFO))
+
     def log(self, entry):
         """Send a mitmproxy log message through our own logger."""
-        getattr(logger, entry.level.replace('warn', 'warning'), logger.info)(entry.msg)
+        logger.log(self.LEVELS.get(entry.level, logging.INFO), entry.msg)
@@ -7,9 +7,9 @@ import sys
 import tempfile
 import threading
 import uuid
-from collections import OrderedDict, defaultdict
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import DefaultDict, Iterator, List, Optional, Union
+from typing import Dict, Iterator, List, Optional, Union
 
 from seleniumwire.request import Request, Response, WebSocketMessage
 
@@ -28,15 +28,50 @@ def create(*, memory_only: bool = False, **kwargs):
         kwargs: Any arguments to initialise the storage with:
             - base_dir: The base directory under which requests are stored
             - maxsize: The maximum number of requests the storage can hold
+            - ws_max_messages: The maximum number of websocket messages kept per connection
+            - ws_max_bytes: The maximum size of websocket message content kept per connection
     Returns: A request storage implementation, currently either RequestStorage (default)
         or InMemoryRequestStorage when memory_only is set to True.
     """
+    ws_limits = {
+        'ws_max_messages': kwargs.get('ws_max_messages'),
+        'ws_max_bytes': kwargs.get('ws_max_bytes'),
+    }
+
     if memory_only:
         log.info('Using in-memory request storage')
-        return InMemoryRequestStorage(base_dir=kwargs.get('base_dir'), maxsize=kwargs.get('maxsize'))
+        return InMemoryRequestStorage(base_dir=kwargs.get('base_dir'), maxsize=kwargs.get('maxsize'), **ws_limits)
 
     log.info('Using default request storage')
-    return RequestStorage(base_dir=kwargs.get('base_dir'))
+    return RequestStorage(base_dir=kwargs.get('base_dir'), **ws_limits)
+
+
+def _trim_ws_messages(
+    messages: List[WebSocketMessage], size: int, max_messages: Optional[int], max_bytes: Optional[int]
+) -> int:
+    """Discard the oldest websocket messages until the list is within the limits.
+
+    Args:
+        messages: The messages to trim, oldest first. Trimmed in place.
+        size: The total content size of the messages.
+        max_messages: The maximum number of messages to keep, or None for no limit.
+        max_bytes: The maximum total content size to keep, or None for no limit.
+    Returns: The total content size of the remaining messages.
+    """
+    discard = 0
+
+    if max_messages is not None and len(messages) > max_messages:
+        discard = len(messages) - max_messages
+        size -= sum(len(m.content) for m in messages[:discard])
+
+    if max_bytes is not None:
+        while size > max_bytes and discard < len(messages):
+            size -= len(messages[discard].content)
+            discard += 1
+
+    del messages[:discard]
+
+    return size
 
 
 class _IndexedRequest:
@@ -55,12 +90,18 @@ class RequestStorage:
     Instances are designed to be threadsafe.
     """
 
-    def __init__(self, base_dir: Optional[str] = None):
+    def __init__(
+        self, base_dir: Optional[str] = None, ws_max_messages: Optional[int] = None, ws_max_bytes: Optional[int] = None
+    ):
         """Initialises a new RequestStorage using an optional base directory.
 
         Args:
             base_dir: The directory where request and response data is stored.
                 If not specified, the system temp folder is used.
+            ws_max_messages: The maximum number of websocket messages to keep per
+                connection. Older messages are discarded first. Default no limit.
+            ws_max_bytes: The maximum total size of websocket message content to keep
+                per connection. Older messages are discarded first. Default no limit.
         """
         if base_dir is None:
             base_dir = tempfile.gettempdir()
@@ -73,9 +114,12 @@ class RequestStorage:
         # Index of requests received.
         self._index: List[_IndexedRequest] = []
 
-        # Sequences of websocket messages held against the
-        # id of the originating websocket request.
-        self._ws_messages: DefaultDict[str, List] = defaultdict(list)
+        # Websocket messages are appended to a file in the directory of the
+        # originating websocket request. This holds the [count, size] of each
+        # file so that it can be compacted once it grows well past the limits.
+        self._ws_message_counts: Dict[str, List[int]] = {}
+        self._ws_max_messages = ws_max_messages
+        self._ws_max_bytes = ws_max_bytes
 
         self._lock = threading.Lock()
 
@@ -135,8 +179,54 @@ class RequestStorage:
             request_id: The id of the original handshake request.
             message: The websocket message to save.
         """
+        path = os.path.join(self._get_request_dir(request_id), 'ws_messages')
+
         with self._lock:
-            self._ws_messages[request_id].append(message)
+            try:
+                with open(path, 'ab') as out:
+                    pickle.dump(message, out)
+            except FileNotFoundError:
+                log.debug('Cannot save websocket message as request %s is no longer stored', request_id)
+                return
+
+            counts = self._ws_message_counts.setdefault(request_id, [0, 0])
+            counts[0] += 1
+            counts[1] += len(message.content)
+
+            if (self._ws_max_messages is not None and counts[0] > 2 * self._ws_max_messages) or (
+                self._ws_max_bytes is not None and counts[1] > 2 * self._ws_max_bytes
+            ):
+                self._compact_ws_messages(path, counts)
+
+    def _compact_ws_messages(self, path: str, counts: List[int]) -> None:
+        """Rewrite a websocket message file to hold only the messages within the limits."""
+        messages = self._read_ws_messages(path)
+        counts[1] = _trim_ws_messages(messages, counts[1], self._ws_max_messages, self._ws_max_bytes)
+        counts[0] = len(messages)
+
+        with open(path + '.tmp', 'wb') as out:
+            for message in messages:
+                pickle.dump(message, out)
+
+        os.replace(path + '.tmp', path)
+
+    def _read_ws_messages(self, path: str) -> List[WebSocketMessage]:
+        messages = []
+
+        try:
+            with open(path, 'rb') as f:
+                while True:
+                    try:
+                        messages.append(pickle.load(f))
+                    except EOFError:
+                        break
+                    except Exception:
+                        # A message may be partially written at the end of the file
+                        break
+        except FileNotFoundError:
+            pass
+
+        return messages
 
     def save_har_entry(self, request_id: str, entry: dict) -> None:
         """Save a HAR entry to storage against a request with the specified id.
@@ -186,10 +276,12 @@ class RequestStorage:
             if request is None:
                 return None
 
-            ws_messages = self._ws_messages.get(request.id)
-
-            if ws_messages:
+            if request.id in self._ws_message_counts:
                 # Attach any websocket messages for this request if we have them
+                ws_messages = self._read_ws_messages(os.path.join(request_dir, 'ws_messages'))
+                _trim_ws_messages(
+                    ws_messages, sum(len(m.content) for m in ws_messages), self._ws_max_messages, self._ws_max_bytes
+                )
                 request.ws_messages = ws_messages
 
             try:
@@ -281,7 +373,7 @@ class RequestStorage:
         with self._lock:
             index = self._index[:]
             self._index.clear()
-            self._ws_messages.clear()
+            self._ws_message_counts.clear()
 
         for indexed_request in index:
             shutil.rmtree(self._get_request_dir(indexed_request.id), ignore_errors=True)
@@ -355,7 +447,13 @@ class InMemoryRequestStorage:
     Instances are designed to be threadsafe.
     """
 
-    def __init__(self, base_dir: Optional[str] = None, maxsize: Optional[int] = None):
+    def __init__(
+        self,
+        base_dir: Optional[str] = None,
+        maxsize: Optional[int] = None,
+        ws_max_messages: Optional[int] = None,
+        ws_max_bytes: Optional[int] = None,
+    ):
         """Initialise a new InMemoryRequestStorage.
 
         Args:
@@ -364,6 +462,10 @@ class InMemoryRequestStorage:
             maxsize: The maximum number of requests to store. Default no limit.
                 When this attribute is set and the storage reaches the specified maximum
                 size, old requests are discarded sequentially as new requests arrive.
+            ws_max_messages: The maximum number of websocket messages to keep per
+                connection. Older messages are discarded first. Default no limit.
+            ws_max_bytes: The maximum total size of websocket message content to keep
+                per connection. Older messages are discarded first. Default no limit.
         """
         if base_dir is None:
             base_dir = tempfile.gettempdir()
@@ -371,6 +473,8 @@ class InMemoryRequestStorage:
         self.home_dir: str = os.path.join(base_dir, '.seleniumwire')
 
         self._maxsize = sys.maxsize if maxsize is None else maxsize
+        self._ws_max_messages = ws_max_messages
+        self._ws_max_bytes = ws_max_bytes
         # OrderedDict doesn't support type hints before 3.7.2
         self._requests = OrderedDict()  # type: ignore
         self._lock = threading.Lock()
@@ -421,10 +525,20 @@ class InMemoryRequestStorage:
             request_id: The id of the original handshake request.
             message: The websocket message to save.
         """
-        request = self._get_request(request_id)
+        with self._lock:
+            try:
+                v = self._requests[request_id]
+            except KeyError:
+                return
 
-        if request is not None:
+            request = v['request']
             request.ws_messages.append(message)
+            v['ws_size'] = _trim_ws_messages(
+                request.ws_messages,
+                v.get('ws_size', 0) + len(message.content),
+                self._ws_max_messages,
+                self._ws_max_bytes,
+            )
 
     def save_har_entry(self, request_id: str, entry: dict) -> None:
         """Save a HAR entry to storage against a request with the specified id.
@@ -1,4 +1,3 @@
-import contextlib
 import pprint
 import sys
 import traceback
@@ -35,20 +34,39 @@ def cut_traceback(tb, func_name):
     return tb or tb_orig
 
 
-@contextlib.contextmanager
-def safecall():
-    try:
-        yield
-    except (exceptions.AddonHalt, exceptions.OptionsError):
-        raise
-    except Exception:
-        etype, value, tb = sys.exc_info()
-        tb = cut_traceback(tb, "invoke_addon")
-        ctx.log.error(
-            "Error handling request\n%s" % "".join(
-                traceback.format_exception(etype, value, tb)
-            )
+def log_addon_error(func_name):
+    """
+    Log the exception being handled, raised by an addon called from func_name.
+    """
+    etype, value, tb = sys.exc_info()
+    tb = cut_traceback(tb, func_name)
+    ctx.log.error(
+        "Error handling request\n%s" % "".join(
+            traceback.format_exception(etype, value, tb)
+        )
+    )
+
+
+def get_handler(addon, name):
+    """
+    The addon's handler for the named event, or None if it doesn't handle it.
+
+    Raises:
+        AddonManagerError, if the addon has an attribute of that name which
+        isn't callable.
+    """
+    func = getattr(addon, name, None)
+    if func is None or isinstance(func, types.ModuleType):
+        # we gracefully exclude module imports with the same name as hooks.
+        # For example, a user may have "from mitmproxy import log" in an addon,
+        # which has the same name as the "log" hook. In this particular case,
+        # we end up in an error loop because we "log" this error.
+        return None
+    if not callable(func):
+        raise exceptions.AddonManagerError(
+            "Addon handler {} ({}) not callable".format(name, addon)
         )
+    return func
 
 
 class Loader:
@@ -113,8 +131,29 @@ class AddonManager:
         self.lookup = {}
         self.chain = []
         self.master = master
+        # Event name -> the handlers for it, in chain order. Rebuilt whenever
+        # addons are added or removed, so that triggering an event only calls
+        # the addons that handle it. Replaced rather than changed, as it is
+        # read by the connection threads.
+        self.handlers: typing.Dict[str, typing.Tuple[typing.Callable, ...]] = {}
+        self._build_handlers()
         master.options.changed.connect(self._configure_all)
 
+    def _build_handlers(self):
+        handlers = {name: [] for name in eventsequence.Events}
+        for a in traverse(self.chain):
+            for name, funcs in handlers.items():
+                func = get_handler(a, name)
+                if func is not None:
+                    funcs.append(func)
+        self.handlers = {name: tuple(funcs) for name, funcs in handlers.items()}
+
+    def handles(self, name):
+        """
+            Whether any addon handles the named event.
+        """
+        return bool(self.handlers.get(name))
+
     def _configure_all(self, options, updated):
         self.trigger("configure", updated)
 
@@ -126,6 +165,7 @@ class AddonManager:
             self.invoke_addon(a, "done")
         self.lookup = {}
         self.chain = []
+        self._build_handlers()
 
     def get(self, name):
         """
@@ -151,6 +191,8 @@ class AddonManager:
                 raise exceptions.AddonManagerError(
                     "An addon called '%s' already exists." % name
                 )
+            for event in eventsequence.Events:
+                get_handler(a, event)
         l = Loader(self.master)
         self.invoke_addon(addon, "load", l)
         for a in traverse([addon]):
@@ -159,6 +201,8 @@ class AddonManager:
         for a in traverse([addon]):
             self.master.commands.collect_commands(a)
         self.master.options.process_deferred()
+        # The addon may be in the chain already, or a sub-addon of one that is
+        self._build_handlers()
         return addon
 
     def add(self, *addons):
@@ -168,6 +212,7 @@ class AddonManager:
         """
         for i in addons:
             self.chain.append(self.register(i))
+        self._build_handlers()
 
     def remove(self, addon):
         """
@@ -183,6 +228,7 @@ class AddonManager:
                 raise exceptions.AddonManagerError("No such addon: %s" % n)
             self.chain = [i for i in self.chain if i is not a]
             del self.lookup[_get_name(a)]
+        self._build_handlers()
         self.invoke_addon(addon, "done")
 
     def __len__(self):
@@ -231,28 +277,24 @@ class AddonManager:
         if name not in eventsequence.Events:
             raise exceptions.AddonManagerError("Unknown event: %s" % name)
         for a in traverse([addon]):
-            func = getattr(a, name, None)
-            if func:
-                if callable(func):
-                    func(*args, **kwargs)
-                elif isinstance(func, types.ModuleType):
-                    # we gracefully exclude module imports with the same name as hooks.
-                    # For example, a user may have "from mitmproxy import log" in an addon,
-                    # which has the same name as the "log" hook. In this particular case,
-                    # we end up in an error loop because we "log" this error.
-                    pass
-                else:
-                    raise exceptions.AddonManagerError(
-                        "Addon handler {} ({}) not callable".format(name, a)
-                    )
+            func = get_handler(a, name)
+            if func is not None:
+                func(*args, **kwargs)
 
     def trigger(self, name, *args, **kwargs):
         """
             Trigger an event across all addons.
         """
-        for i in self.chain:
+        try:
+            handlers = self.handlers[name]
+        except KeyError:
+            raise exceptions.AddonManagerError("Unknown event: %s" % name)
+        for func in handlers:
             try:
-                with safecall():
-                    self.invoke_addon(i, name, *args, **kwargs)
+                func(*args, **kwargs)
             except exceptions.AddonHalt:
                 return
+            except exceptions.OptionsError:
+                raise
+            except Exception:
+                log_addon_error("trigger")
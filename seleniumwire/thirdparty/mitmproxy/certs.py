@@ -1,16 +1,15 @@
 import contextlib
 import datetime
+import functools
 import ipaddress
 import os
 import ssl
 import sys
+import threading
 import time
 import typing
 
 import OpenSSL
-from pyasn1.codec.der.decoder import decode
-from pyasn1.error import PyAsn1Error
-from pyasn1.type import char, constraint, namedtype, tag, univ
 
 from seleniumwire.thirdparty.mitmproxy.coretypes import serializable
 
@@ -168,6 +167,11 @@ class CertStore:
         self.dhparams = dhparams
         self.certs: typing.Dict[TCertId, CertStoreEntry] = {}
         self.expire_queue = []
+        # The number of certificates generated by get_cert()
+        self.generated = 0
+        # Held while a certificate is looked up or generated, so that one is
+        # only generated once when several connections ask for it at once
+        self._lock = threading.Lock()
 
     def expire(self, entry):
         self.expire_queue.append(entry)
@@ -328,7 +332,8 @@ class CertStore:
             self,
             commonname: typing.Optional[bytes],
             sans: typing.List[bytes],
-            organization: typing.Optional[bytes] = None
+            organization: typing.Optional[bytes] = None,
+            observe: typing.Optional[typing.Callable[[float], None]] = None
     ) -> typing.Tuple["Cert", OpenSSL.SSL.PKey, str]:
         """
             Returns an (cert, privkey, cert_chain) tuple.
@@ -339,6 +344,9 @@ class CertStore:
             sans: A list of Subject Alternate Names.
 
             organization: Organization name for the generated certificate.
+
+            observe: Called with the seconds taken if this call generated
+            the certificate, rather than finding it in the store.
         """
 
         potential_keys: typing.List[TCertId] = []
@@ -349,44 +357,58 @@ class CertStore:
         potential_keys.append(b"*")
         potential_keys.append((commonname, tuple(sans)))
 
-        name = next(
-            filter(lambda key: key in self.certs, potential_keys),
-            None
-        )
-        if name:
-            entry = self.certs[name]
-        else:
-            entry = CertStoreEntry(
-                cert=dummy_cert(
-                    self.default_privatekey,
-                    self.default_ca,
-                    commonname,
-                    sans,
-                    organization),
-                privatekey=self.default_privatekey,
-                chain_file=self.default_chain_file)
-            self.certs[(commonname, tuple(sans))] = entry
-            self.expire(entry)
+        with self._lock:
+            name = next(
+                filter(lambda key: key in self.certs, potential_keys),
+                None
+            )
+            if name:
+                entry = self.certs[name]
+            else:
+                start = time.perf_counter()
+                entry = CertStoreEntry(
+                    cert=dummy_cert(
+                        self.default_privatekey,
+                        self.default_ca,
+                        commonname,
+                        sans,
+                        organization),
+                    privatekey=self.default_privatekey,
+                    chain_file=self.default_chain_file)
+                self.certs[(commonname, tuple(sans))] = entry
+                self.expire(entry)
+                self.generated += 1
+                if observe:
+                    observe(time.perf_counter() - start)
 
         return entry.cert, entry.privatekey, entry.chain_file
 
 
-class _GeneralName(univ.Choice):
-    # We only care about dNSName and iPAddress
-    componentType = namedtype.NamedTypes(
-        namedtype.NamedType('dNSName', char.IA5String().subtype(
-            implicitTag=tag.Tag(tag.tagClassContext, tag.tagFormatSimple, 2)
-        )),
-        namedtype.NamedType('iPAddress', univ.OctetString().subtype(
-            implicitTag=tag.Tag(tag.tagClassContext, tag.tagFormatSimple, 7)
-        )),
-    )
+@functools.lru_cache(maxsize=None)
+def _general_names():
+    """
+        The ASN.1 type of a subjectAltName extension. Built on first use so that
+        pyasn1 isn't imported until a certificate's altnames are read.
+    """
+    from pyasn1.type import char, constraint, namedtype, tag, univ
+
+    class _GeneralName(univ.Choice):
+        # We only care about dNSName and iPAddress
+        componentType = namedtype.NamedTypes(
+            namedtype.NamedType('dNSName', char.IA5String().subtype(
+                implicitTag=tag.Tag(tag.tagClassContext, tag.tagFormatSimple, 2)
+            )),
+            namedtype.NamedType('iPAddress', univ.OctetString().subtype(
+                implicitTag=tag.Tag(tag.tagClassContext, tag.tagFormatSimple, 7)
+            )),
+        )
 
+    class _GeneralNames(univ.SequenceOf):
+        componentType = _GeneralName()
+        sizeSpec = univ.SequenceOf.sizeSpec + \
+            constraint.ValueSizeConstraint(1, 1024)
 
-class _GeneralNames(univ.SequenceOf):
-    componentType = _GeneralName()
-    sizeSpec = univ.SequenceOf.sizeSpec + \
-        constraint.ValueSizeConstraint(1, 1024)
+    return _GeneralNames
 
 
 class Cert(serializable.Serializable):
@@ -489,12 +511,15 @@ class Cert(serializable.Serializable):
             All DNS altnames.
         """
         # tcp.TCPClient.convert_to_tls assumes that this property only contains DNS altnames for hostname verification.
+        from pyasn1.codec.der.decoder import decode
+        from pyasn1.error import PyAsn1Error
+
         altnames = []
         for i in range(self.x509.get_extension_count()):
             ext = self.x509.get_extension(i)
             if ext.get_short_name() == b"subjectAltName":
                 try:
-                    dec = decode(ext.get_data(), asn1Spec=_GeneralNames())
+                    dec = decode(ext.get_data(), asn1Spec=_general_names()())
                 except PyAsn1Error:
                     continue
                 for i in dec[0]:
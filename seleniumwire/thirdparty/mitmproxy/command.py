@@ -10,8 +10,6 @@ import typing
 
 import seleniumwire.thirdparty.mitmproxy.types
 from seleniumwire.thirdparty.mitmproxy import exceptions
-from seleniumwire.thirdparty.mitmproxy import command_lexer
-from seleniumwire.thirdparty.mitmproxy.command_lexer import unquote
 
 
 def verify_arg_signature(f: typing.Callable, args: typing.Iterable[typing.Any], kwargs: dict) -> None:
@@ -175,6 +173,9 @@ class CommandManager:
         Parse a possibly partial command. Return a sequence of ParseResults and a sequence of remainder type help items.
         """
 
+        # pyparsing is slow to import and commands are rarely parsed, so the lexer is loaded on first use
+        from seleniumwire.thirdparty.mitmproxy import command_lexer
+
         parts: typing.List[str] = command_lexer.expr.parseString(cmdstr, parseAll=True)
 
         parsed: typing.List[ParseResult] = []
@@ -256,6 +257,8 @@ class CommandManager:
         """
         Execute a command string. May raise CommandError.
         """
+        from seleniumwire.thirdparty.mitmproxy.command_lexer import unquote
+
         parts, _ = self.parse_partial(cmdstr)
         if not parts:
             raise exceptions.CommandError(f"Invalid command: {cmdstr!r}")
@@ -103,8 +103,9 @@ class ClientConnection(tcp.BaseHandler, stateobject.StateObject):
 
     def send(self, message):
         if isinstance(message, list):
-            message = b"".join(message)
-        self.wfile.write(message)
+            self.wfile.writev(message)
+        else:
+            self.wfile.write(message)
         self.wfile.flush()
 
     @classmethod
@@ -272,8 +273,9 @@ class ServerConnection(tcp.TCPClient, stateobject.StateObject):
 
     def send(self, message):
         if isinstance(message, list):
-            message = b"".join(message)
-        self.wfile.write(message)
+            self.wfile.writev(message)
+        else:
+            self.wfile.write(message)
         self.wfile.flush()
 
     def establish_tls(self, *, sni=None, client_certs=None, **kwargs):
@@ -317,6 +319,11 @@ class SocksServerConnection(ServerConnection):
             return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", (host, port))]
         return super().getaddrinfo(host, port, *args, **kwargs)
 
+    @property
+    def concurrent_connects(self):
+        # The SOCKS handshake needs a blocking socket
+        return not self.use_socks
+
     def makesocket(self, family, type, proto):
         if not self.use_socks:
             return super().makesocket(family, type, proto)
@@ -7,9 +7,9 @@ from enum import Enum
 
 from kaitaistruct import BytesIO, KaitaiStream, KaitaiStruct
 from kaitaistruct import __version__ as ks_version
-from pkg_resources import parse_version
 
-if parse_version(ks_version) < parse_version('0.7'):
+# Compared by hand rather than with pkg_resources.parse_version, which is slow to import
+if tuple(int(part) for part in ks_version.split('.')[:2] if part.isdigit()) < (0, 7):
     raise Exception("Incompatible Kaitai Struct Python API: 0.7 or later is required, but you have %s" % (ks_version))
 
 
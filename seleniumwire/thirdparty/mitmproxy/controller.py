@@ -1,7 +1,8 @@
 import asyncio
 import queue
+import time
 
-from seleniumwire.thirdparty.mitmproxy import exceptions
+from seleniumwire.thirdparty.mitmproxy import exceptions, flow
 
 
 class Channel:
@@ -13,19 +14,56 @@ class Channel:
         self.master = master
         self.loop = loop
         self.should_exit = should_exit
+        self.metrics = master.metrics
+
+    async def _dispatch(self, mtype, m, sent):
+        try:
+            await self.master.addons.handle_lifecycle(mtype, m)
+        finally:
+            self.metrics.hooks_pending.dec()
+            self.metrics.hook_dispatch.observe(time.perf_counter() - sent)
+
+    def log_enabled(self, level):
+        """
+            Whether log entries of the given level are wanted by the master.
+        """
+        return self.master.log.enabled(level)
+
+    def log(self, entry):
+        """
+            Send a log entry to the master and return immediately. Unlike tell(),
+            entries are batched rather than each being scheduled on the event loop.
+        """
+        if not self.should_exit.is_set():
+            self.master.log.add(entry)
+
+    def _handled(self, mtype, m):
+        """
+            Whether any addon would see the message. Flows are also passed to
+            the update event once handled.
+        """
+        addons = self.master.addons
+        return addons.handles(mtype) or (isinstance(m, flow.Flow) and addons.handles("update"))
 
     def ask(self, mtype, m):
         """
         Decorate a message with a reply attribute, and send it to the master.
         Then wait for a response.
 
+        Messages that no addon handles are answered straight away with the
+        message itself, as the master would, without a trip through the event
+        loop.
+
         Raises:
             exceptions.Kill: All connections should be closed immediately.
         """
         if not self.should_exit.is_set():
+            if not self._handled(mtype, m):
+                return m
             m.reply = Reply(m)
+            self.metrics.hooks_pending.inc()
             asyncio.run_coroutine_threadsafe(
-                self.master.addons.handle_lifecycle(mtype, m),
+                self._dispatch(mtype, m, time.perf_counter()),
                 self.loop,
             )
             g = m.reply.q.get()
@@ -38,10 +76,11 @@ class Channel:
         Decorate a message with a dummy reply attribute, send it to the master,
         then return immediately.
         """
-        if not self.should_exit.is_set():
+        if not self.should_exit.is_set() and self._handled(mtype, m):
             m.reply = DummyReply()
+            self.metrics.hooks_pending.inc()
             asyncio.run_coroutine_threadsafe(
-                self.master.addons.handle_lifecycle(mtype, m),
+                self._dispatch(mtype, m, time.perf_counter()),
                 self.loop,
             )
 
@@ -1,5 +1,7 @@
+import queue
 import threading
 import time
+import traceback
 
 
 class BaseThread(threading.Thread):
@@ -12,3 +14,65 @@ class BaseThread(threading.Thread):
             self.name,
             int(time.time() - self._thread_started)
         )
+
+
+class WorkerPool:
+    """
+        Runs callables on reusable daemon threads.
+
+        A new thread is only started when every existing worker is busy,
+        and workers that stay idle for idle_timeout seconds exit. When
+        max_workers are busy, further callables wait for one of them.
+    """
+
+    def __init__(self, name, idle_timeout=60, max_workers=None):
+        self.name = name
+        self.idle_timeout = idle_timeout
+        self.max_workers = max_workers
+        self._tasks = queue.Queue()
+        self._lock = threading.Lock()
+        self._idle = 0
+        self._started = 0
+        self._workers = 0
+        # tasks queued while every worker was busy and no more could be started
+        self._backlog = 0
+
+    def submit(self, func, *args):
+        spawn = False
+        with self._lock:
+            if self._idle:
+                # hand the task to a waiting worker
+                self._idle -= 1
+            elif self.max_workers is None or self._workers < self.max_workers:
+                self._started += 1
+                self._workers += 1
+                spawn = True
+                name = "{}-{}".format(self.name, self._started)
+            else:
+                # the first worker to finish takes it
+                self._backlog += 1
+        self._tasks.put((func, args))
+        if spawn:
+            BaseThread(name=name, target=self._work, daemon=True).start()
+
+    def _work(self):
+        while True:
+            try:
+                func, args = self._tasks.get(timeout=self.idle_timeout)
+            except queue.Empty:
+                with self._lock:
+                    if self._idle:
+                        self._idle -= 1
+                        self._workers -= 1
+                        return
+                # a task was handed to this worker in the meantime
+                continue
+            try:
+                func(*args)
+            except Exception:  # pragma: no cover
+                traceback.print_exc()
+            with self._lock:
+                if self._backlog:
+                    self._backlog -= 1
+                else:
+                    self._idle += 1
@@ -157,11 +157,24 @@ class _MultiDict(MutableMapping, metaclass=ABCMeta):
 
 
 class MultiDict(_MultiDict, serializable.Serializable):
+    """
+    A multidict that holds its fields in a list, with an index from each
+    canonical key to the positions of its fields.
+
+    Fields are looked up through the index, and changed in place, rather
+    than by scanning and rebuilding a tuple of all the fields, so getting,
+    setting and deleting a key costs the same however many fields there
+    are. Deleted fields are left as None (so the positions of the others
+    stay valid) until they make up half of the list. The index is built
+    when first needed, and dropped when fields are inserted before others.
+
+    .fields is still a tuple of (key, value) tuples in their original order,
+    built when read after a change.
+    """
+
     def __init__(self, fields=()):
         super().__init__()
-        self.fields = tuple(
-            tuple(i) for i in fields
-        )
+        self.fields = fields
 
     @staticmethod
     def _reduce_values(values):
@@ -171,11 +184,128 @@ class MultiDict(_MultiDict, serializable.Serializable):
     def _kconv(key):
         return key
 
+    @property
+    def fields(self):
+        if self._fields_tuple is None:
+            if self._deleted:
+                self._fields_tuple = tuple(field for field in self._fields if field is not None)
+            else:
+                self._fields_tuple = tuple(self._fields)
+        return self._fields_tuple
+
+    @fields.setter
+    def fields(self, value):
+        self._fields = [tuple(field) for field in value]
+        self._deleted = 0
+        self._index = None
+        self._fields_tuple = None
+
+    def _get_index(self):
+        if self._index is None:
+            index = {}
+            for i, field in enumerate(self._fields):
+                if field is not None:
+                    index.setdefault(self._kconv(field[0]), []).append(i)
+            self._index = index
+        return self._index
+
+    def _compact(self):
+        self._fields = [field for field in self._fields if field is not None]
+        self._deleted = 0
+        self._index = None
+
+    def _remove(self, positions):
+        for i in positions:
+            self._fields[i] = None
+        self._deleted += len(positions)
+        if self._deleted > 8 and self._deleted * 2 > len(self._fields):
+            self._compact()
+
+    def __delitem__(self, key):
+        positions = self._get_index().pop(self._kconv(key), None)
+        if not positions:
+            raise KeyError(key)
+        self._fields_tuple = None
+        self._remove(positions)
+
+    def __len__(self):
+        return len(self._get_index())
+
+    def __contains__(self, key):
+        return self._kconv(key) in self._get_index()
+
+    def get_all(self, key):
+        """
+        Return the list of all values for a given key.
+        If that key is not in the MultiDict, the return value will be an empty list.
+        """
+        positions = self._get_index().get(self._kconv(key))
+        if not positions:
+            return []
+        fields = self._fields
+        return [fields[i][1] for i in positions]
+
+    def set_all(self, key, values):
+        """
+        Remove the old values for a key and add new ones.
+        """
+        index = self._get_index()
+        key_kconv = self._kconv(key)
+        positions = index.get(key_kconv, [])
+        values = list(values)
+        fields = self._fields
+        self._fields_tuple = None
+
+        # Existing fields take the new values in turn, keeping their place and name
+        for i, value in zip(positions, values):
+            fields[i] = (fields[i][0], value)
+        kept = positions[:len(values)]
+        removed = positions[len(values):]
+
+        for value in values[len(positions):]:
+            kept.append(len(fields))
+            fields.append((key, value))
+
+        if kept:
+            index[key_kconv] = kept
+        else:
+            index.pop(key_kconv, None)
+        if removed:
+            self._remove(removed)
+
+    def add(self, key, value):
+        """
+        Add an additional value for the given key at the bottom.
+        """
+        self.insert(len(self._fields) - self._deleted, key, value)
+
+    def insert(self, index, key, value):
+        """
+        Insert an additional value for the given key at the specified position.
+        """
+        self._fields_tuple = None
+        if index >= len(self._fields) - self._deleted:
+            if self._index is not None:
+                self._index.setdefault(self._kconv(key), []).append(len(self._fields))
+            self._fields.append((key, value))
+        else:
+            # The fields after it move along, so the index is rebuilt when next needed
+            if self._deleted:
+                self._compact()
+            self._fields.insert(index, (key, value))
+            self._index = None
+
+    def clear(self):
+        self.fields = ()
+
+    def __copy__(self):
+        return self.copy()
+
     def get_state(self):
         return self.fields
 
     def set_state(self, state):
-        self.fields = tuple(tuple(x) for x in state)
+        self.fields = state
 
     @classmethod
     def from_state(cls, state):
@@ -1,4 +1,4 @@
-import asyncio
+import collections
 
 
 class LogEntry:
@@ -19,8 +19,48 @@ class Log:
     """
         The central logger, exposed to scripts as mitmproxy.ctx.log.
     """
+    # The maximum number of entries waiting to be handled. When the event
+    # loop falls behind, the oldest entries are dropped.
+    BUFFER_SIZE = 10000
+
     def __init__(self, master):
         self.master = master
+        # An optional callable which is passed a level and returns whether
+        # entries of that level are wanted. When not set, all entries are.
+        self.level_filter = None
+        self._buffer = collections.deque(maxlen=self.BUFFER_SIZE)
+        self._drain_scheduled = False
+
+    def enabled(self, level):
+        """
+            Whether entries of the given level are wanted. Callers should check
+            this before formatting a message, so that disabled logging is cheap.
+        """
+        return self.level_filter is None or self.level_filter(level)
+
+    def add(self, entry):
+        """
+            Queue an entry for the "log" event. This method is thread-safe.
+
+            Entries are handed to the addons in batches on the event loop,
+            rather than scheduling a callback for each one.
+        """
+        self._buffer.append(entry)
+        if not self._drain_scheduled:
+            self._drain_scheduled = True
+            try:
+                self.master.channel.loop.call_soon_threadsafe(self._drain)
+            except RuntimeError:
+                # The event loop has been closed on shutdown
+                pass
+
+    def _drain(self):
+        # Reset the flag first, so that entries added while draining schedule
+        # another drain rather than being missed.
+        self._drain_scheduled = False
+        buffer = self._buffer
+        while buffer:
+            self.master.addons.trigger("log", buffer.popleft())
 
     def debug(self, txt):
         """
@@ -56,9 +96,8 @@ class Log:
         self(txt, "error")
 
     def __call__(self, text, level="info"):
-        asyncio.get_event_loop().call_soon(
-            self.master.addons.trigger, "log", LogEntry(text, level)
-        )
+        if self.enabled(level):
+            self.add(LogEntry(text, level))
 
 
 LogTierOrder = [
@@ -11,6 +11,7 @@ from seleniumwire.thirdparty.mitmproxy import (
     eventsequence,
     http,
     log,
+    metrics,
     options,
     websocket,
 )
@@ -43,6 +44,7 @@ class Master:
 
     def __init__(self, event_loop, opts):
         self.should_exit = threading.Event()
+        self.metrics = metrics.Metrics()
         self.channel = controller.Channel(
             self,
             event_loop,
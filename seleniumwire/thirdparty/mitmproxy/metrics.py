@@ -0,0 +1,200 @@
+"""
+    Counters, gauges and histograms describing what the proxy is doing.
+
+    Metrics are cheap to update from any thread and can be read either as a
+    dictionary with Metrics.snapshot() or in the Prometheus text exposition
+    format with Metrics.to_prometheus().
+"""
+import bisect
+import threading
+import time
+import typing
+
+# Upper bounds, in seconds, of the buckets used for timings.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class Counter:
+    type = "counter"
+
+    def __init__(self, name: str, help: str) -> None:
+        self.name = name
+        self.help = help
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+    def snapshot(self):
+        return self.value
+
+
+class Gauge:
+    type = "gauge"
+
+    def __init__(self, name: str, help: str, func: typing.Optional[typing.Callable[[], float]] = None) -> None:
+        """
+            Args:
+                func: When given, the value of the gauge is read from this function
+                    instead of being set with inc(), dec() or set().
+        """
+        self.name = name
+        self.help = help
+        self.func = func
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int = 1) -> None:
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: int = 1) -> None:
+        with self._lock:
+            self._value -= amount
+
+    def set(self, value: float) -> None:
+        self._value = value
+
+    @property
+    def value(self):
+        if self.func is not None:
+            return self.func()
+        return self._value
+
+    def snapshot(self):
+        return self.value
+
+
+class _Timer:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self.histogram.observe(time.perf_counter() - self.start)
+
+
+class Histogram:
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: typing.Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.sum += value
+            if value > self.max:
+                self.max = value
+
+    def time(self) -> _Timer:
+        """
+            Returns a context manager which observes the time taken by its body.
+        """
+        return _Timer(self)
+
+    def cumulative_counts(self) -> typing.List[int]:
+        with self._lock:
+            counts = self.counts[:]
+        for i in range(1, len(counts)):
+            counts[i] += counts[i - 1]
+        return counts
+
+    def snapshot(self):
+        with self._lock:
+            count, total, maximum = self.count, self.sum, self.max
+        return {
+            "count": count,
+            "sum": total,
+            "avg": total / count if count else 0.0,
+            "max": maximum,
+            "buckets": dict(zip(self.buckets + (float("inf"),), self.cumulative_counts())),
+        }
+
+
+class Metrics:
+    """
+        The metrics of a single proxy instance.
+    """
+
+    PREFIX = "seleniumwire_"
+
+    def __init__(self) -> None:
+        self._metrics: typing.Dict[str, typing.Union[Counter, Gauge, Histogram]] = {}
+
+        self.connections_accepted = self.add(Counter(
+            "connections_accepted_total", "Client connections accepted"))
+        self.connections_active = self.add(Gauge(
+            "connections_active", "Client connections currently being handled"))
+        self.threads = self.add(Gauge(
+            "threads", "Live threads in the process", func=threading.active_count))
+        self.client_bytes_received = self.add(Counter(
+            "client_bytes_received_total", "Bytes received from clients"))
+        self.client_bytes_sent = self.add(Counter(
+            "client_bytes_sent_total", "Bytes sent to clients"))
+        self.server_bytes_received = self.add(Counter(
+            "server_bytes_received_total", "Bytes received from servers"))
+        self.server_bytes_sent = self.add(Counter(
+            "server_bytes_sent_total", "Bytes sent to servers"))
+        self.requests_blocked = self.add(Counter(
+            "requests_blocked_total", "Requests and CONNECTs refused because their host is in block_hosts"))
+        self.tls_handshake_client = self.add(Histogram(
+            "tls_handshake_client_seconds", "Time taken by TLS handshakes with clients"))
+        self.tls_handshake_server = self.add(Histogram(
+            "tls_handshake_server_seconds", "Time taken by TLS handshakes with servers"))
+        self.cert_generation = self.add(Histogram(
+            "cert_generation_seconds", "Time taken to generate interception certificates"))
+        self.hook_dispatch = self.add(Histogram(
+            "hook_dispatch_seconds", "Time from an event being sent to the addons until they have handled it"))
+        self.hooks_pending = self.add(Gauge(
+            "hooks_pending", "Events sent to the addons which have not been handled yet"))
+        self.storage_write = self.add(Histogram(
+            "storage_write_seconds", "Time taken to write captured data to request storage"))
+
+    def add(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def snapshot(self) -> typing.Dict[str, typing.Any]:
+        """
+            Returns the current value of every metric, keyed by name.
+            Histograms are returned as a dictionary of count, sum, avg, max and
+            cumulative bucket counts.
+        """
+        return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+    def to_prometheus(self) -> str:
+        """
+            Returns the metrics in the Prometheus text exposition format.
+        """
+        lines = []
+        for metric in self._metrics.values():
+            name = self.PREFIX + metric.name
+            lines.append("# HELP {} {}".format(name, metric.help))
+            lines.append("# TYPE {} {}".format(name, metric.type))
+            if isinstance(metric, Histogram):
+                snapshot = metric.snapshot()
+                for bound, count in snapshot["buckets"].items():
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append('{}_bucket{{le="{}"}} {}'.format(name, le, count))
+                lines.append("{}_sum {}".format(name, snapshot["sum"]))
+                lines.append("{}_count {}".format(name, snapshot["count"]))
+            else:
+                lines.append("{} {}".format(name, metric.snapshot()))
+        return "\n".join(lines) + "\n"
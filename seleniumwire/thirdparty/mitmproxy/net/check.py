@@ -1,8 +1,11 @@
 import ipaddress
+import logging
 import re
 # Allow underscore in host name
 # Note: This could be a DNS label, a hostname, a FQDN, or an IP
-from typing import AnyStr
+from typing import Any, AnyStr, Dict, List, Tuple
+
+log = logging.getLogger(__name__)
 
 _label_valid = re.compile(br"[A-Z\d\-_]{1,63}$", re.IGNORECASE)
 
@@ -40,3 +43,177 @@ def is_valid_host(host: AnyStr) -> bool:
 
 def is_valid_port(port: int) -> bool:
     return 0 <= port <= 65535
+
+
+class HostSuffixMatcher:
+    """
+    Matches host names against a list of domains, where each domain also
+    matches its subdomains: "example.com" matches "example.com" and
+    "ads.example.com" but not "badexample.com".
+
+    The domains are held in a trie of their labels, last label first, so a
+    lookup takes one dictionary access per label of the host rather than a
+    comparison with every domain. IP addresses only match exactly.
+    """
+
+    _END = None  # Marks the end of a domain in the trie
+
+    def __init__(self, domains=()):
+        self.trie: dict = {}
+        self.addresses = set()
+
+        for domain in domains:
+            domain = domain.strip().lower().lstrip("*").strip(".")
+            if not domain:
+                continue
+            if is_address(domain):
+                self.addresses.add(str(ipaddress.ip_address(domain.strip("[]"))))
+                continue
+            node = self.trie
+            for label in reversed(domain.split(".")):
+                node = node.setdefault(label, {})
+            node[self._END] = True
+
+    def __call__(self, host: str) -> bool:
+        if not host:
+            return False
+        host = _normalize_host(host)
+        if host in self.addresses:
+            return True
+
+        node = self.trie
+        for label in reversed(host.split(".")):
+            node = node.get(label)
+            if node is None:
+                return False
+            if self._END in node:
+                return True
+        return False
+
+    def __bool__(self):
+        return bool(self.trie or self.addresses)
+
+
+class NoProxyMatcher:
+    """
+    Matches request addresses against a no_proxy list.
+
+    Entries are host names, which also match their subdomains ("example.com"
+    and ".example.com" both match "api.example.com"), IP addresses, networks
+    in CIDR notation ("10.0.0.0/8") or "*" for everything. Host names and
+    addresses may be followed by a port ("localhost:8080", "[::1]:8080"),
+    in which case only that port matches.
+
+    The list is compiled once: host names go into a trie of their labels,
+    last label first, whose end markers hold the ports allowed there (None
+    for any port), so a lookup is a dictionary access per label of the host.
+    """
+
+    _END = None  # Marks the end of a host name in the trie
+    _ANY_PORT = None
+
+    def __init__(self, entries=()):
+        self.match_all = False
+        self.trie: dict = {}
+        self.addresses: Dict[str, set] = {}
+        self.networks: List[Tuple[Any, set]] = []
+
+        for entry in entries:
+            try:
+                self._add(entry.strip().lower())
+            except ValueError as e:
+                # An entry that can't be understood matches nothing, as it always has,
+                # rather than stopping the proxy from starting
+                log.warning("Ignoring %s", e)
+
+    def _add(self, entry):
+        if not entry:
+            return
+        if entry == "*":
+            self.match_all = True
+            return
+        host, port = self._split_port(entry)
+        if "/" in host:
+            try:
+                network = ipaddress.ip_network(host, strict=False)
+            except ValueError:
+                raise ValueError("invalid network in no_proxy: {}".format(entry))
+            self.networks.append((network, {port}))
+            return
+        host = host.lstrip("*").strip(".")
+        if is_address(host):
+            self.addresses.setdefault(str(ipaddress.ip_address(host)), set()).add(port)
+            return
+        node = self.trie
+        for label in reversed(host.split(".")):
+            node = node.setdefault(label, {})
+        node.setdefault(self._END, set()).add(port)
+
+    @staticmethod
+    def _split_port(entry):
+        if entry.startswith("["):
+            host, _, rest = entry[1:].partition("]")
+            port = rest[1:] if rest.startswith(":") else None
+        elif entry.count(":") == 1:
+            host, port = entry.split(":")
+        else:
+            # A host without a port, or an IPv6 address without brackets
+            host, port = entry, None
+        if port is None:
+            return host, NoProxyMatcher._ANY_PORT
+        if not port.isdigit() or not is_valid_port(int(port)):
+            raise ValueError("invalid port in no_proxy: {}".format(entry))
+        return host, int(port)
+
+    def __call__(self, host: str, port: int) -> bool:
+        if self.match_all:
+            return True
+        if not host:
+            return False
+        host = _normalize_host(host)
+
+        ports = self.addresses.get(host)
+        if ports is not None and (self._ANY_PORT in ports or port in ports):
+            return True
+
+        if self.networks and is_address(host):
+            address = ipaddress.ip_address(host)
+            for network, ports in self.networks:
+                if address in network and (self._ANY_PORT in ports or port in ports):
+                    return True
+
+        node = self.trie
+        for label in reversed(host.split(".")):
+            node = node.get(label)
+            if node is None:
+                return False
+            # Keep walking on a port mismatch, as a longer entry may allow the port
+            ports = node.get(self._END)
+            if ports is not None and (self._ANY_PORT in ports or port in ports):
+                return True
+        return False
+
+    def __bool__(self):
+        return bool(self.match_all or self.trie or self.addresses or self.networks)
+
+
+def _normalize_host(host: str) -> str:
+    host = host.lower().rstrip(".").strip("[]")
+    if ":" in host:
+        # IPv6 addresses can be written several ways, so compare them in one form
+        try:
+            host = str(ipaddress.ip_address(host))
+        except ValueError:
+            pass
+    return host
+
+
+def is_address(host: str) -> bool:
+    """
+    Checks if the passed string is an IPv4 or IPv6 address (optionally in brackets).
+    """
+    try:
+        ipaddress.ip_address(host.strip("[]"))
+        return True
+    except ValueError:
+        return False
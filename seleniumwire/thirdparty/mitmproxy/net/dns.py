@@ -0,0 +1,177 @@
+"""
+A caching resolver for server addresses.
+
+Every server connection used to call getaddrinfo() itself, blocking its
+thread on a lookup of a host the proxy had resolved moments before. The
+resolver here is shared by all server connections. It remembers answers for
+a time to live (and failures for a shorter one), makes a single lookup when
+several connections want the same host at once, can map hosts onto other
+hosts or addresses, and can resolve hosts in advance.
+
+getaddrinfo() doesn't report the TTL of the DNS records, so the same TTL is
+used for every host.
+"""
+import socket
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, Iterable, List
+
+from seleniumwire.thirdparty.mitmproxy.coretypes import basethread
+from seleniumwire.thirdparty.mitmproxy.net.check import is_address
+
+
+def parse_overrides(specs: Iterable[str]) -> Dict[str, str]:
+    """
+    Parse host overrides of the form "host=address".
+
+    Raises:
+        ValueError, if a spec is not of that form.
+    """
+    overrides = {}
+    for spec in specs:
+        host, sep, target = spec.partition("=")
+        if not sep or not host.strip() or not target.strip():
+            raise ValueError("Invalid DNS override, expected host=address: {}".format(spec))
+        overrides[host.strip().lower().rstrip(".")] = target.strip()
+    return overrides
+
+
+class Resolver:
+    """
+    Resolves host names with getaddrinfo(), caching the results.
+
+    Args:
+        ttl: Seconds to cache successful lookups for. 0 disables caching.
+        negative_ttl: Seconds to cache failed lookups for.
+        overrides: Host names mapped to the address (or other host name)
+            they should resolve to.
+        max_size: The number of hosts to hold answers for.
+    """
+
+    # The most lookups prefetch() makes at once
+    PREFETCH_WORKERS = 4
+
+    def __init__(self, ttl=60, negative_ttl=5, overrides=None, max_size=4096):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.overrides: Dict[str, str] = dict(overrides or {})
+        self.max_size = max_size
+        # (host, family, type) -> (expiry time, addrinfo list or gaierror)
+        self._cache: Dict[tuple, tuple] = {}
+        # Lookups in progress, which other threads wanting the same host wait on
+        self._inflight: Dict[tuple, Future] = {}
+        self._lock = threading.Lock()
+        self._prefetcher = basethread.WorkerPool("DNS prefetch", idle_timeout=10, max_workers=self.PREFETCH_WORKERS)
+
+    def getaddrinfo(self, host, port, family=0, type=0, proto=0, flags=0):
+        """
+        A drop-in replacement for socket.getaddrinfo().
+        """
+        if isinstance(host, bytes):
+            host = host.decode("idna")
+        name = host.lower().rstrip(".")
+        target = self.overrides.get(name, host)
+
+        if is_address(target):
+            # Nothing to look up, so nothing to cache
+            return socket.getaddrinfo(target, port, family, type, proto, flags)
+
+        results = self._lookup(target, family, type)
+
+        return [
+            (af, socktype, sproto, canonname, (sockaddr[0], port) + sockaddr[2:])
+            for af, socktype, sproto, canonname, sockaddr in results
+            if not proto or sproto == proto
+        ]
+
+    def prefetch(self, hosts: Iterable[str]) -> None:
+        """
+        Resolve hosts in the background, so that their answers are cached by
+        the time connections are made to them.
+        """
+        for host in hosts:
+            self._prefetcher.submit(self._prefetch, host)
+
+    def _prefetch(self, host):
+        try:
+            self.getaddrinfo(host, 0, 0, socket.SOCK_STREAM)
+        except OSError:
+            pass
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    def _lookup(self, host, family, type):
+        key = (host.lower().rstrip("."), family, type)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and entry[0] > now:
+                return _result(entry[1])
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+
+        if not owner:
+            return _result(future.result())
+
+        try:
+            result = socket.getaddrinfo(host, None, family, type)
+            ttl = self.ttl
+        except socket.gaierror as e:
+            result = e
+            ttl = self.negative_ttl
+        except BaseException as e:
+            # Not an answer from DNS (e.g. interrupted), so don't cache it
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            del self._inflight[key]
+            if ttl > 0:
+                self._store(key, (time.monotonic() + ttl, result))
+        future.set_result(result)
+
+        return _result(result)
+
+    def _store(self, key, entry):
+        if key not in self._cache and len(self._cache) >= self.max_size:
+            now = time.monotonic()
+            for k in [k for k, (expires, _) in self._cache.items() if expires <= now]:
+                del self._cache[k]
+            if len(self._cache) >= self.max_size:
+                # Drop the oldest answer
+                del self._cache[next(iter(self._cache))]
+        self._cache[key] = entry
+
+
+def _result(result):
+    if isinstance(result, socket.gaierror):
+        # A new exception each time, so that tracebacks don't accumulate on a shared instance
+        raise socket.gaierror(*result.args)
+    return result
+
+
+def interleave(addrinfos: List[tuple]) -> List[tuple]:
+    """
+    Reorder addresses so that the address families alternate, keeping the
+    resolver's order within each family and starting with the family of the
+    first address (RFC 8305, section 4).
+    """
+    by_family: Dict[int, List[tuple]] = {}
+    for addrinfo in addrinfos:
+        by_family.setdefault(addrinfo[0], []).append(addrinfo)
+    queues = list(by_family.values())
+    result = []
+    while queues:
+        for queue in list(queues):
+            result.append(queue.pop(0))
+            if not queue:
+                queues.remove(queue)
+    return result
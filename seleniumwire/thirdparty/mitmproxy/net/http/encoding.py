@@ -7,10 +7,10 @@ import collections
 import gzip
 import zlib
 from io import BytesIO
-from typing import AnyStr, Optional, Union, overload  # noqa
+from typing import AnyStr, Iterable, Iterator, List, Optional, Union, overload  # noqa
 
-import brotli
-import zstandard as zstd
+# brotli and zstandard are imported by the functions that use them, so that
+# they are only loaded once a response with one of those encodings is seen.
 
 # We have a shared single-element cache for encoding and decoding.
 # This is quite useful in practice, e.g.
@@ -19,31 +19,41 @@ import zstandard as zstd
 CachedDecode = collections.namedtuple("CachedDecode", "encoded encoding errors decoded")
 _cache = CachedDecode(None, None, None, None)
 
+# The encodings that compress, and so may decode to far more than their input
+_compressed = ("gzip", "deflate", "deflateRaw", "br", "zstd")
+
 
 @overload
-def decode(encoded: None, encoding: str, errors: str = 'strict') -> None:
+def decode(encoded: None, encoding: str, errors: str = 'strict', max_size: Optional[int] = None) -> None:
     ...
 
 
 @overload
-def decode(encoded: str, encoding: str, errors: str = 'strict') -> str:
+def decode(encoded: str, encoding: str, errors: str = 'strict', max_size: Optional[int] = None) -> str:
     ...
 
 
 @overload
-def decode(encoded: bytes, encoding: str, errors: str = 'strict') -> Union[str, bytes]:
+def decode(
+    encoded: bytes, encoding: str, errors: str = 'strict', max_size: Optional[int] = None
+) -> Union[str, bytes]:
     ...
 
 
-def decode(encoded: Union[None, str, bytes], encoding: str, errors: str = 'strict') -> Union[None, str, bytes]:
+def decode(
+    encoded: Union[None, str, bytes], encoding: str, errors: str = 'strict', max_size: Optional[int] = None
+) -> Union[None, str, bytes]:
     """
     Decode the given input object
 
+    Args:
+        max_size: The most bytes that a compressed input may decode to.
+
     Returns:
         The decoded value
 
     Raises:
-        ValueError, if decoding fails.
+        ValueError, if decoding fails or more than max_size bytes would be produced.
     """
     if encoded is None:
         return None
@@ -56,13 +66,18 @@ def decode(encoded: Union[None, str, bytes], encoding: str, errors: str = 'stric
         and _cache.errors == errors
     )
     if cached:
+        if max_size is not None and len(_cache.decoded) > max_size:
+            raise ValueError("Decoded body exceeds limit of {} bytes".format(max_size))
         return _cache.decoded
     try:
         try:
-            decoded = custom_decode[encoding](encoded)
+            if max_size is not None and encoding in _compressed and isinstance(encoded, bytes):
+                decoded = b"".join(decode_chunks([encoded], encoding, max_size))
+            else:
+                decoded = custom_decode[encoding](encoded)
         except KeyError:
             decoded = codecs.decode(encoded, encoding, errors)  # type: ignore
-        if encoding in ("gzip", "deflate", "br", "zstd"):
+        if encoding in _compressed:
             _cache = CachedDecode(encoded, encoding, errors, decoded)
         return decoded
     except TypeError:
@@ -120,7 +135,7 @@ def encode(decoded: Union[None, str, bytes], encoding, errors='strict') -> Union
             encoded = custom_encode[encoding](decoded)
         except KeyError:
             encoded = codecs.encode(decoded, encoding, errors)  # type: ignore
-        if encoding in ("gzip", "deflate", "br", "zstd"):
+        if encoding in _compressed:
             _cache = CachedDecode(encoded, encoding, errors, decoded)
         return encoded
     except TypeError:
@@ -162,26 +177,34 @@ def encode_gzip(content: bytes) -> bytes:
 def decode_brotli(content: bytes) -> bytes:
     if not content:
         return b""
+    import brotli
+
     return brotli.decompress(content)
 
 
 def encode_brotli(content: bytes) -> bytes:
+    import brotli
+
     return brotli.compress(content)
 
 
 def decode_zstd(content: bytes) -> bytes:
     if not content:
         return b""
+    import zstandard as zstd
+
     zstd_ctx = zstd.ZstdDecompressor()
     try:
         return zstd_ctx.decompress(content)
     except zstd.ZstdError:
         # If the zstd stream is streamed without a size header,
-        # try decoding with a 10MiB output buffer
-        return zstd_ctx.decompress(content, max_output_size=10 * 2 ** 20)
+        # fall back to decompressing incrementally.
+        return b"".join(decode_chunks([content], "zstd"))
 
 
 def encode_zstd(content: bytes) -> bytes:
+    import zstandard as zstd
+
     zstd_ctx = zstd.ZstdCompressor()
     return zstd_ctx.compress(content)
 
@@ -210,6 +233,281 @@ def encode_deflate(content: bytes) -> bytes:
     return zlib.compress(content)
 
 
+class StreamDecoder:
+    """
+    Incrementally decode a body that arrives in chunks.
+
+    Call decode() with each chunk as it is received and flush() once the
+    body is complete. The total decoded output is bounded by max_size, so
+    that a small compressed payload cannot inflate without limit.
+    """
+
+    def __init__(self, max_size: Optional[int] = None) -> None:
+        self.max_size = max_size
+        self.received_size = 0
+        self.decoded_size = 0
+
+    def decode(self, chunk: bytes) -> bytes:
+        """
+        Decode the next chunk of the body.
+
+        Raises:
+            ValueError, if decoding fails or the output budget is exceeded.
+        """
+        self.received_size += len(chunk)
+        try:
+            decoded = self._decode(chunk)
+        except ValueError:
+            raise
+        except Exception as e:
+            raise ValueError("{} when decoding chunk: {}".format(type(e).__name__, repr(e)))
+        return self._count(decoded)
+
+    def flush(self) -> bytes:
+        """
+        Return any remaining decoded data once the body is complete.
+
+        Raises:
+            ValueError, if the body was truncated or the output budget is exceeded.
+        """
+        try:
+            decoded = self._flush()
+        except ValueError:
+            raise
+        except Exception as e:
+            raise ValueError("{} when flushing decoder: {}".format(type(e).__name__, repr(e)))
+        return self._count(decoded)
+
+    def _remaining(self, pending: int = 0) -> int:
+        """
+        The maximum output a decompressor call may produce, or 0 for no limit.
+        """
+        if self.max_size is None:
+            return 0
+        # Allow one byte more than the budget so that overflow is detectable.
+        return max(self.max_size - self.decoded_size - pending, 0) + 1
+
+    def _count(self, decoded: bytes) -> bytes:
+        self.decoded_size += len(decoded)
+        if self.max_size is not None and self.decoded_size > self.max_size:
+            raise ValueError("Decoded body exceeds limit of {} bytes".format(self.max_size))
+        return decoded
+
+    def _decode(self, chunk: bytes) -> bytes:
+        return chunk
+
+    def _flush(self) -> bytes:
+        return b""
+
+
+class _ZlibStreamDecoder(StreamDecoder):
+    wbits = zlib.MAX_WBITS
+
+    def __init__(self, max_size: Optional[int] = None) -> None:
+        super().__init__(max_size)
+        self._obj = zlib.decompressobj(self.wbits)
+
+    def _decode(self, chunk: bytes) -> bytes:
+        out = []
+        pending = 0
+        data = chunk
+        while data:
+            decoded = self._obj.decompress(data, self._remaining(pending))
+            out.append(decoded)
+            pending += len(decoded)
+            if self._obj.unconsumed_tail:
+                # Output was cut short because the budget is used up,
+                # which _count() will report.
+                break
+            elif self._obj.eof and self._obj.unused_data:
+                # Concatenated members, e.g. multi-member gzip.
+                data = self._obj.unused_data
+                self._obj = zlib.decompressobj(self.wbits)
+            else:
+                data = b""
+        return b"".join(out)
+
+    def _flush(self) -> bytes:
+        if self.received_size and not self._obj.eof:
+            raise ValueError("Compressed stream ended before the end-of-stream marker")
+        return self._obj.flush()
+
+
+class GzipStreamDecoder(_ZlibStreamDecoder):
+    wbits = 16 + zlib.MAX_WBITS
+
+
+class DeflateStreamDecoder(_ZlibStreamDecoder):
+    """
+    Like decode_deflate(), this falls back to raw DEFLATE when the data does
+    not start with a zlib header.
+    """
+
+    def __init__(self, max_size: Optional[int] = None) -> None:
+        super().__init__(max_size)
+        # Data seen before the zlib header has been validated,
+        # kept so that it can be replayed as raw DEFLATE.
+        self._head: Optional[bytes] = b""
+
+    def _decode(self, chunk: bytes) -> bytes:
+        if self._head is None:
+            return super()._decode(chunk)
+        self._head += chunk
+        try:
+            decoded = super()._decode(chunk)
+        except zlib.error:
+            self.wbits = -zlib.MAX_WBITS
+            self._obj = zlib.decompressobj(self.wbits)
+            chunk, self._head = self._head, None
+            return super()._decode(chunk)
+        if len(self._head) >= 2:
+            self._head = None
+        return decoded
+
+
+class BrotliStreamDecoder(StreamDecoder):
+    # The input fed at a time to versions of brotli without output_buffer_limit
+    slice_size = 256
+
+    def __init__(self, max_size: Optional[int] = None) -> None:
+        super().__init__(max_size)
+        import brotli
+
+        self._obj = brotli.Decompressor()
+
+    def _decode(self, chunk: bytes) -> bytes:
+        if self.max_size is None:
+            return self._obj.process(chunk)
+        if not hasattr(self._obj, "can_accept_more_data"):
+            return self._decode_slices(chunk)
+        out = [self._obj.process(chunk, output_buffer_limit=self._remaining())]
+        pending = len(out[0])
+        # Output held back by the limit is drained with empty input, and
+        # left undrained once the budget is used up, which _count() will report.
+        while not self._obj.can_accept_more_data() and self._remaining(pending) > 1:
+            decoded = self._obj.process(b"", output_buffer_limit=self._remaining(pending))
+            if not decoded:
+                break
+            out.append(decoded)
+            pending += len(decoded)
+        return b"".join(out)
+
+    def _decode_slices(self, chunk: bytes) -> bytes:
+        # Brotli before 1.2 cannot limit its output, so feed it a little
+        # input at a time and stop once the budget is used up.
+        out = []
+        pending = 0
+        view = memoryview(chunk)
+        for start in range(0, len(view), self.slice_size):
+            end = start + self.slice_size
+            decoded = self._obj.process(view[start:end].tobytes())
+            out.append(decoded)
+            pending += len(decoded)
+            if self._remaining(pending) <= 1:
+                break
+        return b"".join(out)
+
+    def _flush(self) -> bytes:
+        if self.received_size and not self._obj.is_finished():
+            raise ValueError("Compressed stream ended before the end-of-stream marker")
+        return b""
+
+
+class _OutputLimitReached(Exception):
+    pass
+
+
+class _ZstdOutput:
+    """
+    Collects the output of a zstandard stream writer, stopping the
+    decompressor once more than limit bytes have been written.
+    """
+
+    def __init__(self) -> None:
+        self.chunks: List[bytes] = []
+        self.size = 0
+        self.limit = 0
+
+    def write(self, data: bytes) -> int:
+        self.chunks.append(data)
+        self.size += len(data)
+        if self.limit and self.size >= self.limit:
+            raise _OutputLimitReached()
+        return len(data)
+
+    def take(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        self.size = 0
+        return data
+
+
+class ZstdStreamDecoder(StreamDecoder):
+    # The most output produced by the decompressor before the budget is checked
+    write_size = 128 * 1024
+
+    def __init__(self, max_size: Optional[int] = None) -> None:
+        super().__init__(max_size)
+        import zstandard
+
+        self._output = _ZstdOutput()
+        # Unlike decompressobj(), the stream writer hands over its output
+        # as it is produced and decodes concatenated frames.
+        self._obj = zstandard.ZstdDecompressor().stream_writer(self._output, write_size=self.write_size)
+
+    def _decode(self, chunk: bytes) -> bytes:
+        self._output.limit = self._remaining()
+        try:
+            self._obj.write(chunk)
+        except _OutputLimitReached:
+            # Decoding stopped because the budget is used up,
+            # which _count() will report.
+            pass
+        return self._output.take()
+
+
+stream_decoders = {
+    "none": StreamDecoder,
+    "identity": StreamDecoder,
+    "gzip": GzipStreamDecoder,
+    "deflate": DeflateStreamDecoder,
+    "deflateRaw": DeflateStreamDecoder,
+    "br": BrotliStreamDecoder,
+    "zstd": ZstdStreamDecoder,
+}
+
+
+def stream_decoder(encoding: str, max_size: Optional[int] = None) -> StreamDecoder:
+    """
+    Get an incremental decoder for the given content encoding.
+
+    Raises:
+        ValueError, if the encoding is not supported.
+    """
+    try:
+        return stream_decoders[encoding](max_size)
+    except KeyError:
+        raise ValueError("Unsupported content encoding: {}".format(repr(encoding)))
+
+
+def decode_chunks(chunks: Iterable[bytes], encoding: str, max_size: Optional[int] = None) -> Iterator[bytes]:
+    """
+    Decode an iterable of body chunks, e.g. as yielded by http1.read_body(),
+    without holding the whole compressed or decompressed body in memory.
+
+    Raises:
+        ValueError, if decoding fails or more than max_size bytes would be produced.
+    """
+    decoder = stream_decoder(encoding, max_size)
+    for chunk in chunks:
+        decoded = decoder.decode(chunk)
+        if decoded:
+            yield decoded
+    decoded = decoder.flush()
+    if decoded:
+        yield decoded
+
+
 custom_decode = {
     "none": identity,
     "identity": identity,
@@ -229,4 +527,4 @@ custom_encode = {
     "zstd": encode_zstd,
 }
 
-__all__ = ["encode", "decode"]
+__all__ = ["encode", "decode", "stream_decoder", "decode_chunks"]
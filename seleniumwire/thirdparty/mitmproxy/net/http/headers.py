@@ -109,6 +109,9 @@ class Headers(multidict.MultiDict):
         key = _always_bytes(key)
         super().__delitem__(key)
 
+    def __contains__(self, key):
+        return super().__contains__(_always_bytes(key))
+
     def __iter__(self):
         for x in super().__iter__():
             yield _native(x)
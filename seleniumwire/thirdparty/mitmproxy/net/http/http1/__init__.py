@@ -1,14 +1,15 @@
-from .assemble import assemble_body, assemble_request, assemble_request_head, assemble_response, assemble_response_head
-from .read import (connection_close, expected_http_body_size, read_body, read_request, read_request_head,
-                   read_response, read_response_head)
+from .assemble import (assemble_body, assemble_body_buffers, assemble_request, assemble_request_head, assemble_response,
+                       assemble_response_buffers, assemble_response_head)
+from .read import (connection_close, expected_http_body_size, read_body, read_body_content, read_request,
+                   read_request_head, read_response, read_response_head)
 
 __all__ = [
     "read_request", "read_request_head",
     "read_response", "read_response_head",
-    "read_body",
+    "read_body", "read_body_content",
     "connection_close",
     "expected_http_body_size",
     "assemble_request", "assemble_request_head",
-    "assemble_response", "assemble_response_head",
-    "assemble_body",
+    "assemble_response", "assemble_response_head", "assemble_response_buffers",
+    "assemble_body", "assemble_body_buffers",
 ]
@@ -23,6 +23,19 @@ def assemble_response(response):
     return head + body
 
 
+def assemble_response_buffers(response):
+    """
+    Like assemble_response(), but returns the head and body as a list of
+    buffers suitable for a single vectored write, so that the body is not
+    copied.
+    """
+    if response.data.content is None:
+        raise exceptions.HttpException("Cannot assemble flow with missing content")
+    buffers = [assemble_response_head(response)]
+    buffers.extend(assemble_body_buffers(response.data.headers, [response.data.content], response.data.trailers))
+    return buffers
+
+
 def assemble_response_head(response):
     first_line = _assemble_response_line(response.data)
     headers = _assemble_response_headers(response.data)
@@ -45,6 +58,27 @@ def assemble_body(headers, body_chunks, trailers):
             yield chunk
 
 
+def assemble_body_buffers(headers, body_chunks, trailers):
+    """
+    Like assemble_body(), but chunked transfer-encoding framing is yielded
+    separately from each chunk rather than copied together with it.
+    """
+    if "chunked" in headers.get("transfer-encoding", "").lower():
+        for chunk in body_chunks:
+            if chunk:
+                yield b"%x\r\n" % len(chunk)
+                yield chunk
+                yield b"\r\n"
+        if trailers:
+            yield b"0\r\n%s\r\n" % trailers
+        else:
+            yield b"0\r\n\r\n"
+    else:
+        if trailers:
+            raise exceptions.HttpException("Sending HTTP/1.1 trailer headers requires transfer-encoding: chunked")
+        yield from body_chunks
+
+
 def _assemble_request_line(request_data):
     """
     Args:
@@ -1,3 +1,4 @@
+import io
 import re
 import sys
 import time
@@ -8,6 +9,19 @@ from seleniumwire.thirdparty.mitmproxy.net.http import (headers, request,
                                                         response, url)
 
 
+# Bounds for the size of the chunks yielded by read_body() when no fixed size is given.
+MIN_CHUNK_SIZE = 4096
+MAX_CHUNK_SIZE = 1024 * 1024
+
+# The most memory allocated up front for a body of known size, as the size comes
+# from the peer. The buffer grows as the rest of the body arrives.
+MAX_PREALLOCATE_SIZE = 1024 * 1024
+
+# The maximum number of bytes peeked at when looking for the end of a message head.
+# Heads that are larger than this are parsed line by line.
+HEAD_PEEK_SIZE = 64 * 1024
+
+
 def get_header_tokens(headers, key):
     """
         Retrieve all tokens for a header key. A number of different headers
@@ -23,7 +37,7 @@ def get_header_tokens(headers, key):
 def read_request(rfile, body_size_limit=None):
     request = read_request_head(rfile)
     expected_body_size = expected_http_body_size(request)
-    request.data.content = b"".join(read_body(rfile, expected_body_size, limit=body_size_limit))
+    request.data.content = read_body_content(rfile, expected_body_size, limit=body_size_limit)
     request.timestamp_end = time.time()
     return request
 
@@ -47,8 +61,13 @@ def read_request_head(rfile):
     if hasattr(rfile, "reset_timestamps"):
         rfile.reset_timestamps()
 
-    host, port, method, scheme, authority, path, http_version = _read_request_line(rfile)
-    headers = _read_headers(rfile)
+    head = _read_head(rfile)
+    if head is not None:
+        line, headers = head
+        host, port, method, scheme, authority, path, http_version = _parse_request_line(line)
+    else:
+        host, port, method, scheme, authority, path, http_version = _read_request_line(rfile)
+        headers = _read_headers(rfile)
 
     if hasattr(rfile, "first_byte_timestamp"):
         # more accurate timestamp_start
@@ -62,7 +81,7 @@ def read_request_head(rfile):
 def read_response(rfile, request, body_size_limit=None):
     response = read_response_head(rfile)
     expected_body_size = expected_http_body_size(request, response)
-    response.data.content = b"".join(read_body(rfile, expected_body_size, body_size_limit))
+    response.data.content = read_body_content(rfile, expected_body_size, body_size_limit)
     response.timestamp_end = time.time()
     return response
 
@@ -87,8 +106,13 @@ def read_response_head(rfile):
     if hasattr(rfile, "reset_timestamps"):
         rfile.reset_timestamps()
 
-    http_version, status_code, message = _read_response_line(rfile)
-    headers = _read_headers(rfile)
+    head = _read_head(rfile)
+    if head is not None:
+        line, headers = head
+        http_version, status_code, message = _parse_response_line(line)
+    else:
+        http_version, status_code, message = _read_response_line(rfile)
+        headers = _read_headers(rfile)
 
     if hasattr(rfile, "first_byte_timestamp"):
         # more accurate timestamp_start
@@ -97,15 +121,17 @@ def read_response_head(rfile):
     return response.Response(http_version, status_code, message, headers, None, None, timestamp_start, None)
 
 
-def read_body(rfile, expected_size, limit=None, max_chunk_size=4096):
+def read_body(rfile, expected_size, limit=None, max_chunk_size=None):
     """
-        Read an HTTP message body
+        Read an HTTP message body in chunks
 
         Args:
             rfile: The input stream
             expected_size: The expected body size (see :py:meth:`expected_body_size`)
             limit: Maximum body size
-            max_chunk_size: Maximium chunk size that gets yielded
+            max_chunk_size: Maximium chunk size that gets yielded. If not specified,
+                each chunk is whatever has arrived, and may be up to MAX_CHUNK_SIZE
+                while data arrives faster than it is consumed.
 
         Returns:
             A generator that yields byte chunks of the content.
@@ -118,8 +144,10 @@ def read_body(rfile, expected_size, limit=None, max_chunk_size=4096):
     """
     if not limit or limit < 0:
         limit = sys.maxsize
-    if not max_chunk_size:
-        max_chunk_size = limit
+    if max_chunk_size:
+        chunk_sizer = _FixedChunkSize(max_chunk_size)
+    else:
+        chunk_sizer = _AdaptiveChunkSize()
 
     if expected_size is None:
         for x in _read_chunked(rfile, limit):
@@ -132,26 +160,107 @@ def read_body(rfile, expected_size, limit=None, max_chunk_size=4096):
             )
         bytes_left = expected_size
         while bytes_left:
-            chunk_size = min(bytes_left, max_chunk_size)
-            content = rfile.read(chunk_size)
-            if len(content) < chunk_size:
+            chunk_size = min(bytes_left, chunk_sizer.size)
+            content = chunk_sizer.read(rfile, chunk_size)
+            if not content or (chunk_sizer.exact and len(content) < chunk_size):
                 raise exceptions.HttpException("Unexpected EOF")
             yield content
-            bytes_left -= chunk_size
+            bytes_left -= len(content)
     else:
         bytes_left = limit
         while bytes_left:
-            chunk_size = min(bytes_left, max_chunk_size)
-            content = rfile.read(chunk_size)
+            chunk_size = min(bytes_left, chunk_sizer.size)
+            content = chunk_sizer.read(rfile, chunk_size)
             if not content:
                 return
             yield content
-            bytes_left -= chunk_size
+            bytes_left -= len(content)
         not_done = rfile.read(1)
         if not_done:
             raise exceptions.HttpException("HTTP body too large. Limit is {}.".format(limit))
 
 
+def read_body_content(rfile, expected_size, limit=None):
+    """
+        Read a whole HTTP message body.
+
+        When the body size is known in advance, the body is read straight into
+        a buffer rather than assembled from chunks. The buffer starts at no more
+        than MAX_PREALLOCATE_SIZE and doubles as it fills, so that a large
+        advertised size costs nothing until the data actually arrives.
+
+        Args:
+            rfile: The input stream
+            expected_size: The expected body size (see :py:meth:`expected_body_size`)
+            limit: Maximum body size
+
+        Returns:
+            The body as bytes.
+
+        Raises:
+            exceptions.HttpException, if an error occurs
+    """
+    if not expected_size or expected_size < 0 or not hasattr(rfile, "readinto"):
+        return b"".join(read_body(rfile, expected_size, limit))
+    if limit and 0 < limit < expected_size:
+        raise exceptions.HttpException(
+            "HTTP Body too large. "
+            "Limit is {}, content length was advertised as {}".format(limit, expected_size)
+        )
+    # BytesIO holds its contents in a bytes object, which getvalue() returns
+    # without copying once the buffer is full and no longer exported.
+    buf = io.BytesIO()
+    received = 0
+    size = min(expected_size, MAX_PREALLOCATE_SIZE)
+    while True:
+        buf.seek(size - 1)
+        buf.write(b"\0")
+        with buf.getbuffer() as view:
+            with view[received:size] as free:
+                n = rfile.readinto(free)
+        received += n
+        if received < size:
+            raise exceptions.HttpException("Unexpected EOF")
+        if size == expected_size:
+            return buf.getvalue()
+        size = min(size * 2, expected_size)
+
+
+class _FixedChunkSize:
+    # Reads return the full length unless the stream has ended
+    exact = True
+
+    def __init__(self, size):
+        self.size = size
+
+    def read(self, rfile, length):
+        return rfile.read(length)
+
+
+class _AdaptiveChunkSize:
+    """
+        Reads whatever has already arrived, up to the chunk size, so that a
+        streamed body is passed on as soon as any of it arrives. The chunk size
+        grows while reads come back full, i.e. while data is arriving faster
+        than it is being consumed, and shrinks again when they come back short.
+    """
+
+    exact = False
+
+    def __init__(self):
+        self.size = MIN_CHUNK_SIZE
+
+    def read(self, rfile, length):
+        if not hasattr(rfile, "read_available"):
+            return rfile.read(length)
+        content = rfile.read_available(length)
+        if len(content) == self.size:
+            self.size = min(self.size * 2, MAX_CHUNK_SIZE)
+        elif len(content) < self.size // 4:
+            self.size = max(self.size // 2, MIN_CHUNK_SIZE)
+        return content
+
+
 def connection_close(http_version, headers):
     """
         Checks the message to see if the client connection should be closed
@@ -236,6 +345,52 @@ def _get_first_line(rfile):
     return line.strip()
 
 
+def _read_head(rfile):
+    """
+        Read a complete message head (first line and headers) in one go.
+
+        The bytes available on the connection are peeked at and, if they
+        contain the whole head, the head is consumed with a single read and
+        split in a single pass, rather than read and parsed line by line.
+
+        Returns:
+            A (first line, headers object) tuple, or None if the head is not
+            yet available in full, uses bare LF line endings or obsolete line
+            folding, or the input stream can't be peeked into. In that case
+            nothing has been consumed and the line-by-line parser must be used.
+
+        Raises:
+            exceptions.HttpSyntaxException
+    """
+    try:
+        data = rfile.peek(HEAD_PEEK_SIZE)
+    except (AttributeError, NotImplementedError, exceptions.TcpException, exceptions.TlsException):
+        return None
+
+    end = data.find(b"\r\n\r\n")
+    if end <= 0 or data.startswith(b"\n") or data.startswith(b"\r\n"):
+        return None
+
+    head = data[:end]
+    lines = head.split(b"\r\n")
+    if head.count(b"\n") != len(lines) - 1 or b"\n " in head or b"\n\t" in head:
+        # Bare LF or obsolete line folding
+        return None
+
+    rfile.read(end + 4)
+
+    fields = []
+    for line in lines[1:]:
+        name, sep, value = line.partition(b":")
+        if not sep or not name:
+            raise exceptions.HttpSyntaxException(
+                "Invalid header line: %s" % repr(line + b"\r\n")
+            )
+        fields.append((name, value.strip()))
+
+    return lines[0].strip(), headers.Headers(fields)
+
+
 def _read_request_line(rfile):
     try:
         line = _get_first_line(rfile)
@@ -243,6 +398,10 @@ def _read_request_line(rfile):
         # We want to provide a better error message.
         raise exceptions.HttpReadDisconnect("Client disconnected")
 
+    return _parse_request_line(line)
+
+
+def _parse_request_line(line):
     try:
         method, target, http_version = line.split()
 
@@ -285,6 +444,10 @@ def _read_response_line(rfile):
         # We want to provide a better error message.
         raise exceptions.HttpReadDisconnect("Server disconnected")
 
+    return _parse_response_line(line)
+
+
+def _parse_response_line(line):
     try:
         parts = line.split(None, 2)
         if len(parts) == 2:  # handle missing message gracefully
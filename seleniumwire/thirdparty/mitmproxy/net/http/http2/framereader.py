@@ -1,7 +1,5 @@
 import codecs
 
-import hyperframe.frame
-
 from seleniumwire.thirdparty.mitmproxy import exceptions
 
 
@@ -17,6 +15,8 @@ def read_raw_frame(rfile):
 
 
 def parse_frame(header, body=None):
+    import hyperframe.frame
+
     if body is None:
         body = header[9:]
         header = header[:9]
@@ -117,12 +117,16 @@ class Message(serializable.Serializable):
     def raw_content(self, content: Optional[bytes]) -> None:
         self.data.content = content
 
-    def get_content(self, strict: bool = True) -> Optional[bytes]:
+    def get_content(self, strict: bool = True, max_size: Optional[int] = None) -> Optional[bytes]:
         """
         The uncompressed HTTP message body as bytes.
 
+        Args:
+            max_size: The most bytes that a compressed body may decode to.
+
         Raises:
-            ValueError, when the HTTP content-encoding is invalid and strict is True.
+            ValueError, when the HTTP content-encoding is invalid or the body
+            decodes to more than max_size bytes, and strict is True.
 
         See also: :py:class:`raw_content`, :py:attr:`text`
         """
@@ -131,7 +135,7 @@ class Message(serializable.Serializable):
         ce = self.headers.get("content-encoding")
         if ce:
             try:
-                content = encoding.decode(self.raw_content, ce)
+                content = encoding.decode(self.raw_content, ce, max_size=max_size)
                 # A client may illegally specify a byte -> str encoding here (e.g. utf8)
                 if isinstance(content, str):
                     raise ValueError("Invalid Content-Encoding: {}".format(ce))
@@ -215,16 +219,20 @@ class Message(serializable.Serializable):
 
         return enc
 
-    def get_text(self, strict: bool = True) -> Optional[str]:
+    def get_text(self, strict: bool = True, max_size: Optional[int] = None) -> Optional[str]:
         """
         The uncompressed and decoded HTTP message body as text.
 
+        Args:
+            max_size: The most bytes that a compressed body may decode to.
+
         Raises:
-            ValueError, when either content-encoding or charset is invalid and strict is True.
+            ValueError, when either content-encoding or charset is invalid, or the
+            body decodes to more than max_size bytes, and strict is True.
 
         See also: :py:attr:`content`, :py:class:`raw_content`
         """
-        content = self.get_content(strict)
+        content = self.get_content(strict, max_size)
         if content is None:
             return None
         enc = self._guess_encoding(content)
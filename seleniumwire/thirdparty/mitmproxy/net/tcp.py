@@ -1,6 +1,7 @@
 import errno
 import os
 import select
+import selectors
 import socket
 import sys
 import threading
@@ -12,7 +13,7 @@ from OpenSSL import SSL
 
 from seleniumwire.thirdparty.mitmproxy import certs, exceptions
 from seleniumwire.thirdparty.mitmproxy.coretypes import basethread
-from seleniumwire.thirdparty.mitmproxy.net import tls
+from seleniumwire.thirdparty.mitmproxy.net import dns, tls
 
 socket_fileobject = socket.SocketIO
 
@@ -23,6 +24,8 @@ IPPROTO_IPV6 = getattr(socket, "IPPROTO_IPV6", 41)
 
 class _FileLike:
     BLOCKSIZE = 1024 * 32
+    # An optional metrics counter of the bytes read or written
+    counter = None
 
     def __init__(self, o):
         self.o = o
@@ -68,7 +71,18 @@ class _FileLike:
         self.first_byte_timestamp = None
 
 
+# The maximum number of buffers passed to a single sendmsg() call.
+try:
+    IOV_MAX = os.sysconf("SC_IOV_MAX")
+except (AttributeError, ValueError, OSError):  # pragma: no cover
+    IOV_MAX = 16
+
+
 class Writer(_FileLike):
+    # Buffers are coalesced up to this size when they can't be sent with
+    # sendmsg(), e.g. on a TLS connection. This matches the maximum TLS
+    # record size so that a response head and small body share a record.
+    COALESCE_SIZE = 1024 * 16
 
     def flush(self):
         """
@@ -89,65 +103,218 @@ class Writer(_FileLike):
             try:
                 if hasattr(self.o, "sendall"):
                     self.add_log(v)
-                    return self.o.sendall(v)
+                    r = self.o.sendall(v)
+                    if self.counter is not None:
+                        self.counter.inc(len(v))
+                    return r
                 else:
                     r = self.o.write(v)
                     self.add_log(v[:r])
+                    if self.counter is not None:
+                        self.counter.inc(r)
                     return r
             except (SSL.Error, socket.error) as e:
                 raise exceptions.TcpDisconnect(str(e))
 
+    def writev(self, buffers):
+        """
+            Write a sequence of buffers using as few syscalls as possible.
+
+            On a plain socket the buffers are handed to sendmsg() together.
+            Otherwise (e.g. TLS) small adjacent buffers are joined so that
+            they go out in a single write.
+
+            May raise exceptions.TcpDisconnect
+        """
+        buffers = [b for b in buffers if b]
+        if not buffers:
+            return
+        sock = getattr(self.o, "_sock", None)
+        if sock is None or not hasattr(sock, "sendmsg"):
+            for buf in _coalesce(buffers, self.COALESCE_SIZE):
+                self.write(buf)
+            return
+        self.first_byte_timestamp = self.first_byte_timestamp or time.time()
+        try:
+            _sendmsg_all(sock, buffers)
+        except socket.error as e:
+            raise exceptions.TcpDisconnect(str(e))
+        for buf in buffers:
+            self.add_log(buf)
+        if self.counter is not None:
+            self.counter.inc(sum(len(b) for b in buffers))
+
+
+def _coalesce(buffers, size):
+    """
+        Join adjacent buffers into chunks of up to size bytes.
+        Buffers larger than size are passed through without copying.
+    """
+    pending = []
+    pending_size = 0
+    for buf in buffers:
+        if pending and pending_size + len(buf) > size:
+            yield b"".join(pending)
+            pending = []
+            pending_size = 0
+        if len(buf) >= size:
+            yield buf
+        else:
+            pending.append(buf)
+            pending_size += len(buf)
+    if pending:
+        yield b"".join(pending)
+
+
+def _sendmsg_all(sock, buffers):
+    """
+        Like socket.sendall(), but for a sequence of buffers.
+    """
+    views = [memoryview(b) for b in buffers]
+    while views:
+        sent = sock.sendmsg(views[:IOV_MAX])
+        while sent:
+            if sent >= len(views[0]):
+                sent -= len(views[0])
+                del views[0]
+            else:
+                views[0] = views[0][sent:]
+                sent = 0
+
 
 class Reader(_FileLike):
 
-    def read(self, length):
+    def _read_once(self, read, *args, start):
         """
-            If length is -1, we read until connection closes.
+            Perform a single read from the underlying file object, translating errors.
+
+            Returns:
+                The result of the read, or None if the connection was closed.
         """
-        result = b''
-        start = time.time()
-        while length == -1 or length > 0:
-            if length == -1 or length > self.BLOCKSIZE:
-                rlen = self.BLOCKSIZE
-            else:
-                rlen = length
+        while True:
             try:
-                data = self.o.read(rlen)
+                return read(*args)
             except SSL.ZeroReturnError:
                 # TLS connection was shut down cleanly
-                break
-            except (SSL.WantWriteError, SSL.WantReadError):
+                return None
+            except (SSL.WantWriteError, SSL.WantReadError) as e:
                 # From the OpenSSL docs:
                 # If the underlying BIO is non-blocking, SSL_read() will also return when the
                 # underlying BIO could not satisfy the needs of SSL_read() to continue the
                 # operation. In this case a call to SSL_get_error with the return value of
                 # SSL_read() will yield SSL_ERROR_WANT_READ or SSL_ERROR_WANT_WRITE.
+                # Wait until the socket is ready rather than polling, so that the read
+                # resumes as soon as the rest of the record (or renegotiation) arrives.
                 # 300 is OpenSSL default timeout
-                timeout = self.o.gettimeout() or 300
-                if (time.time() - start) < timeout:
-                    time.sleep(0.1)
+                remaining = start + (self.o.gettimeout() or 300) - time.time()
+                if remaining > 0 and wait_for_socket(self.o, isinstance(e, SSL.WantWriteError), remaining):
                     continue
-                else:
-                    raise exceptions.TcpTimeout()
+                raise exceptions.TcpTimeout()
             except socket.timeout:
                 raise exceptions.TcpTimeout()
             except socket.error as e:
                 raise exceptions.TcpDisconnect(str(e))
             except SSL.SysCallError as e:
                 if e.args == (-1, 'Unexpected EOF'):
-                    break
+                    return None
                 raise exceptions.TlsException(str(e))
             except SSL.Error as e:
                 raise exceptions.TlsException(str(e))
+
+    def read(self, length):
+        """
+            If length is -1, we read until connection closes.
+        """
+        result = []
+        start = time.time()
+        while length == -1 or length > 0:
+            if length == -1 or length > self.BLOCKSIZE:
+                rlen = self.BLOCKSIZE
+            else:
+                rlen = length
+            data = self._read_once(self.o.read, rlen, start=start)
+            if data is None:
+                break
             self.first_byte_timestamp = self.first_byte_timestamp or time.time()
             if not data:
                 break
-            result += data
+            result.append(data)
             if length != -1:
                 length -= len(data)
+        result = b"".join(result)
         self.add_log(result)
+        if self.counter is not None:
+            self.counter.inc(len(result))
         return result
 
+    def read_available(self, length):
+        """
+            Read whatever is already buffered, up to length bytes, blocking
+            only if nothing is available yet. For TLS connections this also
+            drains records that OpenSSL has decrypted but not returned.
+
+            Returns:
+                The bytes read, or b"" if the connection was closed.
+        """
+        if not isinstance(self.o, SSL.Connection):
+            # A single recv() returns everything the kernel has buffered.
+            data = self._read_once(self.o.read, length, start=time.time()) or b""
+            if data:
+                self.first_byte_timestamp = self.first_byte_timestamp or time.time()
+            self.add_log(data)
+            if self.counter is not None:
+                self.counter.inc(len(data))
+            return data
+
+        result = []
+        start = time.time()
+        while length > 0:
+            data = self._read_once(self.o.read, min(length, self.BLOCKSIZE), start=start)
+            if not data:
+                break
+            self.first_byte_timestamp = self.first_byte_timestamp or time.time()
+            result.append(data)
+            length -= len(data)
+            if not self.o.pending():
+                break
+        result = b"".join(result)
+        self.add_log(result)
+        if self.counter is not None:
+            self.counter.inc(len(result))
+        return result
+
+    def readinto(self, buffer):
+        """
+            Read directly into a preallocated buffer until it is full or the
+            connection closes. Unlike read(), reads are not capped at BLOCKSIZE.
+
+            Returns:
+                The number of bytes read.
+        """
+        view = memoryview(buffer).cast("B")
+        if isinstance(self.o, SSL.Connection):
+            def read(b):
+                # pyOpenSSL allocates a temporary buffer of nbytes on each call,
+                # and a single call never returns more than a TLS record anyway.
+                return self.o.recv_into(b, min(len(b), self.BLOCKSIZE))
+        else:
+            read = self.o.readinto
+        total = 0
+        start = time.time()
+        while total < len(view):
+            n = self._read_once(read, view[total:], start=start)
+            if n is None:
+                break
+            self.first_byte_timestamp = self.first_byte_timestamp or time.time()
+            if not n:
+                break
+            total += n
+        if self.is_logging():
+            self.add_log(view[:total].tobytes())
+        if self.counter is not None:
+            self.counter.inc(total)
+        return total
+
     def readline(self, size=None):
         result = b''
         bytes_read = 0
@@ -197,14 +364,92 @@ class Reader(_FileLike):
             except socket.error as e:
                 raise exceptions.TcpException(repr(e))
         elif isinstance(self.o, SSL.Connection):
-            try:
-                return self.o.recv(length, socket.MSG_PEEK)
-            except SSL.Error as e:
-                raise exceptions.TlsException(str(e))
+            while True:
+                try:
+                    return self.o.recv(length, socket.MSG_PEEK)
+                except (SSL.WantReadError, SSL.WantWriteError) as e:
+                    # The socket has a timeout, so is non-blocking underneath
+                    if not wait_for_socket(self.o, isinstance(e, SSL.WantWriteError), self.o.gettimeout()):
+                        raise exceptions.TlsException("Timed out waiting for data to peek at")
+                except SSL.Error as e:
+                    raise exceptions.TlsException(str(e))
         else:
             raise NotImplementedError("Can only peek into (pyOpenSSL) sockets")
 
 
+# What a non-blocking connect() returns while the connection is being made
+_CONNECT_IN_PROGRESS = {0, errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EAGAIN, getattr(errno, "WSAEWOULDBLOCK", 0)}
+
+
+def socket_arguments_from_options(options: "seleniumwire.thirdparty.mitmproxy.options.Options") -> dict:
+    return {
+        "nodelay": options.tcp_nodelay,
+        "rcvbuf": options.tcp_rcvbuf,
+        "sndbuf": options.tcp_sndbuf,
+        "keepalive_idle": options.tcp_keepalive_idle,
+        "keepalive_interval": options.tcp_keepalive_interval,
+        "keepalive_count": options.tcp_keepalive_count,
+    }
+
+
+def set_socket_options(sock, nodelay=True, rcvbuf=None, sndbuf=None,
+                       keepalive_idle=None, keepalive_interval=None, keepalive_count=None):
+    """
+    Tune a connected TCP socket. Options that are None are left at the
+    system default, as are the keepalive settings the platform doesn't
+    support.
+
+    Args:
+        nodelay: Disable Nagle's algorithm, so that small writes such as
+            response heads and websocket messages are sent immediately
+            rather than waiting for the previous segment to be acked.
+        rcvbuf, sndbuf: The socket buffer sizes in bytes.
+        keepalive_idle: Seconds of idleness before keepalive probes are sent.
+        keepalive_interval: Seconds between keepalive probes.
+        keepalive_count: Unanswered probes before the connection is dropped.
+    """
+    opts = [(socket.IPPROTO_TCP, socket.TCP_NODELAY, int(bool(nodelay)))]
+    if rcvbuf:
+        opts.append((socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf))
+    if sndbuf:
+        opts.append((socket.SOL_SOCKET, socket.SO_SNDBUF, sndbuf))
+    keepalive = [
+        # TCP_KEEPIDLE is called TCP_KEEPALIVE on macOS
+        (getattr(socket, "TCP_KEEPIDLE", getattr(socket, "TCP_KEEPALIVE", None)), keepalive_idle),
+        (getattr(socket, "TCP_KEEPINTVL", None), keepalive_interval),
+        (getattr(socket, "TCP_KEEPCNT", None), keepalive_count),
+    ]
+    if any(value for _, value in keepalive):
+        opts.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+        opts.extend((socket.IPPROTO_TCP, name, value) for name, value in keepalive if name is not None and value)
+    for level, name, value in opts:
+        try:
+            sock.setsockopt(level, name, value)
+        except OSError:
+            # e.g. the connection has already been reset, or it's not TCP
+            pass
+
+
+def wait_for_socket(sock, write, timeout):
+    """
+    Wait until a socket (or SSL.Connection) is ready for reading, or for
+    writing if write is True. A timeout of None waits indefinitely.
+
+    poll() is used where available as, unlike select(), it works with file
+    descriptors above FD_SETSIZE, which a busy proxy can reach.
+
+    Returns:
+        True if the socket is ready, False if the timeout expired first.
+    """
+    if hasattr(select, "poll"):
+        poller = select.poll()
+        poller.register(sock, select.POLLOUT if write else select.POLLIN)
+        return bool(poller.poll(None if timeout is None else timeout * 1000))
+    if write:
+        return bool(select.select((), [sock], (), timeout)[1])
+    return bool(select.select([sock], (), (), timeout)[0])
+
+
 def ssl_read_select(rlist, timeout):
     """
     This is a wrapper around select.select() which also works for SSL.Connections
@@ -354,6 +599,9 @@ class ConnectionCloser:
 
 
 class TCPClient(_Connection):
+    # How long to wait for a connection attempt before also trying the next
+    # address, as recommended by RFC 8305 (Happy Eyeballs)
+    CONNECTION_ATTEMPT_DELAY = 0.25
 
     def __init__(self, address, source_address=None, spoof_source_address=None):
         super().__init__(None)
@@ -363,6 +611,8 @@ class TCPClient(_Connection):
         self.server_certs = []
         self.sni = None
         self.spoof_source_address = spoof_source_address
+        # A shared dns.Resolver to look the address up with, if not getaddrinfo() directly
+        self.resolver: Optional[dns.Resolver] = None
 
     @property
     def ssl_verification_error(self) -> Optional[exceptions.InvalidCertificateException]:
@@ -407,34 +657,26 @@ class TCPClient(_Connection):
         return socket.socket(family, type, proto)
 
     def getaddrinfo(self, *args, **kwargs):
+        if self.resolver is not None:
+            return self.resolver.getaddrinfo(*args, **kwargs)
         return socket.getaddrinfo(*args, **kwargs)
 
     def create_connection(self, timeout=None):
         # Based on the official socket.create_connection implementation of Python 3.6.
         # https://github.com/python/cpython/blob/3cc5817cfaf5663645f4ee447eaed603d2ad290a/Lib/socket.py
 
+        addrinfos = self.getaddrinfo(self.address[0], self.address[1], 0, socket.SOCK_STREAM)
+        if len(addrinfos) > 1 and self.concurrent_connects:
+            return self._connect_concurrently(dns.interleave(addrinfos), timeout)
+
         err = None
-        for res in self.getaddrinfo(self.address[0], self.address[1], 0, socket.SOCK_STREAM):
-            af, socktype, proto, canonname, sa = res
+        for res in addrinfos:
             sock = None
             try:
-                sock = self.makesocket(af, socktype, proto)
+                sock = self._make_socket(res)
                 if timeout:
                     sock.settimeout(timeout)
-                if self.source_address:
-                    sock.bind(self.source_address)
-                if self.spoof_source_address:
-                    try:
-                        if not sock.getsockopt(socket.SOL_IP, socket.IP_TRANSPARENT):
-                            sock.setsockopt(socket.SOL_IP, socket.IP_TRANSPARENT, 1)  # pragma: windows no cover  pragma: osx no cover
-                    except Exception as e:
-                        # socket.IP_TRANSPARENT might not be available on every OS and Python version
-                        if sock is not None:
-                            sock.close()
-                        raise exceptions.TcpException(
-                            "Failed to spoof the source address: " + str(e)
-                        )
-                sock.connect(sa)
+                sock.connect(res[4])
                 return sock
 
             except socket.error as _:
@@ -447,6 +689,87 @@ class TCPClient(_Connection):
         else:
             raise socket.error("getaddrinfo returns an empty list")  # pragma: no cover
 
+    @property
+    def concurrent_connects(self):
+        """Whether addresses can be tried concurrently, which needs non-blocking sockets."""
+        return True
+
+    def _connect_concurrently(self, addrinfos, timeout):
+        """
+        Happy Eyeballs (RFC 8305): each connection attempt gets
+        CONNECTION_ATTEMPT_DELAY to succeed before the next address is tried
+        alongside it, and the first to connect is used. So an address that
+        doesn't answer (e.g. IPv6 on a network without it) costs 250ms
+        rather than a full connect timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        attempts = set()
+        err = None
+
+        with selectors.DefaultSelector() as selector:
+            try:
+                while addrinfos or attempts:
+                    if addrinfos:
+                        res = addrinfos.pop(0)
+                        sock = None
+                        try:
+                            sock = self._make_socket(res)
+                            sock.setblocking(False)
+                            error = sock.connect_ex(res[4])
+                            if error not in _CONNECT_IN_PROGRESS:
+                                raise OSError(error, os.strerror(error))
+                        except socket.error as e:
+                            # That attempt failed straight away, so start the next one now
+                            err = e
+                            if sock is not None:
+                                sock.close()
+                            continue
+                        attempts.add(sock)
+                        selector.register(sock, selectors.EVENT_WRITE)
+
+                    wait = None if deadline is None else deadline - time.monotonic()
+                    if addrinfos:
+                        wait = min(wait, self.CONNECTION_ATTEMPT_DELAY) if wait is not None \
+                            else self.CONNECTION_ATTEMPT_DELAY
+                    if wait is not None and wait <= 0:
+                        raise socket.timeout("timed out")
+
+                    for key, _ in selector.select(wait):
+                        sock = key.fileobj
+                        selector.unregister(sock)
+                        attempts.discard(sock)
+                        error = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                        if not error:
+                            sock.settimeout(timeout or socket.getdefaulttimeout())
+                            return sock
+                        err = OSError(error, os.strerror(error))
+                        sock.close()
+            finally:
+                for sock in attempts:
+                    sock.close()
+
+        raise err
+
+    def _make_socket(self, addrinfo):
+        af, socktype, proto, canonname, sa = addrinfo
+        sock = self.makesocket(af, socktype, proto)
+        try:
+            if self.source_address:
+                sock.bind(self.source_address)
+            if self.spoof_source_address:
+                try:
+                    if not sock.getsockopt(socket.SOL_IP, socket.IP_TRANSPARENT):
+                        sock.setsockopt(socket.SOL_IP, socket.IP_TRANSPARENT, 1)  # pragma: windows no cover  pragma: osx no cover
+                except Exception as e:
+                    # socket.IP_TRANSPARENT might not be available on every OS and Python version
+                    raise exceptions.TcpException(
+                        "Failed to spoof the source address: " + str(e)
+                    )
+        except BaseException:
+            sock.close()
+            raise
+        return sock
+
     def connect(self):
         try:
             connection = self.create_connection()
@@ -491,9 +814,8 @@ def do_ssl_handshake(sock, ssl_connection):
     while True:
         try:
             ssl_connection.do_handshake()
-        except SSL.WantReadError:
-            rd, _, _ = select.select([sock], [], [], sock.gettimeout())
-            if not rd:
+        except (SSL.WantReadError, SSL.WantWriteError) as e:
+            if not wait_for_socket(sock, isinstance(e, SSL.WantWriteError), sock.gettimeout()):
                 raise exceptions.TcpTimeout("Select timed out")
             continue
         except SSL.Error as e:
@@ -557,25 +879,37 @@ class BaseHandler(_Connection):
 class Counter:
     def __init__(self):
         self._count = 0
-        self._lock = threading.Lock()
+        self._cond = threading.Condition()
 
     @property
     def count(self):
-        with self._lock:
+        with self._cond:
             return self._count
 
     def __enter__(self):
-        with self._lock:
+        with self._cond:
             self._count += 1
 
     def __exit__(self, *args):
-        with self._lock:
+        with self._cond:
             self._count -= 1
+            if not self._count:
+                self._cond.notify_all()
+
+    def wait_for_zero(self, timeout=None):
+        """
+            Wait until the count drops to zero.
+
+            Returns:
+                False if the timeout expired first.
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._count, timeout)
 
 
 class TCPServer:
 
-    def __init__(self, address):
+    def __init__(self, address, backlog=None):
         self.address = address
         self.__is_shut_down = threading.Event()
         self.__is_shut_down.set()
@@ -624,8 +958,16 @@ class TCPServer:
             self.socket.bind(self.address)
 
         self.address = self.socket.getsockname()
-        self.socket.listen()
+        # A browser opens many connections at once when a page starts to load,
+        # so allow the kernel to queue as many as it will by default
+        self.socket.listen(backlog or socket.SOMAXCONN)
+        # Connections are accepted until the backlog is empty on each wakeup
+        self.socket.setblocking(False)
         self.handler_counter = Counter()
+        # Written to by shutdown() to wake serve_forever() immediately
+        self.__wakeup_r, self.__wakeup_w = socket.socketpair()
+        self.__wakeup_r.setblocking(False)
+        self.__wakeup_w.setblocking(False)
 
     def connection_thread(self, connection, client_address):
         with self.handler_counter:
@@ -643,38 +985,69 @@ class TCPServer:
             finally:
                 close_socket(connection)
 
-    def serve_forever(self, poll_interval=0.1):
+    def serve_forever(self, poll_interval=None):
+        """
+            Accept connections until shutdown() is called. There's no need to
+            poll, as shutdown() wakes the loop up, but a poll_interval may be
+            given to bound how long each wait for a connection lasts.
+        """
         self.__is_shut_down.clear()
         try:
-            while not self.__shutdown_request:
-                r, w_, e_ = select.select([self.socket], [], [], poll_interval)
-                if self.socket in r:
-                    connection, client_address = self.socket.accept()
-                    t = basethread.BaseThread(
-                        "TCPConnectionHandler (%s: %s:%s -> %s:%s)" % (
-                            self.__class__.__name__,
-                            client_address[0],
-                            client_address[1],
-                            self.address[0],
-                            self.address[1],
-                        ),
-                        target=self.connection_thread,
-                        args=(connection, client_address),
-                    )
-                    t.daemon = True
-                    try:
-                        t.start()
-                    except threading.ThreadError:
-                        self.handle_error(connection, client_address)
-                        connection.close()
+            with selectors.DefaultSelector() as selector:
+                selector.register(self.socket, selectors.EVENT_READ)
+                selector.register(self.__wakeup_r, selectors.EVENT_READ)
+                while not self.__shutdown_request:
+                    for key, _ in selector.select(poll_interval):
+                        if key.fileobj is self.socket:
+                            self._accept_pending()
         finally:
             self.__shutdown_request = False
             self.__is_shut_down.set()
 
+    def _accept_pending(self):
+        """
+            Accept every connection waiting in the listen backlog.
+        """
+        while not self.__shutdown_request:
+            try:
+                connection, client_address = self.socket.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            except ConnectionAbortedError:
+                # The client gave up before we got to it
+                continue
+            # Whether the connection inherits the listening socket's non-blocking
+            # mode depends on the OS, so put it back to the default explicitly
+            connection.settimeout(socket.getdefaulttimeout())
+            t = basethread.BaseThread(
+                "TCPConnectionHandler (%s: %s:%s -> %s:%s)" % (
+                    self.__class__.__name__,
+                    client_address[0],
+                    client_address[1],
+                    self.address[0],
+                    self.address[1],
+                ),
+                target=self.connection_thread,
+                args=(connection, client_address),
+            )
+            t.daemon = True
+            try:
+                t.start()
+            except threading.ThreadError:
+                self.handle_error(connection, client_address)
+                connection.close()
+
     def shutdown(self):
         self.__shutdown_request = True
+        try:
+            self.__wakeup_w.send(b"\0")
+        except OSError:
+            # Already woken, or shut down before
+            pass
         self.__is_shut_down.wait()
         self.socket.close()
+        self.__wakeup_r.close()
+        self.__wakeup_w.close()
         self.handle_shutdown()
 
     def handle_error(self, connection_, client_address, fp=sys.stderr):
@@ -703,12 +1076,8 @@ class TCPServer:
         """
 
     def wait_for_silence(self, timeout=5):
-        start = time.time()
-        while 1:
-            if time.time() - start >= timeout:
-                raise exceptions.Timeout(
-                    "%s service threads still alive" %
-                    self.handler_counter.count
-                )
-            if self.handler_counter.count == 0:
-                return
+        if not self.handler_counter.wait_for_zero(timeout):
+            raise exceptions.Timeout(
+                "%s service threads still alive" %
+                self.handler_counter.count
+            )
@@ -9,12 +9,10 @@ import threading
 import typing
 
 import certifi
-from kaitaistruct import KaitaiStream
 from OpenSSL import SSL
 
 import seleniumwire.thirdparty.mitmproxy.options
 from seleniumwire.thirdparty.mitmproxy import certs, exceptions
-from seleniumwire.thirdparty.mitmproxy.contrib.kaitaistruct import tls_client_hello
 from seleniumwire.thirdparty.mitmproxy.net import check
 
 BASIC_OPTIONS = (
@@ -421,6 +419,11 @@ def get_client_hello(rfile):
 class ClientHello:
 
     def __init__(self, raw_client_hello):
+        # The generated parser is only needed once a client connects with TLS
+        from kaitaistruct import KaitaiStream
+
+        from seleniumwire.thirdparty.mitmproxy.contrib.kaitaistruct import tls_client_hello
+
         self._client_hello = tls_client_hello.TlsClientHello(
             KaitaiStream(io.BytesIO(raw_client_hello))
         )
@@ -78,6 +78,13 @@ class Options(optmanager.OptManager):
             "allow_hosts", Sequence[str], [],
             "Opposite of --ignore-hosts."
         )
+        self.add_option(
+            "block_hosts", Sequence[str], [],
+            """
+            Refuse requests and CONNECTs to these domains and their
+            subdomains, before any TLS handshake or upstream connection.
+            """
+        )
         self.add_option(
             "listen_host", str, "",
             "Address to bind mitmproxy to."
@@ -86,6 +93,56 @@ class Options(optmanager.OptManager):
             "listen_port", int, LISTEN_PORT,
             "Proxy service port."
         )
+        self.add_option(
+            "dns_cache_ttl", int, 60,
+            "Seconds to cache the addresses of servers for. 0 disables the cache."
+        )
+        self.add_option(
+            "dns_negative_ttl", int, 5,
+            "Seconds to remember that a server's host name could not be resolved."
+        )
+        self.add_option(
+            "dns_overrides", Sequence[str], [],
+            """
+            Resolve host names to the given addresses (or other host names)
+            instead of looking them up. Each override is of the form
+            "host=address".
+            """
+        )
+        self.add_option(
+            "tcp_nodelay", bool, True,
+            """
+            Disable Nagle's algorithm on client and server connections, so
+            that small writes aren't delayed.
+            """
+        )
+        self.add_option(
+            "tcp_rcvbuf", Optional[int], None,
+            "Receive buffer size in bytes for client and server connections."
+        )
+        self.add_option(
+            "tcp_sndbuf", Optional[int], None,
+            "Send buffer size in bytes for client and server connections."
+        )
+        self.add_option(
+            "tcp_keepalive_idle", Optional[int], None,
+            "Seconds a connection is idle before TCP keepalive probes are sent."
+        )
+        self.add_option(
+            "tcp_keepalive_interval", Optional[int], None,
+            "Seconds between TCP keepalive probes."
+        )
+        self.add_option(
+            "tcp_keepalive_count", Optional[int], None,
+            "Unanswered TCP keepalive probes before a connection is dropped."
+        )
+        self.add_option(
+            "listen_backlog", Optional[int], None,
+            """
+            The maximum number of connections waiting to be accepted. Defaults
+            to the system maximum (SOMAXCONN).
+            """
+        )
         self.add_option(
             "upstream_bind_address", str, "",
             "Address to bind upstream requests to."
@@ -104,6 +161,31 @@ class Options(optmanager.OptManager):
             "no_proxy", Sequence[str], [],
             "List of hosts for which an upstream proxy will be bypassed."
         )
+        self.add_option(
+            "upstream_servers", Sequence[str], [],
+            """
+            Further HTTP upstream proxies, in the form
+            "http[s]://[user:pass@]host[:port]", that connections are shared
+            across along with the upstream proxy of the mode.
+            """
+        )
+        self.add_option(
+            "upstream_routes", Sequence[str], [],
+            """
+            Upstream proxies for particular hosts, in the form
+            "host=http[s]://[user:pass@]host[:port]". A host also covers its
+            subdomains.
+            """
+        )
+        self.add_option(
+            "upstream_rotation", str, "round_robin",
+            """
+            How connections are shared across the upstream proxies: each new
+            connection takes the next one (round_robin) or the one with the
+            fewest connections (least_connections).
+            """,
+            choices=["round_robin", "least_connections"],
+        )
         self.add_option(
             "upstream_cert", bool, True,
             "Connect to upstream server to look up certificate details."
@@ -121,11 +203,25 @@ class Options(optmanager.OptManager):
             with misbehaving servers.
             """
         )
+        self.add_option(
+            "http2_upstream", bool, False,
+            """
+            Send HTTP/1.1 client requests to HTTPS servers over a shared HTTP/2
+            connection per server, if the server supports it.
+            """
+        )
         self.add_option(
             "websocket", bool, True,
             "Enable/disable WebSocket support. "
             "WebSocket support is enabled by default.",
         )
+        self.add_option(
+            "websocket_message_history", int, 0,
+            """
+            The number of messages kept on a WebSocket flow. The current message
+            is always available as flow.messages[-1]. 0 keeps all messages.
+            """
+        )
         self.add_option(
             "rawtcp", bool, False,
             "Enable/disable experimental raw TCP support. TCP connections starting with non-ascii "
@@ -6,7 +6,9 @@ from OpenSSL import crypto
 
 from seleniumwire.thirdparty.mitmproxy import certs, exceptions
 from seleniumwire.thirdparty.mitmproxy import options as moptions
-from seleniumwire.thirdparty.mitmproxy.net import server_spec
+from seleniumwire.thirdparty.mitmproxy.net import check, dns, server_spec, tcp
+from seleniumwire.thirdparty.mitmproxy.server import upstream
+from seleniumwire.thirdparty.mitmproxy.utils import human
 
 
 class HostMatcher:
@@ -28,15 +30,94 @@ class HostMatcher:
         return bool(self.patterns)
 
 
+class OptionsSnapshot:
+    """
+    The options read while connections are handled, copied out of the
+    options each time they change.
+
+    Reading from Options looks the option up and asks it for its current
+    value, which adds up when done several times for every request. A
+    snapshot holds the values in slots, with body_size_limit already parsed,
+    and is never changed but replaced by a new one. A connection takes the
+    snapshot when it starts, and each HTTP flow when it starts, and the
+    layers read theirs as ``self.snapshot``, so a connection or flow sees
+    one set of options throughout, even if they are updated while it is in
+    flight.
+    """
+
+    __slots__ = (
+        "add_upstream_certs_to_client_chain",
+        "body_size_limit",
+        "ciphers_client",
+        "ciphers_server",
+        "client_certs",
+        "http2",
+        "http2_priority",
+        "http2_upstream",
+        "keep_host_header",
+        "listen_host",
+        "listen_port",
+        "mode",
+        "rawtcp",
+        "relax_http_form_validation",
+        "spoof_source_address",
+        "ssl_insecure",
+        "ssl_verify_upstream_trusted_ca",
+        "ssl_verify_upstream_trusted_confdir",
+        "ssl_version_client",
+        "ssl_version_server",
+        "suppress_connection_errors",
+        "upstream_auth",
+        "upstream_bind_address",
+        "upstream_cert",
+        "upstream_custom_auth",
+        "websocket",
+        "websocket_message_history",
+    )
+
+    def __init__(self, options: moptions.Options) -> None:
+        for name in self.__slots__:
+            # Options added by addons are absent until the addon is loaded
+            object.__setattr__(self, name, getattr(options, name, None))
+        try:
+            object.__setattr__(self, "body_size_limit", human.parse_size(self.body_size_limit))
+        except ValueError as e:
+            raise exceptions.OptionsError("Invalid body size limit specification: %s" % e)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("OptionsSnapshot is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("OptionsSnapshot is immutable")
+
+
 class ProxyConfig:
 
     def __init__(self, options: moptions.Options) -> None:
         self.options = options
-
+        # The options that connections read, replaced on every change
+        self.snapshot: OptionsSnapshot
         self.certstore: certs.CertStore
         self.check_filter: typing.Optional[HostMatcher] = None
         self.check_tcp: typing.Optional[HostMatcher] = None
+        self.check_block: typing.Optional[check.HostSuffixMatcher] = None
+        self.check_no_proxy: typing.Optional[check.NoProxyMatcher] = None
+        # Whether server connections go through a SOCKS proxy, for which no_proxy also applies
+        self.upstream_socks = False
+        # Like check_filter, but set by the application embedding the proxy rather than
+        # from the options: a callable taking the server address and the client connection,
+        # which returns True for connections that should be relayed without interception.
+        # Only consulted while it is truthy.
+        self.check_passthrough: typing.Optional[typing.Callable[[typing.Tuple[str, int], typing.Any], bool]] = None
         self.upstream_server: typing.Optional[server_spec.ServerSpec] = None
+        # Chooses the proxy for each connection in HTTP upstream mode
+        self.upstream_router: typing.Optional[upstream.UpstreamRouter] = None
+        # Resolves server addresses for every server connection
+        self.resolver: typing.Optional[dns.Resolver] = None
+        # Keyword arguments for tcp.set_socket_options(), applied to every client and server connection
+        self.socket_options: typing.Dict[str, typing.Any] = {}
+        # Only created with the http2_upstream option, as the pool imports h2
+        self.http2_upstream = None
         self.configure(options, set(options.keys()))
         options.changed.connect(self.configure)
 
@@ -44,6 +125,7 @@ class ProxyConfig:
         if options.allow_hosts and options.ignore_hosts:
             raise exceptions.OptionsError("--ignore-hosts and --allow-hosts are mutually "
                                           "exclusive; please choose one.")
+        snapshot = OptionsSnapshot(options)
 
         if options.ignore_hosts:
             self.check_filter = HostMatcher("ignore", options.ignore_hosts)
@@ -53,6 +135,21 @@ class ProxyConfig:
             self.check_filter = HostMatcher(False)
         if "tcp_hosts" in updated:
             self.check_tcp = HostMatcher("tcp", options.tcp_hosts)
+        if "block_hosts" in updated:
+            self.check_block = check.HostSuffixMatcher(options.block_hosts)
+        if "no_proxy" in updated:
+            self.check_no_proxy = check.NoProxyMatcher(options.no_proxy)
+        self.socket_options = tcp.socket_arguments_from_options(options)
+        if any(name in updated for name in ("dns_cache_ttl", "dns_negative_ttl", "dns_overrides")):
+            try:
+                overrides = dns.parse_overrides(options.dns_overrides)
+            except ValueError as e:
+                raise exceptions.OptionsError(str(e))
+            self.resolver = dns.Resolver(
+                ttl=options.dns_cache_ttl,
+                negative_ttl=options.dns_negative_ttl,
+                overrides=overrides,
+            )
 
         certstore_path = os.path.expanduser(options.confdir)
         if not os.path.exists(os.path.dirname(certstore_path)):
@@ -86,6 +183,26 @@ class ProxyConfig:
                     "Invalid certificate format: %s" % cert
                 )
         m = options.mode
+        self.upstream_socks = "socks" in m
         if m.startswith("upstream:") or m.startswith("reverse:"):
             _, spec = server_spec.parse_with_mode(options.mode)
             self.upstream_server = spec
+        if any(name in updated for name in (
+            "mode", "upstream_auth", "upstream_servers", "upstream_routes", "upstream_rotation"
+        )):
+            # Rebuilt only when these change, as it holds the rotation state
+            self.upstream_router = None
+            if m.startswith("upstream:") and self.upstream_server.scheme in ("http", "https"):
+                try:
+                    self.upstream_router = upstream.UpstreamRouter.from_options(self.upstream_server, options)
+                except ValueError as e:
+                    raise exceptions.OptionsError(str(e))
+
+        if options.http2_upstream and self.http2_upstream is None:
+            from seleniumwire.thirdparty.mitmproxy.server import http2_upstream
+            self.http2_upstream = http2_upstream.Http2UpstreamPool(options)
+        if self.http2_upstream is not None:
+            self.http2_upstream.resolver = self.resolver
+
+        # Swapped in last, once the options have been found valid
+        self.snapshot = snapshot
@@ -0,0 +1,456 @@
+"""
+Shared HTTP/2 connections to upstream servers.
+
+With the http2_upstream option, requests that a client sends over HTTP/1.1
+are forwarded as streams on a single HTTP/2 connection per origin, rather
+than on a dedicated HTTP/1.1 server connection per client connection.
+"""
+import functools
+import queue
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple  # noqa
+
+import h2.config
+import h2.connection
+import h2.errors
+import h2.events
+import h2.exceptions
+import h2.settings
+
+from seleniumwire.thirdparty.mitmproxy import connections, exceptions, http
+from seleniumwire.thirdparty.mitmproxy.coretypes import basethread
+from seleniumwire.thirdparty.mitmproxy.net import tcp
+from seleniumwire.thirdparty.mitmproxy.net import tls as net_tls
+from seleniumwire.thirdparty.mitmproxy.net import websockets
+from seleniumwire.thirdparty.mitmproxy.net.http import Headers, status_codes, url
+
+# Connection-specific headers that must not be sent over HTTP/2 (RFC 7540 8.1.2.2)
+CONNECTION_HEADERS = (b"connection", b"keep-alive", b"proxy-connection", b"transfer-encoding", b"upgrade", b"host")
+
+# Bytes taken off the connection per read, and the receive window we advertise.
+READ_SIZE = 1024 * 256
+WINDOW_SIZE = 1024 * 1024 * 4
+
+# Seconds to remember that a server doesn't negotiate h2, before trying again
+HTTP1_ONLY_TTL = 600
+
+
+def can_bridge(options, request) -> bool:
+    """
+    Whether an HTTP/1.1 request may be sent over a shared HTTP/2 upstream connection.
+    """
+    return (
+        options.http2_upstream and
+        options.mode == "regular" and
+        request.scheme == "https" and
+        request.method != "CONNECT" and
+        not websockets.check_handshake(request.headers)
+    )
+
+
+class Http2UpstreamStream:
+    """
+    A single request/response exchange on an Http2UpstreamConnection.
+    """
+
+    def __init__(self, connection: "Http2UpstreamConnection", stream_id: int, request: http.HTTPRequest) -> None:
+        self.connection = connection
+        self.stream_id = stream_id
+        self.request = request
+        self.headers: Optional[Headers] = None
+        self.trailers: Optional[Headers] = None
+        self.error: Optional[str] = None
+        self.timestamp_start: Optional[float] = None
+        # Whether the request was ended along with its headers, as it has no body or trailers
+        self.request_ended = False
+        self.arrived = threading.Event()
+        self.data_queue: queue.Queue[Optional[bytes]] = queue.Queue()  # contents of DATA frames, None once ended
+
+    def end(self, error: Optional[str] = None) -> None:
+        if self.error is None:
+            self.error = error
+        self.arrived.set()
+        self.data_queue.put(None)
+
+    def send_body(self, chunks) -> None:
+        if not self.request_ended:
+            self.connection.send_data(self.stream_id, chunks, self.request.trailers)
+
+    def read_response_headers(self) -> http.HTTPResponse:
+        self.arrived.wait()
+        if self.headers is None:
+            raise exceptions.Http2ProtocolException(
+                "HTTP/2 upstream stream failed: {}".format(self.error or "no response")
+            )
+
+        headers = self.headers.copy()
+        status_code = int(headers.pop(":status", 502))
+        if (
+            "content-length" not in headers and self.request.method != "HEAD" and
+            status_code >= 200 and status_code not in (204, 304)
+        ):
+            # HTTP/2 frames the body itself, the HTTP/1.1 client needs it chunked
+            headers["transfer-encoding"] = "chunked"
+
+        return http.HTTPResponse(
+            http_version=b"HTTP/1.1",
+            status_code=status_code,
+            reason=status_codes.RESPONSES.get(status_code, "").encode(),
+            headers=headers,
+            content=None,
+            trailers=None,
+            timestamp_start=self.timestamp_start,
+            timestamp_end=None,
+        )
+
+    def read_response_body(self, limit: Optional[int] = None):
+        received = 0
+        while True:
+            chunk = self.data_queue.get()
+            if chunk is None:
+                break
+            received += len(chunk)
+            if limit is not None and received > limit:
+                self.connection.reset_stream(self.stream_id)
+                raise exceptions.HttpException("HTTP body too large. Limit is {}.".format(limit))
+            yield chunk
+        if self.error:
+            raise exceptions.Http2ProtocolException(
+                "HTTP/2 upstream stream failed: {}".format(self.error)
+            )
+
+
+class Http2UpstreamConnection:
+    """
+    An HTTP/2 connection to a server that is shared by many client connections.
+    Frames from the server are read on a dedicated thread and dispatched to the
+    streams waiting for them.
+    """
+
+    def __init__(
+        self,
+        server_conn: connections.ServerConnection,
+        on_close: Optional[Callable[["Http2UpstreamConnection"], None]] = None,
+    ) -> None:
+        self.server_conn = server_conn
+        self.streams: Dict[int, Http2UpstreamStream] = {}
+        self.closed = False
+        # Called once the connection has closed, so that it's dropped from the pool
+        self.on_close = on_close
+        self.lock = threading.RLock()
+        # notified after each batch of frames from the server
+        self.updated = threading.Condition(self.lock)
+
+        config = h2.config.H2Configuration(
+            client_side=True,
+            header_encoding=False,
+            validate_outbound_headers=False,
+            validate_inbound_headers=False,
+        )
+        self.h2_conn = h2.connection.H2Connection(config=config)
+        with self.lock:
+            self.h2_conn.initiate_connection()
+            self.h2_conn.update_settings({h2.settings.SettingCodes.INITIAL_WINDOW_SIZE: WINDOW_SIZE})
+            self.h2_conn.increment_flow_control_window(WINDOW_SIZE - self.h2_conn.inbound_flow_control_window)
+            self._flush()
+
+        self.thread = basethread.BaseThread(
+            name="Http2UpstreamConnection-{}".format(server_conn.address),
+            target=self._read_loop,
+            daemon=True,
+        )
+        self.thread.start()
+
+    def __repr__(self):
+        return "<Http2UpstreamConnection: {} streams on {}>".format(len(self.streams), self.server_conn)
+
+    def usable(self) -> bool:
+        # leave room below the 2**31 stream id limit for the streams in flight
+        return (
+            not self.closed and
+            self.h2_conn.state_machine.state != h2.connection.ConnectionState.CLOSED and
+            (self.h2_conn.highest_outbound_stream_id or 0) < 2 ** 30
+        )
+
+    def _flush(self) -> None:
+        data = self.h2_conn.data_to_send()
+        if data:
+            self.server_conn.send(data)
+
+    def _check(self) -> None:
+        if self.closed:
+            raise exceptions.Http2ProtocolException("HTTP/2 upstream connection closed")
+
+    def send_request_headers(self, request) -> Http2UpstreamStream:
+        headers = [
+            (b":method", request.data.method),
+            (b":scheme", request.data.scheme),
+            (b":authority", (request.host_header or url.hostport(request.scheme, request.host, request.port)).encode()),
+            (b":path", request.data.path),
+        ]
+        for name, value in request.headers.fields:
+            name = name.lower()
+            if name in CONNECTION_HEADERS or (name == b"te" and value.lower() != b"trailers"):
+                continue
+            headers.append((name, value))
+        end_stream = not (request.content or request.trailers or request.stream)
+
+        with self.lock:
+            while True:
+                self._check()
+                max_streams = self.h2_conn.remote_settings.max_concurrent_streams
+                if self.h2_conn.open_outbound_streams + 1 < max_streams:
+                    break
+                # wait until we get a free slot for a new outgoing stream
+                self.updated.wait(0.1)
+
+            try:
+                stream_id = self.h2_conn.get_next_available_stream_id()
+                stream = Http2UpstreamStream(self, stream_id, request)
+                stream.request_ended = end_stream
+                self.streams[stream_id] = stream
+                self.h2_conn.send_headers(stream_id, headers, end_stream=end_stream)
+                self._flush()
+            except (h2.exceptions.H2Error, exceptions.TcpException) as e:
+                self._close(repr(e))
+                raise exceptions.Http2ProtocolException(repr(e))
+        return stream
+
+    def send_data(self, stream_id: int, chunks, trailers: Optional[Headers] = None) -> None:
+        try:
+            for chunk in chunks:
+                position = 0
+                while position < len(chunk):
+                    with self.lock:
+                        self._check()
+                        frame_size = min(
+                            len(chunk) - position,
+                            self.h2_conn.max_outbound_frame_size,
+                            self.h2_conn.local_flow_control_window(stream_id),
+                        )
+                        if frame_size <= 0:
+                            self.updated.wait(0.1)
+                            continue
+                        self.h2_conn.send_data(stream_id, chunk[position:position + frame_size])
+                        self._flush()
+                    position += frame_size
+            with self.lock:
+                self._check()
+                if trailers:
+                    fields = [(name.lower(), value) for name, value in trailers.fields]
+                    self.h2_conn.send_headers(stream_id, fields, end_stream=True)
+                else:
+                    self.h2_conn.end_stream(stream_id)
+                self._flush()
+        except h2.exceptions.H2Error as e:
+            # e.g. the server reset the stream while we were sending
+            raise exceptions.Http2ProtocolException(repr(e))
+        except exceptions.TcpException as e:
+            with self.lock:
+                self._close(repr(e))
+            raise exceptions.Http2ProtocolException(repr(e))
+
+    def reset_stream(self, stream_id: int) -> None:
+        with self.lock:
+            try:
+                self.h2_conn.reset_stream(stream_id, h2.errors.ErrorCodes.CANCEL)
+                self._flush()
+            except (h2.exceptions.StreamClosedError, exceptions.TcpException):
+                pass
+            self.streams.pop(stream_id, None)
+
+    def _read_loop(self) -> None:
+        error = "connection closed"
+        try:
+            while True:
+                data = self.server_conn.rfile.read_available(READ_SIZE)
+                if not data:
+                    break
+                with self.lock:
+                    for event in self.h2_conn.receive_data(data):
+                        self._handle_event(event)
+                    self._flush()
+                    self.updated.notify_all()
+                    if self.h2_conn.state_machine.state == h2.connection.ConnectionState.CLOSED:
+                        break
+        except Exception as e:
+            error = repr(e)
+        with self.lock:
+            self._close(error)
+
+    def _handle_event(self, event) -> None:
+        stream = self.streams.get(getattr(event, "stream_id", None))
+        if isinstance(event, h2.events.ResponseReceived) and stream:
+            stream.timestamp_start = time.time()
+            stream.headers = Headers([[k, v] for k, v in event.headers])
+            stream.arrived.set()
+        elif isinstance(event, h2.events.DataReceived):
+            if event.flow_controlled_length:
+                self.h2_conn.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+            if stream:
+                stream.data_queue.put(event.data)
+        elif isinstance(event, h2.events.TrailersReceived) and stream:
+            stream.trailers = Headers([[k, v] for k, v in event.headers])
+        elif isinstance(event, h2.events.StreamEnded) and stream:
+            self.streams.pop(event.stream_id).end()
+        elif isinstance(event, h2.events.StreamReset) and stream:
+            self.streams.pop(event.stream_id).end("stream reset by server (error code {})".format(event.error_code))
+        elif isinstance(event, h2.events.PushedStreamReceived):
+            self.h2_conn.reset_stream(event.pushed_stream_id, h2.errors.ErrorCodes.REFUSED_STREAM)
+        elif isinstance(event, h2.events.ConnectionTerminated):
+            # streams above last_stream_id were not processed by the server
+            self.closed = True
+            for stream_id in [i for i in self.streams if i > (event.last_stream_id or 0)]:
+                self.streams.pop(stream_id).end("connection terminated by server")
+
+    def close(self) -> None:
+        """
+        Say goodbye to the server and close the connection, failing any
+        streams still in flight.
+        """
+        with self.lock:
+            if self.server_conn.connected():
+                try:
+                    self.h2_conn.close_connection()
+                    self._flush()
+                except (h2.exceptions.H2Error, exceptions.TcpException):
+                    pass
+            self._close("connection closed by the proxy")
+
+    def _close(self, error: str) -> None:
+        self.closed = True
+        streams, self.streams = self.streams, {}
+        for stream in streams.values():
+            stream.end(error)
+        self.updated.notify_all()
+        if self.server_conn.connected():
+            self.server_conn.finish()
+            # Also wakes up the read loop, if this isn't it
+            self.server_conn.close()
+            if self.on_close is not None:
+                self.on_close(self)
+
+
+class Http2UpstreamPool:
+    """
+    Keeps one Http2UpstreamConnection per (address, sni). Connections leave
+    the pool once they close. Servers that do not negotiate h2 are remembered
+    for a while, so that later requests skip the attempt.
+    """
+
+    def __init__(self, options) -> None:
+        self.options = options
+        # Set by the ProxyConfig to its shared resolver
+        self.resolver = None
+        self.connections: Dict[Tuple, Http2UpstreamConnection] = {}
+        # (address, sni) -> when to try negotiating h2 again
+        self.http1_only: Dict[Tuple, float] = {}
+        self.closed = False
+        self._lock = threading.Lock()
+        self._connect_locks: Dict[Tuple, threading.Lock] = {}
+
+    def close(self) -> None:
+        """
+        Close every connection. No new ones are made afterwards.
+        """
+        with self._lock:
+            self.closed = True
+            conns = list(self.connections.values())
+            self.connections.clear()
+            self.http1_only.clear()
+        for conn in conns:
+            conn.close()
+
+    def _evict(self, key, conn: Http2UpstreamConnection) -> None:
+        with self._lock:
+            if self.connections.get(key) is conn:
+                del self.connections[key]
+
+    def _is_http1_only(self, key) -> bool:
+        retry = self.http1_only.get(key)
+        if retry is None:
+            return False
+        if retry > time.monotonic():
+            return True
+        self.http1_only.pop(key, None)
+        return False
+
+    def _add_http1_only(self, key) -> None:
+        now = time.monotonic()
+        with self._lock:
+            for k in [k for k, retry in self.http1_only.items() if retry <= now]:
+                del self.http1_only[k]
+            self.http1_only[key] = now + HTTP1_ONLY_TTL
+
+    def find(self, address, sni) -> Optional[Http2UpstreamConnection]:
+        """
+        Returns an existing usable connection, without connecting.
+        """
+        conn = self.connections.get((tuple(address), sni))
+        if conn is not None and conn.usable():
+            return conn
+        return None
+
+    def get(self, address, sni) -> Optional[Http2UpstreamConnection]:
+        """
+        Returns a usable connection, connecting if needed, or None if the
+        server does not speak HTTP/2.
+        """
+        key = (tuple(address), sni)
+        if self.closed or self._is_http1_only(key):
+            return None
+        conn = self.find(address, sni)
+        if conn is not None:
+            return conn
+
+        with self._lock:
+            connect_lock = self._connect_locks.setdefault(key, threading.Lock())
+        # Concurrent requests to the same origin wait for a single connection attempt.
+        with connect_lock:
+            if self.closed or self._is_http1_only(key):
+                return None
+            conn = self.find(address, sni)
+            if conn is None:
+                conn = self._connect(key)
+            return conn
+
+    def _connect(self, key) -> Optional[Http2UpstreamConnection]:
+        address, sni = key
+        server_conn = connections.ServerConnection(address)
+        server_conn.resolver = self.resolver
+        server_conn.connect()
+        tcp.set_socket_options(server_conn.connection, **tcp.socket_arguments_from_options(self.options))
+        try:
+            server_conn.establish_tls(
+                sni=sni,
+                alpn_protos=[b"h2", b"http/1.1"],
+                **net_tls.client_arguments_from_options(self.options)
+            )
+        except exceptions.InvalidCertificateException as e:
+            server_conn.finish()
+            raise exceptions.InvalidServerCertificate(str(e))
+        except exceptions.TlsException as e:
+            server_conn.finish()
+            raise exceptions.TlsProtocolException(
+                "Cannot establish TLS with {host}:{port} (sni: {sni}): {e}".format(
+                    host=address[0], port=address[1], sni=sni, e=repr(e)
+                )
+            )
+
+        if server_conn.alpn_proto_negotiated != b"h2":
+            server_conn.finish()
+            server_conn.close()
+            self._add_http1_only(key)
+            return None
+
+        conn = Http2UpstreamConnection(server_conn, functools.partial(self._evict, key))
+        with self._lock:
+            closed = self.closed
+            if not closed:
+                self.connections[key] = conn
+        if closed:
+            conn.close()
+            return None
+        return conn
+
@@ -14,8 +14,30 @@ class HttpProxy(protocol.Layer, protocol.ServerConnectionMixin):
 
 class HttpUpstreamProxy(protocol.Layer, protocol.ServerConnectionMixin):
 
-    def __init__(self, ctx, server_address):
-        super().__init__(ctx, server_address=server_address)
+    def __init__(self, ctx, upstream_router):
+        # The upstream proxy this connection is routed through
+        self.current_upstream = None
+        upstream = self._use(upstream_router.select(None))
+        super().__init__(ctx, server_address=upstream.address)
+
+    def route_upstream(self, host):
+        """
+        Chooses the upstream proxy for a request to host, keeping the current
+        one where the router allows. Returns None if upstream proxies are no
+        longer configured.
+        """
+        router = self.config.upstream_router
+        if router is None:
+            return None
+        return self._use(router.select(host, self.current_upstream))
+
+    def _use(self, upstream):
+        if upstream is not self.current_upstream:
+            upstream.acquire()
+            if self.current_upstream is not None:
+                self.current_upstream.release()
+            self.current_upstream = upstream
+        return upstream
 
     def __call__(self):
         layer = self.ctx.next_layer(self)
@@ -24,3 +46,4 @@ class HttpUpstreamProxy(protocol.Layer, protocol.ServerConnectionMixin):
         finally:
             if self.server_conn.connected():
                 self.disconnect()
+            self.current_upstream.release()
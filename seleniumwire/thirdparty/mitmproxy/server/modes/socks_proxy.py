@@ -13,13 +13,13 @@ class SocksUpstreamProxy(protocol.Layer, protocol.ServerConnectionMixin):
     def _make_connection(self, upstream_server, upstream_auth):
         socks_config = self._create_socks_config(upstream_server, upstream_auth)
 
-        if self.config.options.spoof_source_address and self.config.options.upstream_bind_address == '':
+        if self.snapshot.spoof_source_address and self.snapshot.upstream_bind_address == '':
             return connections.SocksServerConnection(
                 socks_config, None, (self.ctx.client_conn.address[0], 0), True)
         else:
             return connections.SocksServerConnection(
-                socks_config, None, (self.config.options.upstream_bind_address, 0),
-                self.config.options.spoof_source_address
+                socks_config, None, (self.snapshot.upstream_bind_address, 0),
+                self.snapshot.spoof_source_address
             )
 
     def _create_socks_config(self, upstream_server, upstream_auth):
@@ -28,14 +28,13 @@ should be established as late as possible; this makes server replay without any
 outgoing connections possible.
 """
 
+import importlib
 
 from .base import Layer, ServerConnectionMixin
 from .http import HttpLayer, UpstreamConnectLayer
 from .http1 import Http1Layer
-from .http2 import Http2Layer
 from .rawtcp import RawTCPLayer
 from .tls import TlsLayer
-from .websocket import WebSocketLayer
 
 __all__ = [
     "Layer", "ServerConnectionMixin",
@@ -47,3 +46,18 @@ __all__ = [
     "WebSocketLayer",
     "RawTCPLayer",
 ]
+
+# Http2Layer and WebSocketLayer are imported on first access,
+# so that h2 and wsproto are only loaded when needed.
+_lazy_layers = {
+    "Http2Layer": ".http2",
+    "WebSocketLayer": ".websocket",
+}
+
+
+def __getattr__(name):
+    try:
+        module = _lazy_layers[name]
+    except KeyError:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    return getattr(importlib.import_module(module, __name__), name)
@@ -2,6 +2,7 @@ import traceback
 
 from seleniumwire.thirdparty.mitmproxy import controller  # noqa
 from seleniumwire.thirdparty.mitmproxy import connections, exceptions
+from seleniumwire.thirdparty.mitmproxy.net import tcp
 from seleniumwire.thirdparty.mitmproxy.server import config  # noqa
 
 
@@ -16,6 +17,7 @@ class _LayerCodeCompletion:
         if True:
             return
         self.config: config.ProxyConfig = None
+        self.snapshot: config.OptionsSnapshot = None
         self.client_conn: connections.ClientConnection = None
         self.server_conn: connections.ServerConnection = None
         self.channel: controller.Channel = None
@@ -113,11 +115,11 @@ class ServerConnectionMixin:
         if address:
             forbidden_hosts = ["localhost", "127.0.0.1", "::1"]
 
-            if self.config.options.listen_host:
-                forbidden_hosts.append(self.config.options.listen_host)
+            if self.snapshot.listen_host:
+                forbidden_hosts.append(self.snapshot.listen_host)
 
             self_connect = (
-                address[1] == self.config.options.listen_port and
+                address[1] == self.snapshot.listen_port and
                 address[0] in forbidden_hosts
             )
             if self_connect:
@@ -127,13 +129,13 @@ class ServerConnectionMixin:
                 )
 
     def __make_server_conn(self, server_address):
-        if self.config.options.spoof_source_address and self.config.options.upstream_bind_address == '':
+        if self.snapshot.spoof_source_address and self.snapshot.upstream_bind_address == '':
             return connections.ServerConnection(
                 server_address, (self.ctx.client_conn.address[0], 0), True)
         else:
             return connections.ServerConnection(
-                server_address, (self.config.options.upstream_bind_address, 0),
-                self.config.options.spoof_source_address
+                server_address, (self.snapshot.upstream_bind_address, 0),
+                self.snapshot.spoof_source_address
             )
 
     def set_server(self, address):
@@ -142,7 +144,8 @@ class ServerConnectionMixin:
         """
         if self.server_conn.connected():
             self.disconnect()
-        self.log("Set new server address: {}:{}".format(address[0], address[1]), "debug")
+        if self.log_enabled("debug"):
+            self.log("Set new server address: {}:{}".format(address[0], address[1]), "debug")
         self.server_conn.address = address
         self.__check_self_connect()
 
@@ -151,7 +154,8 @@ class ServerConnectionMixin:
         Deletes (and closes) an existing server connection.
         Must not be called if there is no existing connection.
         """
-        self.log("serverdisconnect", "debug", [repr(self.server_conn.address)])
+        if self.log_enabled("debug"):
+            self.log("serverdisconnect", "debug", [repr(self.server_conn.address)])
         address = self.server_conn.address
         self.server_conn.finish()
         self.server_conn.close()
@@ -171,11 +175,16 @@ class ServerConnectionMixin:
         if not self.server_conn.address:
             raise exceptions.ProtocolException("Cannot connect to server, no server address given.")
         try:
+            self.server_conn.resolver = self.config.resolver
             self.server_conn.connect()
-            self.log("serverconnect", "debug", [repr(self.server_conn.address)])
+            tcp.set_socket_options(self.server_conn.connection, **self.config.socket_options)
+            self.server_conn.rfile.counter = self.channel.metrics.server_bytes_received
+            self.server_conn.wfile.counter = self.channel.metrics.server_bytes_sent
+            if self.log_enabled("debug"):
+                self.log("serverconnect", "debug", [repr(self.server_conn.address)])
             self.channel.ask("serverconnect", self.server_conn)
         except exceptions.TcpException as e:
-            if self.config.options.suppress_connection_errors:
+            if self.snapshot.suppress_connection_errors:
                 self.log(repr(e), "debug")
             else:
                 self.log(repr(e), "error")
@@ -1,21 +1,27 @@
 import base64
 import enum
 import logging
+import sys
 import textwrap
 import time
 
-import h2.exceptions
-
 from seleniumwire.thirdparty.mitmproxy import connections  # noqa
 from seleniumwire.thirdparty.mitmproxy import exceptions, flow, http
 from seleniumwire.thirdparty.mitmproxy.net import websockets
 from seleniumwire.thirdparty.mitmproxy.server.protocol import base
-from seleniumwire.thirdparty.mitmproxy.server.protocol.websocket import WebSocketLayer
 from seleniumwire.thirdparty.mitmproxy.utils import strutils
 
 log = logging.getLogger(__name__)
 
 
+def _h2_errors() -> tuple:
+    # h2 is only imported once HTTP/2 is used, and until then cannot have raised
+    h2_exceptions = sys.modules.get("h2.exceptions")
+    if h2_exceptions is None:
+        return ()
+    return (h2_exceptions.H2Error,)
+
+
 class _HttpTransmissionLayer(base.Layer):
     def read_request_headers(self, flow):
         raise NotImplementedError()
@@ -23,6 +29,9 @@ class _HttpTransmissionLayer(base.Layer):
     def read_request_body(self, request):
         raise NotImplementedError()
 
+    def read_request_content(self, request):
+        return b"".join(self.read_request_body(request))
+
     def read_request_trailers(self, request):
         raise NotImplementedError()
 
@@ -36,14 +45,15 @@ class _HttpTransmissionLayer(base.Layer):
         raise NotImplementedError()
         yield "this is a generator"  # pragma: no cover
 
+    def read_response_content(self, request, response):
+        return b"".join(self.read_response_body(request, response))
+
     def read_response_trailers(self, request, response):
         raise NotImplementedError()
 
     def read_response(self, request):
         response = self.read_response_headers()
-        response.data.content = b"".join(
-            self.read_response_body(request, response)
-        )
+        response.data.content = self.read_response_content(request, response)
         response.data.trailers = self.read_response_trailers(request, response)
         return response
 
@@ -66,6 +76,20 @@ class _HttpTransmissionLayer(base.Layer):
     def check_close_connection(self, f):
         raise NotImplementedError()
 
+    def start_flow(self, options):
+        """
+        Called before each flow is read, with the options snapshot
+        that the whole flow is handled with.
+        """
+        self.snapshot = options
+
+    def open_http2_upstream(self, request):
+        """
+        Returns the shared HTTP/2 upstream connection the request will be sent
+        on, or None if it uses this layer's server connection.
+        """
+        return None
+
 
 class ConnectServerConnection:
 
@@ -107,6 +131,8 @@ class UpstreamConnectLayer(base.Layer):
             "Proxy Server: {}".format(self.ctx.server_conn.address),
             "Connect to: {}:{}".format(self.connect_request.host, self.connect_request.port)
         ])
+        # The connection may have been moved to an upstream proxy with other credentials
+        self.apply_proxy_auth(self.connect_request)
         self.send_request(self.connect_request)
         resp = self.read_response(self.connect_request)
         if resp.status_code != 200:
@@ -245,9 +271,7 @@ class HttpLayer(base.Layer):
             )
             self.send_request(f.request)
             f.response = self.read_response_headers()
-            f.response.data.content = b"".join(
-                self.read_response_body(f.request, f.response)
-            )
+            f.response.data.content = self.read_response_content(f.request, f.response)
         self.send_response(f.response)
         if is_ok(f.response.status_code):
             layer = UpstreamConnectLayer(self, f.request)
@@ -257,6 +281,9 @@ class HttpLayer(base.Layer):
         return False
 
     def _process_flow(self, f):
+        # Taken once, so that the whole flow and the layers it starts see the same options
+        self.snapshot = options = self.config.snapshot
+        self.start_flow(options)
         try:
             try:
                 request: http.HTTPRequest = self.read_request_headers(f)
@@ -267,18 +294,27 @@ class HttpLayer(base.Layer):
 
             f.request = request
 
-            if (self.mode is HTTPMode.upstream or "socks" in self.config.options.mode) and \
+            if self.config.check_block and self.config.check_block(request.host):
+                # Refused before the CONNECT is answered or a server connection is made
+                self.channel.metrics.requests_blocked.inc()
+                self.log("Blocked request to {}".format(request.host), "debug")
+                self.send_error_response(403, "Blocked host: {}".format(request.host))
+                return False
+
+            if (self.mode is HTTPMode.upstream or self.config.upstream_socks) and \
                     self.matches_no_proxy(f.request):
                 self.set_server((f.request.host, f.request.port))
                 self.mode = HTTPMode.regular
                 self.server_conn.use_socks = False
 
+            if self.mode is HTTPMode.upstream or isinstance(self.server_conn, ConnectServerConnection):
+                if not self.route_upstream_proxy(f.request):
+                    return False
+
             if request.first_line_format == "authority":
                 # The standards are silent on what we should do with a CONNECT
                 # request body, so although it's not common, it's allowed.
-                f.request.data.content = b"".join(
-                    self.read_request_body(f.request)
-                )
+                f.request.data.content = self.read_request_content(f.request)
                 f.request.data.trailers = self.read_request_trailers(f.request)
                 f.request.timestamp_end = time.time()
                 self.channel.ask("http_connect", f)
@@ -286,22 +322,22 @@ class HttpLayer(base.Layer):
                 if self.mode is HTTPMode.regular:
                     return self.handle_regular_connect(f)
                 elif self.mode is HTTPMode.upstream:
-                    self.apply_proxy_auth(f)
+                    self.apply_proxy_auth(f.request)
                     return self.handle_upstream_connect(f)
                 else:
                     msg = "Unexpected CONNECT request."
                     self.send_error_response(400, msg)
                     return False
 
-            if not self.config.options.relax_http_form_validation:
+            if not options.relax_http_form_validation:
                 validate_request_form(self.mode, request)
             self.channel.ask("requestheaders", f)
 
             if self.mode is HTTPMode.upstream and not f.server_conn.via:
-                self.apply_proxy_auth(f)
+                self.apply_proxy_auth(f.request)
 
             # Re-validate request form in case the user has changed something.
-            if not self.config.options.relax_http_form_validation:
+            if not options.relax_http_form_validation:
                 validate_request_form(self.mode, request)
 
             if request.headers.get("expect", "").lower() == "100-continue":
@@ -313,7 +349,7 @@ class HttpLayer(base.Layer):
             if f.request.stream:
                 f.request.data.content = None
             else:
-                f.request.data.content = b"".join(self.read_request_body(request))
+                f.request.data.content = self.read_request_content(request)
 
             f.request.data.trailers = self.read_request_trailers(f.request)
 
@@ -327,13 +363,14 @@ class HttpLayer(base.Layer):
             f.error = flow.Error(str(e))
             self.channel.ask("error", f)
             msg = "HTTP protocol error in client request: {}".format(e)
-            if self.config.options.suppress_connection_errors:
+            if options.suppress_connection_errors:
                 self.log("request", "debug", [msg])
             else:
                 self.log("request", "warn", [msg])
             return False
 
-        self.log("request", "debug", [repr(request)])
+        if self.log_enabled("debug"):
+            self.log("request", "debug", [repr(request)])
 
         # set first line format to relative in regular mode,
         # see https://github.com/mitmproxy/mitmproxy/issues/1759
@@ -341,7 +378,7 @@ class HttpLayer(base.Layer):
             request.authority = ""
 
         # update host header in reverse mitmproxy mode
-        if self.config.options.mode.startswith("reverse:") and not self.config.options.keep_host_header:
+        if options.mode.startswith("reverse:") and not options.keep_host_header:
             f.request.host_header = self.config.upstream_server.address[0]
 
         # Determine .scheme, .host and .port attributes for inline scripts. For
@@ -365,11 +402,13 @@ class HttpLayer(base.Layer):
                 self.channel.ask("websocket_handshake", f)
 
             if not f.response:
-                self.establish_server_connection(
-                    f.request.host,
-                    f.request.port,
-                    f.request.scheme
-                )
+                upstream = self.open_http2_upstream(f.request)
+                if upstream is None:
+                    self.establish_server_connection(
+                        f.request.host,
+                        f.request.port,
+                        f.request.scheme
+                    )
 
                 def get_response():
                     self.send_request_headers(f.request)
@@ -429,14 +468,12 @@ class HttpLayer(base.Layer):
                 if f.response.stream:
                     f.response.data.content = None
                 else:
-                    f.response.data.content = b"".join(
-                        self.read_response_body(f.request, f.response)
-                    )
+                    f.response.data.content = self.read_response_content(f.request, f.response)
                 f.response.timestamp_end = time.time()
 
                 # no further manipulation of self.server_conn beyond this point
                 # we can safely set it as the final attribute value here.
-                f.server_conn = self.server_conn
+                f.server_conn = upstream.server_conn if upstream else self.server_conn
             else:
                 # response was set by an inline script.
                 # we now need to emulate the responseheaders hook.
@@ -444,7 +481,8 @@ class HttpLayer(base.Layer):
 
             f.response.data.trailers = self.read_response_trailers(f.request, f.response)
 
-            self.log("response", "debug", [repr(f.response)])
+            if self.log_enabled("debug"):
+                self.log("response", "debug", [repr(f.response)])
             self.channel.ask("response", f)
 
             if not f.response.stream:
@@ -477,13 +515,14 @@ class HttpLayer(base.Layer):
                     websockets.check_handshake(f.request.headers) and
                     websockets.check_handshake(f.response.headers)
                 )
-                if is_websocket and not self.config.options.websocket:
+                if is_websocket and not options.websocket:
                     self.log(
                         "Client requested WebSocket connection, but the protocol is disabled.",
                         "info"
                     )
 
-                if is_websocket and self.config.options.websocket:
+                if is_websocket and options.websocket:
+                    from seleniumwire.thirdparty.mitmproxy.server.protocol.websocket import WebSocketLayer
                     layer = WebSocketLayer(self, f)
                 else:
                     layer = self.ctx.next_layer(self)
@@ -510,7 +549,7 @@ class HttpLayer(base.Layer):
         try:
             response = http.make_error_response(code, message, headers)
             self.send_response(response)
-        except (exceptions.NetlibException, h2.exceptions.H2Error, exceptions.Http2ProtocolException):
+        except (exceptions.NetlibException, exceptions.Http2ProtocolException) + _h2_errors():
             self.log("Failed to send error response to client: {}".format(message), "debug")
 
     def change_upstream_proxy_server(self, address):
@@ -545,40 +584,39 @@ class HttpLayer(base.Layer):
 
         This checks whether the request address is in the no_proxy list.
         """
-        no_proxy = False
-
-        for addr in self.config.options.no_proxy:
-            host, *port = addr.split(':')
-
-            if request.host.endswith(host):
-                no_proxy = True
-
-                if port:
-                    # The user has specified a port, so this also needs to match
-                    no_proxy = int(port[0]) == request.port
+        matcher = self.config.check_no_proxy
+        return bool(matcher) and matcher(request.host, request.port)
 
-            if no_proxy:
-                break
+    def route_upstream_proxy(self, request):
+        """
+        Moves the connection to the upstream proxy chosen for the request, if
+        it isn't already using it. The client connection is left alone.
 
-        return no_proxy
+        Returns False if the client connection had to be closed instead.
+        """
+        previous = self.current_upstream
+        upstream = self.route_upstream(request.host)
+        if upstream is not None and upstream.address == previous.address:
+            return True
+        if upstream is None or request.is_http2:
+            # Either upstream proxies have been switched off since the connection
+            # was made, or its HTTP/2 streams share the server connection, so
+            # have the client make a new connection.
+            self.client_conn.finish()
+            return False
+        self.change_upstream_proxy_server(upstream.address)
+        return True
 
-    def apply_proxy_auth(self, f):
+    def apply_proxy_auth(self, request):
         """Apply proxy authorization to the request if configured."""
-        auth = None
-
-        try:
-            auth = self.config.options.upstream_custom_auth
-        except AttributeError:
-            pass
+        auth = self.snapshot.upstream_custom_auth
 
         if not auth:
-            try:
-                auth = self.config.options.upstream_auth
+            # The credentials for the upstream proxy the connection is routed through
+            auth = self.current_upstream.auth
 
-                if auth:
-                    auth = b"Basic" + b" " + base64.b64encode(strutils.always_bytes(auth))
-            except AttributeError:
-                pass
+            if auth:
+                auth = b"Basic" + b" " + base64.b64encode(strutils.always_bytes(auth))
 
         if auth:
-            f.request.headers["Proxy-Authorization"] = auth
+            request.headers["Proxy-Authorization"] = auth
@@ -1,6 +1,5 @@
 from seleniumwire.thirdparty.mitmproxy.net.http import http1
 from seleniumwire.thirdparty.mitmproxy.server.protocol import http as httpbase
-from seleniumwire.thirdparty.mitmproxy.utils import human
 
 
 class Http1Layer(httpbase._HttpTransmissionLayer):
@@ -8,6 +7,14 @@ class Http1Layer(httpbase._HttpTransmissionLayer):
     def __init__(self, ctx, mode):
         super().__init__(ctx)
         self.mode = mode
+        # Set for the current flow if it is sent over a shared HTTP/2 connection
+        self.http2_upstream = None
+        self.http2_upstream_stream = None
+
+    def start_flow(self, options):
+        super().start_flow(options)
+        self.http2_upstream = None
+        self.http2_upstream_stream = None
 
     def read_request_headers(self, flow):
         return http1.read_request_head(self.client_conn.rfile)
@@ -17,7 +24,15 @@ class Http1Layer(httpbase._HttpTransmissionLayer):
         return http1.read_body(
             self.client_conn.rfile,
             expected_size,
-            human.parse_size(self.config.options.body_size_limit)
+            self.snapshot.body_size_limit
+        )
+
+    def read_request_content(self, request):
+        expected_size = http1.expected_http_body_size(request)
+        return http1.read_body_content(
+            self.client_conn.rfile,
+            expected_size,
+            self.snapshot.body_size_limit
         )
 
     def read_request_trailers(self, request):
@@ -26,12 +41,29 @@ class Http1Layer(httpbase._HttpTransmissionLayer):
             self.log("HTTP/1.1 request trailer headers are not implemented yet!", "warn")
         return None
 
+    def open_http2_upstream(self, request):
+        if self.config.http2_upstream is None:
+            return None
+        from seleniumwire.thirdparty.mitmproxy.server import http2_upstream
+        if http2_upstream.can_bridge(self.snapshot, request):
+            self.http2_upstream = self.config.http2_upstream.get((request.host, request.port), request.host)
+        return self.http2_upstream
+
     def send_request_headers(self, request):
+        if self.http2_upstream:
+            if not self.http2_upstream.usable():
+                # the server went away since open_http2_upstream()
+                self.http2_upstream = self.config.http2_upstream.get((request.host, request.port), request.host)
+            self.http2_upstream_stream = self.http2_upstream.send_request_headers(request)
+            return
         headers = http1.assemble_request_head(request)
         self.server_conn.wfile.write(headers)
         self.server_conn.wfile.flush()
 
     def send_request_body(self, request, chunks):
+        if self.http2_upstream_stream:
+            self.http2_upstream_stream.send_body(chunks)
+            return
         for chunk in http1.assemble_body(request.headers, chunks, request.trailers):
             self.server_conn.wfile.write(chunk)
             self.server_conn.wfile.flush()
@@ -45,23 +77,48 @@ class Http1Layer(httpbase._HttpTransmissionLayer):
         self.server_conn.wfile.flush()
 
     def read_response_headers(self):
+        if self.http2_upstream_stream:
+            return self.http2_upstream_stream.read_response_headers()
         return http1.read_response_head(self.server_conn.rfile)
 
     def read_response_body(self, request, response):
+        if self.http2_upstream_stream:
+            return self.http2_upstream_stream.read_response_body(
+                self.snapshot.body_size_limit
+            )
         expected_size = http1.expected_http_body_size(request, response)
         return http1.read_body(
             self.server_conn.rfile,
             expected_size,
-            human.parse_size(self.config.options.body_size_limit)
+            self.snapshot.body_size_limit
+        )
+
+    def read_response_content(self, request, response):
+        if self.http2_upstream_stream:
+            return b"".join(self.read_response_body(request, response))
+        expected_size = http1.expected_http_body_size(request, response)
+        return http1.read_body_content(
+            self.server_conn.rfile,
+            expected_size,
+            self.snapshot.body_size_limit
         )
 
     def read_response_trailers(self, request, response):
+        if self.http2_upstream_stream:
+            # HTTP/2 trailers are not forwarded to HTTP/1.1 clients
+            return None
         # Trailers should actually be parsed unconditionally, the "Trailer" header is optional
         if "Trailer" in response.headers:
             # TODO: not implemented yet
             self.log("HTTP/1.1 trailer headers are not implemented yet!", "warn")
         return None
 
+    def send_response(self, response):
+        # Send the head and body together so that a small response goes
+        # out in a single syscall (or TLS record).
+        self.client_conn.wfile.writev(http1.assemble_response_buffers(response))
+        self.client_conn.wfile.flush()
+
     def send_response_headers(self, response):
         raw = http1.assemble_response_head(response)
         self.client_conn.wfile.write(raw)
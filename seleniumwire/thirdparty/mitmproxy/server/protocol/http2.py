@@ -6,6 +6,7 @@ import types
 from typing import Any, Callable, Dict, List, Optional  # noqa
 
 import h2.exceptions
+import h2.settings
 from h2 import connection, events
 
 import seleniumwire.thirdparty.mitmproxy.net.http
@@ -13,9 +14,8 @@ from seleniumwire.thirdparty.mitmproxy import connections, exceptions, http  # n
 from seleniumwire.thirdparty.mitmproxy import flow
 from seleniumwire.thirdparty.mitmproxy.coretypes import basethread
 from seleniumwire.thirdparty.mitmproxy.net import tcp
-from seleniumwire.thirdparty.mitmproxy.net.http import headers, http2, url
+from seleniumwire.thirdparty.mitmproxy.net.http import headers, url
 from seleniumwire.thirdparty.mitmproxy.server.protocol import http as httpbase, base
-from seleniumwire.thirdparty.mitmproxy.utils import human
 
 
 class SafeH2Connection(connection.H2Connection):
@@ -24,14 +24,24 @@ class SafeH2Connection(connection.H2Connection):
         super().__init__(*args, **kwargs)
         self.conn = conn
         self.lock = threading.RLock()
+        # notified whenever frames from the peer have been processed, e.g. a
+        # WINDOW_UPDATE or a closed stream that frees a concurrency slot
+        self.updated = threading.Condition(self.lock)
 
-    def safe_acknowledge_received_data(self, acknowledged_size: int, stream_id: int):
+    def flush(self):
+        with self.lock:
+            data = self.data_to_send()
+            if data:
+                self.conn.send(data)
+
+    def safe_acknowledge_received_data(self, acknowledged_size: int, stream_id: int, flush: bool = True):
         if acknowledged_size == 0:
             return
 
         with self.lock:
             self.acknowledge_received_data(acknowledged_size, stream_id)
-            self.conn.send(self.data_to_send())
+            if flush:
+                self.conn.send(self.data_to_send())
 
     def safe_reset_stream(self, stream_id: int, error_code: int):
         with self.lock:
@@ -62,8 +72,8 @@ class SafeH2Connection(connection.H2Connection):
                 max_outbound_frame_size = self.max_outbound_frame_size
                 frame_chunk = chunk[position:position + max_outbound_frame_size]
                 if self.local_flow_control_window(stream_id) < len(frame_chunk):  # pragma: no cover
+                    self.updated.wait(0.1)
                     self.lock.release()
-                    time.sleep(0.1)
                     continue
                 self.send_data(stream_id, frame_chunk)
                 try:
@@ -87,17 +97,25 @@ class Http2Layer(base.Layer):
         client_conn: connections.ClientConnection = None
 
     class H2ConnLogger:
-        def __init__(self, name, log):
+        def __init__(self, name, log, log_enabled):
             self.name = name
             self.log = log
+            self.log_enabled = log_enabled
 
         def debug(self, fmtstr, *args):
-            msg = "H2Conn {}: {}".format(self.name, fmtstr % args)
-            self.log(msg, "debug")
+            if self.log_enabled("debug"):
+                msg = "H2Conn {}: {}".format(self.name, fmtstr % args)
+                self.log(msg, "debug")
 
         def trace(self, fmtstr, *args):
             pass
 
+    # Upper bound for the bytes taken off a connection per wakeup
+    READ_SIZE = 1024 * 256
+    # Receive window advertised to both peers. The protocol default of 64KB
+    # caps each stream at one window per round trip through this layer.
+    WINDOW_SIZE = 1024 * 1024 * 4
+
     def __init__(self, ctx, mode: str) -> None:
         super().__init__(ctx)
         self.mode = mode
@@ -110,7 +128,7 @@ class Http2Layer(base.Layer):
             header_encoding=False,
             validate_outbound_headers=False,
             validate_inbound_headers=False,
-            logger=self.H2ConnLogger("client", self.log))
+            logger=self.H2ConnLogger("client", self.log, self.log_enabled))
         self.connections[self.client_conn] = SafeH2Connection(self.client_conn, config=config)
 
     def _initiate_server_conn(self):
@@ -120,28 +138,35 @@ class Http2Layer(base.Layer):
                 header_encoding=False,
                 validate_outbound_headers=False,
                 validate_inbound_headers=False,
-                logger=self.H2ConnLogger("server", self.log))
+                logger=self.H2ConnLogger("server", self.log, self.log_enabled))
             self.connections[self.server_conn] = SafeH2Connection(self.server_conn, config=config)
         self.connections[self.server_conn].initiate_connection()
+        self._open_window(self.connections[self.server_conn])
         self.server_conn.send(self.connections[self.server_conn].data_to_send())
 
     def _complete_handshake(self):
         preamble = self.client_conn.rfile.read(24)
         self.connections[self.client_conn].initiate_connection()
+        self._open_window(self.connections[self.client_conn])
         self.connections[self.client_conn].receive_data(preamble)
         self.client_conn.send(self.connections[self.client_conn].data_to_send())
 
+    def _open_window(self, h2_conn):
+        h2_conn.update_settings({h2.settings.SettingCodes.INITIAL_WINDOW_SIZE: self.WINDOW_SIZE})
+        h2_conn.increment_flow_control_window(self.WINDOW_SIZE - h2_conn.inbound_flow_control_window)
+
     def next_layer(self):  # pragma: no cover
         # WebSocket over HTTP/2?
         # CONNECT for proxying?
         raise NotImplementedError()
 
     def _handle_event(self, event, source_conn, other_conn, is_server):
-        self.log(
-            "HTTP2 Event from {}".format("server" if is_server else "client"),
-            "debug",
-            [repr(event)]
-        )
+        if self.log_enabled("debug"):
+            self.log(
+                "HTTP2 Event from {}".format("server" if is_server else "client"),
+                "debug",
+                [repr(event)]
+            )
 
         eid = None
         if hasattr(event, 'stream_id'):
@@ -196,7 +221,7 @@ class Http2Layer(base.Layer):
         return True
 
     def _handle_data_received(self, eid, event, source_conn):
-        bsl = human.parse_size(self.config.options.body_size_limit)
+        bsl = self.streams[eid].snapshot.body_size_limit
         if bsl and self.streams[eid].queued_data_length > bsl:
             self.streams[eid].kill()
             self.connections[source_conn].safe_reset_stream(
@@ -208,16 +233,18 @@ class Http2Layer(base.Layer):
             self.streams[eid].data_queue.put(event.data)
             self.streams[eid].queued_data_length += len(event.data)
 
-        # always acknowledge receved data with a WINDOW_UPDATE frame
+        # always acknowledge receved data with a WINDOW_UPDATE frame,
+        # it is sent together with the rest of this read by __call__
         self.connections[source_conn].safe_acknowledge_received_data(
             event.flow_controlled_length,
-            event.stream_id
+            event.stream_id,
+            flush=False
         )
         return True
 
     def _handle_stream_ended(self, eid):
         self.streams[eid].timestamp_end = time.time()
-        self.streams[eid].stream_ended.set()
+        self.streams[eid].end_stream()
         return True
 
     def _handle_stream_reset(self, eid, event, is_server, other_conn):
@@ -281,12 +308,12 @@ class Http2Layer(base.Layer):
         self.streams[event.pushed_stream_id].parent_stream_id = parent_eid
         self.streams[event.pushed_stream_id].timestamp_end = time.time()
         self.streams[event.pushed_stream_id].request_message.arrived.set()
-        self.streams[event.pushed_stream_id].request_message.stream_ended.set()
+        self.streams[event.pushed_stream_id].request_message.end()
         self.streams[event.pushed_stream_id].start()
         return True
 
     def _handle_priority_updated(self, eid, event):
-        if not self.config.options.http2_priority:
+        if not self.snapshot.http2_priority:
             self.log("HTTP/2 PRIORITY frame suppressed. Use --http2-priority to enable forwarding.", "debug")
             return True
 
@@ -357,9 +384,15 @@ class Http2Layer(base.Layer):
 
                     with self.connections[source_conn].lock:
                         try:
-                            raw_frame = b''.join(http2.read_raw_frame(source_conn.rfile))
+                            # Take everything that is already buffered rather than a single
+                            # frame, h2 keeps any trailing partial frame until the next read.
+                            data = source_conn.rfile.read_available(self.READ_SIZE)
                         except:
-                            # read frame failed: connection closed
+                            # read failed: connection closed
+                            self._kill_all_streams()
+                            return
+                        if not data:
+                            # connection closed
                             self._kill_all_streams()
                             return
 
@@ -367,8 +400,7 @@ class Http2Layer(base.Layer):
                             self.log("HTTP/2 connection entered closed state already", "debug")
                             return
 
-                        incoming_events = self.connections[source_conn].receive_data(raw_frame)
-                        source_conn.send(self.connections[source_conn].data_to_send())
+                        incoming_events = self.connections[source_conn].receive_data(data)
 
                         for event in incoming_events:
                             if not self._handle_event(event, source_conn, other_conn, is_server):
@@ -376,6 +408,10 @@ class Http2Layer(base.Layer):
                                 self._kill_all_streams()
                                 return
 
+                        # ACKs and WINDOW_UPDATEs for everything read go out in one write
+                        self.connections[source_conn].flush()
+                        self.connections[source_conn].updated.notify_all()
+
                     self._cleanup_streams()
         except Exception as e:  # pragma: no cover
             self.log(repr(e), "info")
@@ -393,22 +429,40 @@ def detect_zombie_stream(func):  # pragma: no cover
     return wrapper
 
 
-class Http2SingleStreamLayer(httpbase._HttpTransmissionLayer, basethread.BaseThread):
+# Streams are handled on pooled threads, so that a connection opening
+# hundreds of short-lived streams does not start a thread for each of them.
+stream_workers = basethread.WorkerPool("Http2SingleStreamLayer")
+
+
+class Http2SingleStreamLayer(httpbase._HttpTransmissionLayer):
 
     class Message:
         def __init__(self, headers=None):
             self.headers: Optional[seleniumwire.thirdparty.mitmproxy.net.http.Headers] = headers  # headers are the first thing to be received on a new stream
-            self.data_queue: queue.Queue[bytes] = queue.Queue()  # contains raw contents of DATA frames
-            self.queued_data_length = 0  # used to enforce seleniumwire.thirdparty.mitmproxy's config.options.body_size_limit
+            self.data_queue: queue.Queue[Optional[bytes]] = queue.Queue()  # contains raw contents of DATA frames, None once ended
+            self.queued_data_length = 0  # used to enforce the snapshot body_size_limit
             self.trailers: Optional[seleniumwire.thirdparty.mitmproxy.net.http.Headers] = None  # trailers are received after stream_ended is set
 
             self.arrived = threading.Event()  # indicates the HEADERS+CONTINUTATION frames have been received
             self.stream_ended = threading.Event()  # indicates the a frame with the END_STREAM flag has been received
 
+        def end(self):
+            if not self.stream_ended.is_set():
+                self.stream_ended.set()
+                # wake up a reader blocked on the data queue
+                self.data_queue.put(None)
+
+        def read_body(self, raise_zombie):
+            while True:
+                chunk = self.data_queue.get()
+                if chunk is None:
+                    break
+                yield chunk
+            raise_zombie()
+
     def __init__(self, ctx, h2_connection, stream_id: int, request_headers: seleniumwire.thirdparty.mitmproxy.net.http.Headers) -> None:
-        super().__init__(
-            ctx, name="Http2SingleStreamLayer-{}".format(stream_id)
-        )
+        super().__init__(ctx)
+        self.name = "Http2SingleStreamLayer-{}".format(stream_id)
         self.h2_connection = h2_connection
         self.zombie: Optional[float] = None
         self.client_stream_id: int = stream_id
@@ -429,10 +483,10 @@ class Http2SingleStreamLayer(httpbase._HttpTransmissionLayer, basethread.BaseThr
     def kill(self):
         if not self.zombie:
             self.zombie = time.time()
-            self.request_message.stream_ended.set()
+            self.request_message.end()
             self.request_message.arrived.set()
             self.response_message.arrived.set()
-            self.response_message.stream_ended.set()
+            self.response_message.end()
 
     def connect(self):  # pragma: no cover
         raise exceptions.Http2ProtocolException("HTTP2 layer should already have a connection.")
@@ -475,6 +529,12 @@ class Http2SingleStreamLayer(httpbase._HttpTransmissionLayer, basethread.BaseThr
         else:
             return self.request_message.stream_ended
 
+    def end_stream(self):
+        if self.response_message.arrived.is_set():
+            self.response_message.end()
+        else:
+            self.request_message.end()
+
     @property
     def trailers(self):
         if self.response_message.arrived.is_set():
@@ -533,17 +593,7 @@ class Http2SingleStreamLayer(httpbase._HttpTransmissionLayer, basethread.BaseThr
         if not request.stream:
             self.request_message.stream_ended.wait()
 
-        while True:
-            try:
-                yield self.request_message.data_queue.get(timeout=0.1)
-            except queue.Empty:  # pragma: no cover
-                pass
-            if self.request_message.stream_ended.is_set():
-                self.raise_zombie()
-                while self.request_message.data_queue.qsize() > 0:
-                    yield self.request_message.data_queue.get()
-                break
-            self.raise_zombie()
+        yield from self.request_message.read_body(self.raise_zombie)
 
     @detect_zombie_stream
     def read_request_trailers(self, request):
@@ -562,8 +612,8 @@ class Http2SingleStreamLayer(httpbase._HttpTransmissionLayer, basethread.BaseThr
             max_streams = self.connections[self.server_conn].remote_settings.max_concurrent_streams
             if self.connections[self.server_conn].open_outbound_streams + 1 >= max_streams:
                 # wait until we get a free slot for a new outgoing stream
+                self.connections[self.server_conn].updated.wait(0.1)
                 self.connections[self.server_conn].lock.release()
-                time.sleep(0.1)
                 continue
 
             # keep the lock
@@ -588,7 +638,7 @@ class Http2SingleStreamLayer(httpbase._HttpTransmissionLayer, basethread.BaseThr
         if self.handled_priority_event:
             # only send priority information if they actually came with the original HeadersFrame
             # and not if they got updated before/after with a PriorityFrame
-            if not self.config.options.http2_priority:
+            if not self.snapshot.http2_priority:
                 self.log("HTTP/2 PRIORITY information in HEADERS frame suppressed. Use --http2-priority to enable forwarding.", "debug")
             else:
                 priority_exclusive = self.priority_exclusive
@@ -658,17 +708,7 @@ class Http2SingleStreamLayer(httpbase._HttpTransmissionLayer, basethread.BaseThr
 
     @detect_zombie_stream
     def read_response_body(self, request, response):
-        while True:
-            try:
-                yield self.response_message.data_queue.get(timeout=0.1)
-            except queue.Empty:  # pragma: no cover
-                pass
-            if self.response_message.stream_ended.is_set():
-                self.raise_zombie()
-                while self.response_message.data_queue.qsize() > 0:
-                    yield self.response_message.data_queue.get()
-                break
-            self.raise_zombie()
+        yield from self.response_message.read_body(self.raise_zombie)
 
     @detect_zombie_stream
     def read_response_trailers(self, request, response):
@@ -710,7 +750,10 @@ class Http2SingleStreamLayer(httpbase._HttpTransmissionLayer, basethread.BaseThr
             )
 
     def __call__(self):  # pragma: no cover
-        raise EnvironmentError('Http2SingleStreamLayer must be run as thread')
+        raise EnvironmentError('Http2SingleStreamLayer must be started with start()')
+
+    def start(self):
+        stream_workers.submit(self.run)
 
     def run(self):
         layer = httpbase.HttpLayer(self, self.mode)
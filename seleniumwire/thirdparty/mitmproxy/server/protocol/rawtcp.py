@@ -10,6 +10,8 @@ from seleniumwire.thirdparty.mitmproxy.server.protocol import base
 
 class RawTCPLayer(base.Layer):
     chunk_size = 4096
+    # Ignored connections are relayed without creating messages, so can use larger reads
+    relay_chunk_size = 256 * 1024
 
     def __init__(self, ctx, ignore=False):
         self.ignore = ignore
@@ -22,7 +24,8 @@ class RawTCPLayer(base.Layer):
             f = tcp.TCPFlow(self.client_conn, self.server_conn, self)
             self.channel.ask("tcp_start", f)
 
-        buf = memoryview(bytearray(self.chunk_size))
+        chunk_size = self.relay_chunk_size if self.ignore else self.chunk_size
+        buf = memoryview(bytearray(chunk_size))
 
         client = self.client_conn.connection
         server = self.server_conn.connection
@@ -39,7 +42,7 @@ class RawTCPLayer(base.Layer):
                 for conn in r:
                     dst = server if conn == client else client
                     try:
-                        size = conn.recv_into(buf, self.chunk_size)
+                        size = conn.recv_into(buf, chunk_size)
                     except (SSL.WantReadError, SSL.WantWriteError):
                         continue
                     if not size:
@@ -56,10 +59,13 @@ class RawTCPLayer(base.Layer):
                             return
                         continue
 
+                    if self.ignore:
+                        dst.sendall(buf[:size])
+                        continue
+
                     tcp_message = tcp.TCPMessage(dst == server, buf[:size].tobytes())
-                    if not self.ignore:
-                        f.messages.append(tcp_message)
-                        self.channel.ask("tcp_message", f)
+                    f.messages.append(tcp_message)
+                    self.channel.ask("tcp_message", f)
                     dst.sendall(tcp_message.content)
 
         except (socket.error, exceptions.TcpException, SSL.Error) as e:
@@ -1,3 +1,4 @@
+import time
 from typing import Optional  # noqa
 from typing import Union
 
@@ -260,15 +261,18 @@ class TlsLayer(base.Layer):
         #  2.5 The client did not sent a SNI value, we don't know the certificate subject.
         client_tls_requires_server_connection = (
             self._server_tls and
-            self.config.options.upstream_cert and
+            self.snapshot.upstream_cert and
             (
-                self.config.options.add_upstream_certs_to_client_chain or
+                self.snapshot.add_upstream_certs_to_client_chain or
                 self._client_tls and (
                     self._client_hello.alpn_protocols or
                     not self._client_hello.sni
                 )
             )
         )
+        if client_tls_requires_server_connection and self._shared_http2_upstream():
+            # Requests will go over an existing HTTP/2 connection, which also has the server cert.
+            client_tls_requires_server_connection = False
         establish_server_tls_now = (
             (self.server_conn.connected() and self._server_tls) or
             client_tls_requires_server_connection
@@ -335,6 +339,25 @@ class TlsLayer(base.Layer):
         else:
             return None
 
+    def _shared_http2_upstream(self):
+        """
+        The shared HTTP/2 upstream connection that HTTP/1.1 requests from this
+        client will be sent over, if one is already open.
+        """
+        client_wants_h2 = (
+            self.snapshot.http2 and
+            self._client_tls and b"h2" in (self._client_hello.alpn_protocols or [])
+        )
+        if (
+            not self.snapshot.http2_upstream or
+            self.snapshot.mode != "regular" or
+            self.snapshot.add_upstream_certs_to_client_chain or
+            client_wants_h2 or
+            not self.server_conn.address
+        ):
+            return None
+        return self.config.http2_upstream.find(self.server_conn.address, self.server_conn.address[0])
+
     @property
     def alpn_for_client_connection(self):
         return self.server_conn.get_alpn_proto_negotiated()
@@ -349,7 +372,8 @@ class TlsLayer(base.Layer):
             choice = bytes(default_alpn)
         else:
             choice = options[0]
-        self.log("ALPN for client: %s" % choice, "debug")
+        if self.log_enabled("debug"):
+            self.log("ALPN for client: %s" % choice, "debug")
         return choice
 
     def _establish_tls_with_client_and_server(self):
@@ -371,23 +395,25 @@ class TlsLayer(base.Layer):
         self.log("Establish TLS with client", "debug")
         cert, key, chain_file = self._find_cert()
 
-        if self.config.options.add_upstream_certs_to_client_chain:
+        if self.snapshot.add_upstream_certs_to_client_chain:
             extra_certs = self.server_conn.server_certs
         else:
             extra_certs = None
 
         try:
-            tls_method, tls_options = net_tls.VERSION_CHOICES[self.config.options.ssl_version_client]
+            start = time.perf_counter()
+            tls_method, tls_options = net_tls.VERSION_CHOICES[self.snapshot.ssl_version_client]
             self.client_conn.convert_to_tls(
                 cert, key,
                 method=tls_method,
                 options=tls_options,
-                cipher_list=self.config.options.ciphers_client or DEFAULT_CLIENT_CIPHERS,
+                cipher_list=self.snapshot.ciphers_client or DEFAULT_CLIENT_CIPHERS,
                 dhparams=self.config.certstore.dhparams,
                 chain_file=chain_file,
                 alpn_select_callback=self.__alpn_select_callback,
                 extra_chain_certs=extra_certs,
             )
+            self.channel.metrics.tls_handshake_client.observe(time.perf_counter() - start)
             # Some TLS clients will not fail the handshake,
             # but will immediately throw an "unexpected eof" error on the first read.
             # The reason for this might be difficult to find, so we try to peek here to see if it
@@ -415,7 +441,7 @@ class TlsLayer(base.Layer):
                         x for x in self._client_hello.alpn_protocols if
                         not (x.startswith(b"h2-") or x.startswith(b"spdy"))
                     ]
-                if alpn and b"h2" in alpn and not self.config.options.http2:
+                if alpn and b"h2" in alpn and not self.snapshot.http2:
                     alpn.remove(b"h2")
 
             if self.client_conn.tls_established and self.client_conn.get_alpn_proto_negotiated():
@@ -432,7 +458,7 @@ class TlsLayer(base.Layer):
             # We pass through the list of ciphers send by the client, because some HTTP/2 servers
             # will select a non-HTTP/2 compatible cipher from our default list and then hang up
             # because it's incompatible with h2. :-)
-            ciphers_server = self.config.options.ciphers_server
+            ciphers_server = self.snapshot.ciphers_server
             if not ciphers_server and self._client_tls:
                 ciphers_server = []
                 for id in self._client_hello.cipher_suites:
@@ -440,13 +466,14 @@ class TlsLayer(base.Layer):
                         ciphers_server.append(CIPHER_ID_NAME_MAP[id])
                 ciphers_server = ':'.join(ciphers_server)
 
-            args = net_tls.client_arguments_from_options(self.config.options)
+            args = net_tls.client_arguments_from_options(self.snapshot)
             args["cipher_list"] = ciphers_server
-            self.server_conn.establish_tls(
-                sni=self.server_sni,
-                alpn_protos=alpn,
-                **args
-            )
+            with self.channel.metrics.tls_handshake_server.time():
+                self.server_conn.establish_tls(
+                    sni=self.server_sni,
+                    alpn_protos=alpn,
+                    **args
+                )
             tls_cert_err = self.server_conn.ssl_verification_error
             if tls_cert_err is not None:
                 self.log(str(tls_cert_err), "debug")
@@ -463,8 +490,9 @@ class TlsLayer(base.Layer):
                 )
             )
 
-        proto = self.alpn_for_client_connection.decode() if self.alpn_for_client_connection else '-'
-        self.log("ALPN selected by server: {}".format(proto), "debug")
+        if self.log_enabled("debug"):
+            proto = self.alpn_for_client_connection.decode() if self.alpn_for_client_connection else '-'
+            self.log("ALPN selected by server: {}".format(proto), "debug")
 
     def _find_cert(self):
         """
@@ -482,13 +510,16 @@ class TlsLayer(base.Layer):
             host = self.server_conn.address[0].encode("idna")
 
         # Should we incorporate information from the server certificate?
+        upstream_conn = self.server_conn
+        if not (upstream_conn and upstream_conn.tls_established) and self._shared_http2_upstream():
+            upstream_conn = self._shared_http2_upstream().server_conn
         use_upstream_cert = (
-            self.server_conn and
-            self.server_conn.tls_established and
-            self.config.options.upstream_cert
+            upstream_conn and
+            upstream_conn.tls_established and
+            self.snapshot.upstream_cert
         )
         if use_upstream_cert:
-            upstream_cert = self.server_conn.cert
+            upstream_cert = upstream_conn.cert
             sans.update(upstream_cert.altnames)
             if upstream_cert.cn:
                 sans.add(host)
@@ -505,4 +536,7 @@ class TlsLayer(base.Layer):
         # In other words, the Common Name is irrelevant then.
         if host:
             sans.add(host)
-        return self.config.certstore.get_cert(host, list(sans), organization)
+
+        return self.config.certstore.get_cert(
+            host, list(sans), organization, observe=self.channel.metrics.cert_generation.observe
+        )
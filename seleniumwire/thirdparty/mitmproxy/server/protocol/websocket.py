@@ -10,7 +10,7 @@ from wsproto.extensions import PerMessageDeflate
 
 from seleniumwire.thirdparty.mitmproxy import exceptions
 from seleniumwire.thirdparty.mitmproxy import flow
-from seleniumwire.thirdparty.mitmproxy.net import websockets, tcp
+from seleniumwire.thirdparty.mitmproxy.net import tcp
 from seleniumwire.thirdparty.mitmproxy.server.protocol import base
 from seleniumwire.thirdparty.mitmproxy.utils import strutils
 from seleniumwire.thirdparty.mitmproxy.websocket import WebSocketFlow, WebSocketMessage
@@ -41,6 +41,9 @@ class WebSocketLayer(base.Layer):
         WebSocket messages are stored in a WebSocketFlow.
     """
 
+    READ_SIZE = 256 * 1024
+    EXIT_CHECK_INTERVAL = 1
+
     def __init__(self, ctx, handshake_flow):
         super().__init__(ctx)
         self.handshake_flow = handshake_flow
@@ -91,25 +94,33 @@ class WebSocketLayer(base.Layer):
 
     def _handle_message(self, event, source_conn, other_conn, is_server):
         fb = self.server_frame_buffer if is_server else self.client_frame_buffer
-        fb.append(event.data)
 
         if event.message_finished:
-            original_chunk_sizes = [len(f) for f in fb]
+            if fb:
+                # A fragmented message, join it with the fragments received so far
+                fb.append(event.data)
+                original_chunk_sizes = [len(f) for f in fb]
+                payload = ''.join(fb) if isinstance(event, events.TextMessage) else b''.join(fb)
+                fb.clear()
+            else:
+                # The common case: the whole message arrived in one go
+                original_chunk_sizes = [len(event.data)]
+                payload = event.data
 
             if isinstance(event, events.TextMessage):
                 message_type = wsproto.frame_protocol.Opcode.TEXT
-                payload = ''.join(fb)
             else:
                 message_type = wsproto.frame_protocol.Opcode.BINARY
-                payload = b''.join(fb)
-
-            fb.clear()
 
             websocket_message = WebSocketMessage(message_type, not is_server, payload)
             length = len(websocket_message.content)
             self.flow.messages.append(websocket_message)
             self.channel.ask("websocket_message", self.flow)
 
+            history = self.snapshot.websocket_message_history
+            if history and len(self.flow.messages) > history:
+                del self.flow.messages[:-history]
+
             if not self.flow.stream and not websocket_message.killed:
                 def get_chunk(payload):
                     if len(payload) == length:
@@ -129,6 +140,8 @@ class WebSocketLayer(base.Layer):
                 for chunk, final in get_chunk(websocket_message.content):
                     data = self.connections[other_conn].send(Message(data=chunk, message_finished=final))
                     other_conn.send(data)
+        else:
+            fb.append(event.data)
 
         if self.flow.stream:
             data = self.connections[other_conn].send(Message(data=event.data, message_finished=event.message_finished))
@@ -141,19 +154,21 @@ class WebSocketLayer(base.Layer):
         other_conn.send(data)
         data = self.connections[source_conn].send(event.response())
         source_conn.send(data)
-        self.log(
-            "Ping Received from {}".format("server" if is_server else "client"),
-            "info",
-            [strutils.bytes_to_escaped_str(bytes(event.payload))]
-        )
+        if self.log_enabled("info"):
+            self.log(
+                "Ping Received from {}".format("server" if is_server else "client"),
+                "info",
+                [strutils.bytes_to_escaped_str(bytes(event.payload))]
+            )
         return True
 
     def _handle_pong(self, event, source_conn, other_conn, is_server):
-        self.log(
-            "Pong Received from {}".format("server" if is_server else "client"),
-            "info",
-            [strutils.bytes_to_escaped_str(bytes(event.payload))]
-        )
+        if self.log_enabled("info"):
+            self.log(
+                "Pong Received from {}".format("server" if is_server else "client"),
+                "info",
+                [strutils.bytes_to_escaped_str(bytes(event.payload))]
+            )
         return True
 
     def _handle_close_connection(self, event, source_conn, other_conn, is_server):
@@ -183,23 +198,42 @@ class WebSocketLayer(base.Layer):
         self.handshake_flow.metadata['websocket_flow'] = self.flow.id
         self.channel.ask("websocket_start", self.flow)
 
+        # inject_message() writes to the other end of this pair to wake the loop
+        wakeup, self.flow._wakeup = socket.socketpair()
+        wakeup.setblocking(False)
+        self.flow._wakeup.setblocking(False)
+
         conns = [c.connection for c in self.connections.keys()]
         close_received = False
+        is_server = False
 
         try:
             while not self.channel.should_exit.is_set():
                 self._inject_messages(self.client_conn, self.flow._inject_messages_client)
                 self._inject_messages(self.server_conn, self.flow._inject_messages_server)
 
-                r = tcp.ssl_read_select(conns, 0.1)
+                # The timeout only bounds how long it takes to notice should_exit,
+                # traffic and injected messages wake the select immediately.
+                r = tcp.ssl_read_select(conns + [wakeup], self.EXIT_CHECK_INTERVAL)
                 for conn in r:
+                    if conn is wakeup:
+                        try:
+                            while wakeup.recv(4096):
+                                pass
+                        except BlockingIOError:
+                            pass
+                        continue
+
                     source_conn = self.client_conn if conn == self.client_conn.connection else self.server_conn
                     other_conn = self.server_conn if conn == self.client_conn.connection else self.client_conn
                     is_server = (source_conn == self.server_conn)
 
-                    frame = websockets.Frame.from_file(source_conn.rfile)
-                    data = self.connections[source_conn].receive_data(bytes(frame))
-                    source_conn.send(data)
+                    # Feed everything that has arrived to wsproto at once, it keeps any
+                    # trailing partial frame until the next read.
+                    data = source_conn.rfile.read_available(self.READ_SIZE)
+                    if not data:
+                        raise exceptions.TcpDisconnect("Connection closed")
+                    self.connections[source_conn].receive_data(data)
 
                     if close_received:
                         return
@@ -213,5 +247,7 @@ class WebSocketLayer(base.Layer):
             self.flow.error = flow.Error("WebSocket connection closed unexpectedly by {}: {}".format(s, repr(e)))
             self.channel.tell("websocket_error", self.flow)
         finally:
+            self.flow._wakeup.close()
+            wakeup.close()
             self.flow.ended = True
             self.channel.tell("websocket_end", self.flow)
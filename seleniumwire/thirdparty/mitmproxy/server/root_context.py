@@ -19,12 +19,16 @@ class RootContext:
             :py:meth:`.tell() <seleniumwire.thirdparty.mitmproxy.controller.Channel.tell>` methods.
         config:
             The :py:class:`mitmproxy server's configuration <seleniumwire.thirdparty.mitmproxy.server.ProxyConfig>`
+        snapshot:
+            The options snapshot taken when the connection was made. HTTP flows
+            replace it with their own for the layers beneath them.
     """
 
     def __init__(self, client_conn, config, channel):
         self.client_conn = client_conn
         self.channel = channel
         self.config = config
+        self.snapshot = config.snapshot
 
     def next_layer(self, top_layer):
         """
@@ -47,6 +51,11 @@ class RootContext:
         client_tls = tls.is_tls_record_magic(d)
 
         # 1. check for filter
+        if self.config.check_passthrough:
+            # Decided on the address alone, as that's where the requests will be sent
+            address = top_layer.server_conn.address
+            if address and self.config.check_passthrough(address, top_layer.client_conn):
+                return protocol.RawTCPLayer(top_layer, ignore=True)
         if self.config.check_filter:
             is_filtered = self.config.check_filter(top_layer.server_conn.address)
             if not is_filtered and client_tls:
@@ -92,7 +101,8 @@ class RootContext:
         if isinstance(top_layer, protocol.TlsLayer):
             alpn = top_layer.client_conn.get_alpn_proto_negotiated()
             if alpn == b'h2':
-                return protocol.Http2Layer(top_layer, http.HTTPMode.transparent)
+                from seleniumwire.thirdparty.mitmproxy.server.protocol.http2 import Http2Layer
+                return Http2Layer(top_layer, http.HTTPMode.transparent)
             if alpn == b'http/1.1':
                 return protocol.Http1Layer(top_layer, http.HTTPMode.transparent)
 
@@ -102,20 +112,29 @@ class RootContext:
             # expect A-Za-z
             all(65 <= x <= 90 or 97 <= x <= 122 for x in d)
         )
-        if self.config.options.rawtcp and not is_ascii:
+        if self.snapshot.rawtcp and not is_ascii:
             return protocol.RawTCPLayer(top_layer)
 
         # 7. Assume HTTP1 by default
         return protocol.Http1Layer(top_layer, http.HTTPMode.transparent)
 
+    def log_enabled(self, level):
+        """
+        Whether log messages of the given level will be used. Check this before
+        building an expensive message.
+        """
+        return self.channel.log_enabled(level)
+
     def log(self, msg, level, subs=()):
         """
         Send a log message to the master.
         """
+        if not self.channel.log_enabled(level):
+            return
         full_msg = [
             "{}:{}: {}".format(self.client_conn.address[0], self.client_conn.address[1], msg)
         ]
         for i in subs:
             full_msg.append("  -> " + i)
         full_msg = "\n".join(full_msg)
-        self.channel.tell("log", log.LogEntry(full_msg, level))
+        self.channel.log(log.LogEntry(full_msg, level))
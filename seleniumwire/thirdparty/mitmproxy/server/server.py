@@ -39,7 +39,8 @@ class ProxyServer(tcp.TCPServer):
         self.config = config
         try:
             super().__init__(
-                (config.options.listen_host, config.options.listen_port)
+                (config.options.listen_host, config.options.listen_port),
+                backlog=config.options.listen_backlog,
             )
             if config.options.mode == "transparent":
                 platform.init_transparent_mode()
@@ -53,14 +54,27 @@ class ProxyServer(tcp.TCPServer):
     def set_channel(self, channel):
         self.channel = channel
 
+    def handle_shutdown(self):
+        if self.config.http2_upstream is not None:
+            self.config.http2_upstream.close()
+
     def handle_client_connection(self, conn, client_address):
-        h = ConnectionHandler(
-            conn,
-            client_address,
-            self.config,
-            self.channel
-        )
-        h.handle()
+        metrics = self.channel.metrics
+        metrics.connections_accepted.inc()
+        metrics.connections_active.inc()
+        tcp.set_socket_options(conn, **self.config.socket_options)
+        try:
+            h = ConnectionHandler(
+                conn,
+                client_address,
+                self.config,
+                self.channel
+            )
+            h.client_conn.rfile.counter = metrics.client_bytes_received
+            h.client_conn.wfile.counter = metrics.client_bytes_sent
+            h.handle()
+        finally:
+            metrics.connections_active.dec()
 
 
 class ConnectionHandler:
@@ -82,18 +96,18 @@ class ConnectionHandler:
             self.channel
         )
 
-        mode = self.config.options.mode
+        mode = root_ctx.snapshot.mode
         if mode.startswith("upstream:"):
             if "socks" in mode:
                 return modes.SocksUpstreamProxy(
                     root_ctx,
                     self.config.upstream_server,
-                    self.config.options.upstream_auth
+                    root_ctx.snapshot.upstream_auth
                 )
             else:
                 return modes.HttpUpstreamProxy(
                     root_ctx,
-                    self.config.upstream_server.address
+                    self.config.upstream_router
                 )
         elif mode == "regular":
             return modes.HttpProxy(root_ctx)
@@ -125,7 +139,7 @@ class ConnectionHandler:
                 self.log(str(e), "warn")
                 self.log("Invalid certificate, closing connection. Pass --ssl-insecure to disable validation.", "warn")
             else:
-                if self.config.options.suppress_connection_errors:
+                if self.config.snapshot.suppress_connection_errors:
                     self.log(repr(e), "debug")
                 else:
                     self.log(str(e), "warn")
@@ -147,5 +161,7 @@ class ConnectionHandler:
         self.client_conn.finish()
 
     def log(self, msg, level):
+        if not self.channel.log_enabled(level):
+            return
         msg = "{}: {}".format(human.format_address(self.client_conn.address), msg)
-        self.channel.tell("log", log.LogEntry(msg, level))
+        self.channel.log(log.LogEntry(msg, level))
@@ -0,0 +1,169 @@
+"""
+Routing of connections across upstream proxies.
+
+In upstream mode every connection used to go through the single proxy given
+by the mode, and changing it meant dropping the browser's connections so
+that they'd be remade through the new one. The router here chooses an
+upstream proxy for each connection from a pool, either taking turns or
+preferring the proxy with the fewest connections, and can send particular
+hosts through proxies of their own. A connection keeps its proxy while it
+remains suitable, so its server connection is reused, and is moved to
+another (without disturbing the client) when it doesn't.
+"""
+import threading
+import typing
+import urllib.parse
+
+from seleniumwire.thirdparty.mitmproxy.net import server_spec
+
+ROUND_ROBIN = "round_robin"
+LEAST_CONNECTIONS = "least_connections"
+ROTATIONS = (ROUND_ROBIN, LEAST_CONNECTIONS)
+
+# Guards the connection counts, which are changed by the threads handling connections
+_connections_lock = threading.Lock()
+
+
+class Upstream:
+    """
+    An upstream proxy, with the credentials for it and the number of client
+    connections currently routed through it.
+    """
+
+    __slots__ = ("spec", "auth", "connections")
+
+    def __init__(self, spec: server_spec.ServerSpec, auth: typing.Optional[str] = None):
+        self.spec = spec
+        self.auth = auth
+        self.connections = 0
+
+    @property
+    def address(self) -> typing.Tuple[str, int]:
+        return self.spec.address
+
+    @property
+    def key(self):
+        return self.spec, self.auth
+
+    def acquire(self) -> None:
+        with _connections_lock:
+            self.connections += 1
+
+    def release(self) -> None:
+        with _connections_lock:
+            self.connections -= 1
+
+    def __repr__(self):
+        return "Upstream({}://{}:{})".format(self.spec.scheme, *self.spec.address)
+
+
+def parse(spec: str, auth: typing.Optional[str] = None) -> Upstream:
+    """
+    Parses an upstream proxy of the form "http[s]://[user:pass@]host[:port]".
+    Credentials in the spec take precedence over those passed.
+
+    Raises:
+        ValueError, if the spec is invalid or not for an HTTP proxy.
+    """
+    scheme, sep, rest = spec.strip().rpartition("://")
+    userinfo, at, hostport = rest.rpartition("@")
+    parsed = server_spec.parse(scheme + sep + hostport)
+    if parsed.scheme not in ("http", "https"):
+        raise ValueError("Invalid upstream proxy scheme, expected http or https: {}".format(spec))
+    if at:
+        auth = urllib.parse.unquote(userinfo)
+    return Upstream(parsed, auth)
+
+
+class UpstreamRouter:
+    """
+    Chooses the upstream proxy for each connection.
+
+    Args:
+        servers: The pool of upstream proxies that connections are shared across.
+        routes: Host names mapped to the upstream proxy for them. A host name
+            also covers its subdomains, and the most specific one is used.
+        rotation: How connections are shared across the pool: ROUND_ROBIN
+            gives each new connection the next proxy, LEAST_CONNECTIONS the one
+            with the fewest connections.
+    """
+
+    def __init__(
+        self,
+        servers: typing.Sequence[Upstream],
+        routes: typing.Optional[typing.Dict[str, Upstream]] = None,
+        rotation: str = ROUND_ROBIN,
+    ):
+        if not servers:
+            raise ValueError("An upstream router needs at least one upstream proxy")
+        if rotation not in ROTATIONS:
+            raise ValueError("Invalid upstream rotation: {}".format(rotation))
+        self.servers = list(servers)
+        self.routes = {host.lower().strip("."): upstream for host, upstream in (routes or {}).items()}
+        self.rotation = rotation
+        self._servers_by_key = {upstream.key: upstream for upstream in self.servers}
+        self._turn = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_options(cls, upstream_server: server_spec.ServerSpec, options) -> "UpstreamRouter":
+        """
+        Builds the router for the proxy given by the mode, along with the
+        upstream_servers and upstream_routes options.
+
+        Raises:
+            ValueError, if an upstream proxy or route is invalid.
+        """
+        # Added by the upstream_auth addon, which may not be loaded
+        auth = getattr(options, "upstream_auth", None)
+        servers = [Upstream(upstream_server, auth)]
+        servers.extend(parse(spec, auth) for spec in options.upstream_servers)
+
+        routes = {}
+        for route in options.upstream_routes:
+            host, sep, spec = route.partition("=")
+            if not sep or not host.strip():
+                raise ValueError("Invalid upstream route, expected host=proxy: {}".format(route))
+            routes[host.strip()] = parse(spec, auth)
+
+        return cls(servers, routes, options.upstream_rotation)
+
+    def select(self, host: typing.Optional[str], current: typing.Optional[Upstream] = None) -> Upstream:
+        """
+        The upstream proxy for a request to host (None if not yet known) on a
+        connection currently routed through current. The current proxy is
+        kept if it's still the right one for the host, so that the connection
+        can carry on using its server connection.
+        """
+        upstream = self._route(host)
+        if upstream is not None:
+            return upstream
+        if current is not None:
+            upstream = self._servers_by_key.get(current.key)
+            if upstream is not None:
+                return upstream
+        return self._next()
+
+    def _route(self, host):
+        if not self.routes or not host:
+            return None
+        host = host.lower().rstrip(".")
+        while True:
+            upstream = self.routes.get(host)
+            if upstream is not None:
+                return upstream
+            _, dot, host = host.partition(".")
+            if not dot:
+                return None
+
+    def _next(self):
+        if len(self.servers) == 1:
+            return self.servers[0]
+        with self._lock:
+            turn = self._turn % len(self.servers)
+            self._turn += 1
+        if self.rotation == LEAST_CONNECTIONS:
+            # Start from the next turn, so that ties are shared out too
+            candidates = self.servers[turn:] + self.servers[:turn]
+            return min(candidates, key=lambda upstream: upstream.connections)
+        return self.servers[turn]
@@ -2,8 +2,6 @@ import queue
 import time
 from typing import List, Optional, Union
 
-from wsproto.frame_protocol import CloseReason, Opcode
-
 from seleniumwire.thirdparty.mitmproxy import flow
 from seleniumwire.thirdparty.mitmproxy.coretypes import serializable
 from seleniumwire.thirdparty.mitmproxy.net import websockets
@@ -18,6 +16,9 @@ class WebSocketMessage(serializable.Serializable):
     def __init__(
         self, type: int, from_client: bool, content: Union[bytes, str], timestamp: Optional[float]=None, killed: bool=False
     ) -> None:
+        # wsproto is imported where it's used, so that it isn't loaded until a websocket is seen
+        from wsproto.frame_protocol import Opcode
+
         self.type = Opcode(type)  # type: ignore
         """indicates either TEXT or BINARY (from wsproto.frame_protocol.Opcode)."""
         self.from_client = from_client
@@ -37,10 +38,14 @@ class WebSocketMessage(serializable.Serializable):
         return int(self.type), self.from_client, self.content, self.timestamp, self.killed
 
     def set_state(self, state):
+        from wsproto.frame_protocol import Opcode
+
         self.type, self.from_client, self.content, self.timestamp, self.killed = state
         self.type = Opcode(self.type)  # replace enum with bare int
 
     def __repr__(self):
+        from wsproto.frame_protocol import Opcode
+
         if self.type == Opcode.TEXT:
             return "text message: {}".format(repr(self.content))
         else:
@@ -63,6 +68,8 @@ class WebSocketFlow(flow.Flow):
     def __init__(self, client_conn, server_conn, handshake_flow, live=None):
         super().__init__("websocket", client_conn, server_conn, live)
 
+        from wsproto.frame_protocol import CloseReason
+
         self.messages: List[WebSocketMessage] = []
         """A list containing all WebSocketMessage's."""
         self.close_sender = 'client'
@@ -82,6 +89,8 @@ class WebSocketFlow(flow.Flow):
 
         self._inject_messages_client = queue.Queue(maxsize=1)
         self._inject_messages_server = queue.Queue(maxsize=1)
+        # Set by the WebSocketLayer while it runs, used to wake it for injected messages
+        self._wakeup = None
 
         if handshake_flow:
             self.client_key = websockets.get_client_key(handshake_flow.request.headers)
@@ -161,3 +170,11 @@ class WebSocketFlow(flow.Flow):
             self._inject_messages_server.put(payload)
         else:
             raise ValueError('Invalid endpoint')
+
+        wakeup = self._wakeup
+        if wakeup is not None:
+            try:
+                wakeup.send(b"\0")
+            except OSError:
+                # Either a wakeup is already pending or the layer has finished
+                pass
@@ -2,9 +2,10 @@ import collections.abc
 import logging
 import os
 import pkgutil
+import re
 from collections import namedtuple
 from pathlib import Path
-from typing import Dict, NamedTuple
+from typing import Dict, Iterator, List, NamedTuple, Optional, Pattern
 from urllib.request import _parse_proxy
 
 from seleniumwire.thirdparty.mitmproxy.net.http import encoding as decoder
@@ -19,6 +20,27 @@ MITM_MODE = 'mode'
 MITM_UPSTREAM_AUTH = 'upstream_auth'
 MITM_UPSTREAM_CUSTOM_AUTH = 'upstream_custom_auth'
 MITM_NO_PROXY = 'no_proxy'
+MITM_UPSTREAM_SERVERS = 'upstream_servers'
+MITM_UPSTREAM_ROUTES = 'upstream_routes'
+MITM_UPSTREAM_ROTATION = 'upstream_rotation'
+
+# The size of the chunks fed to the decoder when decoding incrementally.
+DECODE_CHUNK_SIZE = 64 * 1024
+
+# The most bytes a body is decoded to by default, to guard against decompression bombs.
+DECODE_MAX_SIZE = 100 * 1024 * 1024
+
+# A scope that matches no URL, used to disable capture
+NO_SCOPE = '$^'
+
+# The start of a scope anchored at a literal URL scheme, e.g. ^https:// or ^https?://
+_SCOPE_SCHEME = re.compile(r'\^(?:https\?|[A-Za-z]+)(?::|\\:)//')
+# A character of a host name, or a group of alternative host name parts, with any quantifier
+_SCOPE_HOST_ATOM = re.compile(
+    r'(?:[A-Za-z0-9_-]|\\[.-]|\((?:\?:)?(?:[A-Za-z0-9_|-]|\\[.-])+\))(?:(?:[?*+]|\{\d*,?\d*\})\??)?'
+)
+# What can follow the host in a scope when it matches the whole host
+_SCOPE_HOST_END = ('/', '\\/', ':', '\\:', '$', '\\?')
 
 
 def get_upstream_proxy(options):
@@ -30,7 +52,8 @@ def get_upstream_proxy(options):
     'https' and 'no_proxy'. The value of the 'http' and 'https' keys will
     be a named tuple with the attributes:
         scheme, username, password, hostport
-    The value of 'no_proxy' will be a list.
+    The value of 'no_proxy' will be a list. Any other keys, such as 'pool'
+    and 'routes', are passed through as they are.
 
     Note that the keys will only be present in the dictionary when relevant
     proxy configuration exists.
@@ -113,6 +136,22 @@ def build_proxy_args(proxy_config: Dict[str, NamedTuple]) -> Dict[str, str]:
         if no_proxy:
             args[MITM_NO_PROXY] = no_proxy
 
+        pool = proxy_config.get('pool')
+        routes = proxy_config.get('routes')
+        rotation = proxy_config.get('rotation')
+
+        if (pool or routes) and scheme.startswith('socks'):
+            raise ValueError('A pool of proxy servers and routes are only supported for http and https proxies')
+
+        if pool:
+            args[MITM_UPSTREAM_SERVERS] = list(pool)
+
+        if routes:
+            args[MITM_UPSTREAM_ROUTES] = ['{}={}'.format(host, proxy) for host, proxy in routes.items()]
+
+        if rotation:
+            args[MITM_UPSTREAM_ROTATION] = rotation
+
     return args
 
 
@@ -184,7 +223,7 @@ def urlsafe_address(address):
     return addr, port
 
 
-def decode(data: bytes, encoding: str) -> bytes:
+def decode(data: bytes, encoding: str, max_size: Optional[int] = DECODE_MAX_SIZE) -> bytes:
     """Attempt to decode data based on the supplied encoding.
 
     If decoding fails a ValueError is raised.
@@ -192,7 +231,136 @@ def decode(data: bytes, encoding: str) -> bytes:
     Args:
         data: The encoded data.
         encoding: The encoding type.
+        max_size: The maximum size of the decoded data, 100MB by default. The
+            data is decoded incrementally and a ValueError is raised as soon as
+            the decoded size exceeds this value. This protects against
+            decompression bombs. Pass None to decode without a limit.
     Returns: The decoded data.
     Raises: ValueError if the data could not be decoded.
     """
-    return decoder.decode(data, encoding)
+    if max_size is None:
+        return decoder.decode(data, encoding)
+
+    return b''.join(decoder.decode_chunks(iter_chunks(data), encoding, max_size))
+
+
+def iter_chunks(data: bytes, chunk_size: int = DECODE_CHUNK_SIZE) -> Iterator[bytes]:
+    """Split data into chunks without copying the whole of it.
+
+    Args:
+        data: The data to split.
+        chunk_size: The maximum size of each chunk.
+    Returns: An iterator of chunks.
+    """
+    view = memoryview(data)
+
+    for start in range(0, len(view), chunk_size):
+        end = start + chunk_size
+        yield view[start:end].tobytes()
+
+
+def hosts_in_scope(scopes) -> Optional[Pattern]:
+    """Work out which hosts the requests matched by the scopes can be sent to.
+
+    This is only possible for scopes that are anchored at the start of the
+    URL and name the host, e.g. '^https://example\\.com/' or
+    '^https?://(www\\.)?example\\.com'. Any other scope, such as
+    '.*example.*', could match a URL on any host.
+
+    Args:
+        scopes: The scopes (regexes) used to decide which requests are captured.
+    Returns: A compiled regex that matches the names of hosts that may have
+        requests in scope, or None if any host may.
+    """
+    if not scopes:
+        return None
+    elif not is_list_alike(scopes):
+        scopes = [scopes]
+
+    hosts = []
+
+    for scope in scopes:
+        if scope == NO_SCOPE:
+            continue
+
+        host = _scope_host(scope)
+
+        if host is None:
+            return None
+
+        hosts.append(host)
+
+    try:
+        # (?!) never matches, for when nothing is in scope
+        return re.compile('|'.join(f'(?:{h})' for h in hosts) or '(?!)', re.IGNORECASE)
+    except re.error:
+        return None
+
+
+def _scope_host(scope: str) -> Optional[str]:
+    """Get a regex for the hosts of the URLs that a scope can match, or None
+    if the scope doesn't constrain the host.
+    """
+    match = _SCOPE_SCHEME.match(scope)
+
+    if not match:
+        return None
+
+    pos = match.end()
+    atoms: List[str] = []
+
+    while True:
+        match = _SCOPE_HOST_ATOM.match(scope, pos)
+        if not match:
+            break
+        atoms.append(match.group(0))
+        pos = match.end()
+
+    if not atoms:
+        return None
+
+    # An alternative after the host could match a URL on another host, e.g.
+    # '^https://example\\.com/|.*other.*'
+    if _has_alternation(scope[pos:]):
+        return None
+
+    # The atoms may be userinfo rather than the host, e.g. '^https://user@example\\.com/'
+    if '@' in scope[pos:]:
+        return None
+
+    # Otherwise the scope only says what the host starts with
+    exact = scope.startswith(_SCOPE_HOST_END, pos)
+
+    return '^' + ''.join(atoms) + ('$' if exact else '')
+
+
+def _has_alternation(pattern: str) -> bool:
+    """Whether a regex has a '|' (at any depth) outside of a character class."""
+    in_class = False
+    i = 0
+
+    while i < len(pattern):
+        c = pattern[i]
+        if c == '\\':
+            i += 1
+        elif in_class:
+            in_class = c != ']'
+        elif c == '[':
+            in_class = True
+            # A ']' straight after the opening '[' (or '[^') is a literal
+            i += 2 if pattern.startswith('^', i + 1) else 1
+            if pattern.startswith(']', i):
+                i += 1
+            continue
+        elif c == '|':
+            return True
+        i += 1
+
+    return False
+
+
+def host_patterns(hosts: List[str]) -> List[str]:
+    """Convert host names to patterns for mitmproxy's host options, which are
+    regexes matched against 'host:port'. Subdomains of each host also match.
+    """
+    return [r'(^|\.){}:\d+$'.format(re.escape(host.strip().lower())) for host in hosts]
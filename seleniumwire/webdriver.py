@@ -95,6 +95,17 @@ class DriverCommonMixin:
         if custom_auth:
             conf['custom_authorization'] = custom_auth
 
+        pool = getattr(self.backend.master.options, 'upstream_servers')
+
+        if pool:
+            conf['pool'] = list(pool)
+            conf['rotation'] = getattr(self.backend.master.options, 'upstream_rotation')
+
+        routes = getattr(self.backend.master.options, 'upstream_routes')
+
+        if routes:
+            conf['routes'] = dict(route.split('=', 1) for route in routes)
+
         return conf
 
     @proxy.setter
@@ -108,13 +119,22 @@ class DriverCommonMixin:
             'no_proxy': 'localhost,127.0.0.1',
         }
 
+        Connections already made by the browser are moved to the new proxy
+        rather than closed.
+
         Args:
             proxy_conf: The proxy configuration.
         """
         options = self.backend.master.options
 
+        # A pool or routes left out of the new configuration are removed
+        routing = {
+            name: options.default(name)
+            for name in (utils.MITM_UPSTREAM_SERVERS, utils.MITM_UPSTREAM_ROUTES, utils.MITM_UPSTREAM_ROTATION)
+        }
+
         if proxy_conf:
-            options.update(**utils.build_proxy_args(utils.get_upstream_proxy({'proxy': proxy_conf})))
+            options.update(**dict(routing, **utils.build_proxy_args(utils.get_upstream_proxy({'proxy': proxy_conf}))))
         else:
             options.update(
                 **{
@@ -122,6 +142,7 @@ class DriverCommonMixin:
                     utils.MITM_UPSTREAM_AUTH: options.default(utils.MITM_UPSTREAM_AUTH),
                     utils.MITM_UPSTREAM_CUSTOM_AUTH: options.default(utils.MITM_UPSTREAM_CUSTOM_AUTH),
                     utils.MITM_NO_PROXY: options.default(utils.MITM_NO_PROXY),
+                    **routing,
                 }
             )
 
@@ -0,0 +1,199 @@
+import logging
+import re
+import threading
+import time
+from collections import deque
+from typing import Callable, List, Optional, Union
+
+from selenium.common.exceptions import TimeoutException
+
+from seleniumwire.request import WebSocketMessage
+
+log = logging.getLogger(__name__)
+
+
+class SubscriptionClosed(Exception):
+    """Raised when reading from a subscription that has been closed and has
+    no messages left.
+    """
+
+
+class WebSocketSubscription:
+    """Receives websocket messages as they pass through the proxy.
+
+    Messages are queued until they are consumed, either by iterating the
+    subscription or, when it has a callback, by a thread of the subscription's
+    own that calls the callback with each message in turn.
+
+    Messages are published from the proxy's event loop, which handles every
+    connection, so a slow consumer is never waited on. Up to maxsize messages
+    are queued, after which the oldest queued message is dropped for each new
+    one, and counted in dropped.
+
+    Subscriptions should be closed when no longer needed. They can be used
+    as context managers to do this automatically.
+    """
+
+    def __init__(
+        self,
+        subscriptions: 'WebSocketSubscriptions',
+        request_id: Optional[str] = None,
+        pat: Optional[str] = None,
+        callback: Optional[Callable[[WebSocketMessage], None]] = None,
+        timeout: Optional[Union[int, float]] = None,
+        maxsize: int = 1000,
+    ):
+        self.request_id = request_id
+        self.pat = re.compile(pat) if pat is not None else None
+        self.callback = callback
+        self.timeout = timeout
+        self.maxsize = maxsize
+        self.closed = False
+        # The number of messages dropped because the queue was full
+        self.dropped = 0
+
+        self._subscriptions = subscriptions
+        self._messages = deque()
+        self._cond = threading.Condition()
+
+        if callback is not None:
+            thread = threading.Thread(target=self._run_callback, name='WebSocket message callback', daemon=True)
+            thread.start()
+
+    def matches(self, request_id: str, url: str) -> bool:
+        """Whether messages for the specified websocket connection are
+        wanted by this subscription.
+        """
+        if self.request_id is not None:
+            return self.request_id == request_id
+
+        return self.pat is None or self.pat.search(url) is not None
+
+    def deliver(self, message: WebSocketMessage) -> None:
+        """Queue a message for the subscriber without waiting, dropping the
+        oldest queued message if the queue is full.
+        """
+        with self._cond:
+            if self.closed:
+                return
+
+            if len(self._messages) >= self.maxsize:
+                self._messages.popleft()
+                self.dropped += 1
+
+                if self.dropped == 1:
+                    log.warning('Dropping websocket messages as the subscriber is not keeping up')
+
+            self._messages.append(message)
+            self._cond.notify_all()
+
+    def _run_callback(self):
+        while True:
+            try:
+                message = self.get(None)
+            except SubscriptionClosed:
+                return
+
+            try:
+                self.callback(message)
+            except Exception:
+                log.exception('Error in websocket message callback')
+
+    def get(self, timeout: Optional[Union[int, float]] = None) -> WebSocketMessage:
+        """Get the next message, waiting until one arrives.
+
+        Args:
+            timeout: The maximum time to wait in seconds. Default None
+                which means wait indefinitely.
+        Returns:
+            The message.
+        Raises:
+            TimeoutException if no message arrives within the timeout period.
+            SubscriptionClosed if the subscription has been closed.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        with self._cond:
+            while not self._messages:
+                if self.closed:
+                    raise SubscriptionClosed('The websocket subscription has been closed')
+
+                remaining = None if deadline is None else deadline - time.monotonic()
+
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutException('Timed out after {}s waiting for websocket message'.format(timeout))
+
+                self._cond.wait(remaining)
+
+            return self._messages.popleft()
+
+    def close(self) -> None:
+        """Stop receiving messages. Any messages already queued can still be read."""
+        self._subscriptions.unsubscribe(self)
+
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> WebSocketMessage:
+        try:
+            return self.get(self.timeout)
+        except SubscriptionClosed:
+            raise StopIteration from None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class WebSocketSubscriptions:
+    """Holds the active websocket message subscriptions and dispatches
+    captured messages to them.
+
+    Instances are designed to be threadsafe.
+    """
+
+    def __init__(self):
+        self._subscriptions: List[WebSocketSubscription] = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, **kwargs) -> WebSocketSubscription:
+        """Create a new subscription.
+
+        Args:
+            kwargs: Any arguments to initialise the WebSocketSubscription with.
+        Returns: The subscription.
+        """
+        subscription = WebSocketSubscription(self, **kwargs)
+
+        with self._lock:
+            self._subscriptions = self._subscriptions + [subscription]
+
+        return subscription
+
+    def unsubscribe(self, subscription: WebSocketSubscription) -> None:
+        with self._lock:
+            self._subscriptions = [s for s in self._subscriptions if s is not subscription]
+
+    def close(self) -> None:
+        """Close all subscriptions, releasing any consumers waiting for messages."""
+        for subscription in self._subscriptions:
+            subscription.close()
+
+    def publish(self, request_id: str, url: str, message: WebSocketMessage) -> None:
+        """Dispatch a message to the subscriptions interested in it.
+
+        Args:
+            request_id: The id of the original handshake request.
+            url: The URL of the original handshake request.
+            message: The websocket message.
+        """
+        # The list is replaced rather than modified, so can be read without the lock
+        for subscription in self._subscriptions:
+            if subscription.matches(request_id, url):
+                subscription.deliver(message)
@@ -443,6 +443,13 @@ def test_exclude_hosts(driver_path, chrome_options, httpbin):
         assert driver.requests[0].url == f'{httpbin2}/html'
 
 
+def test_block_hosts(driver_path, chrome_options, httpbin):
+    with create_driver(driver_path, chrome_options, {'block_hosts': ['localhost']}) as driver:
+        driver.get(f'{httpbin}/html')
+
+        assert not driver.requests
+
+
 @pytest.mark.skip("Fails on GitHub Actions - chromedriver threads timeout")
 def test_multiple_threads(driver_path, chrome_options, httpbin):
     num_threads = 5
@@ -548,6 +555,21 @@ def test_switch_proxy_on_the_fly(driver_path, chrome_options, httpbin, httpproxy
         assert driver.last_request.cert
 
 
+def test_upstream_proxy_routes(driver_path, chrome_options, httpbin, httpproxy):
+    with create_httpproxy(port=8088, auth='test:test') as authproxy:
+        sw_options = {
+            'proxy': {
+                'https': f'{httpproxy}',
+                'routes': {'localhost': str(authproxy)},
+            },
+        }
+
+        with create_driver(driver_path, chrome_options, sw_options) as driver:
+            driver.get(f'{httpbin}/html')
+
+            assert 'This passed through a authenticated http proxy' in driver.page_source
+
+
 def test_clear_proxy_on_the_fly(driver_path, chrome_options, httpbin, httpproxy):
     sw_options = {'proxy': {'https': f'{httpproxy}'}}
 
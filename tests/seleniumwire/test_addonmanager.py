@@ -0,0 +1,195 @@
+import asyncio
+from unittest import TestCase
+from unittest.mock import Mock, patch
+
+from seleniumwire.thirdparty.mitmproxy import addonmanager, exceptions, flow
+from seleniumwire.thirdparty.mitmproxy.master import Master
+
+
+class _Addon:
+    def __init__(self, name, calls):
+        self.name = name
+        self.calls = calls
+
+    def request(self, f):
+        self.calls.append(self.name)
+
+
+class _Parent(_Addon):
+    def __init__(self, name, calls, addons=()):
+        super().__init__(name, calls)
+        self.addons = list(addons)
+
+
+class _Halt(_Addon):
+    def request(self, f):
+        super().request(f)
+        raise exceptions.AddonHalt()
+
+
+class _Error(_Addon):
+    def request(self, f):
+        super().request(f)
+        raise ValueError('broken addon')
+
+
+class _Responder:
+    def response(self, f):
+        pass
+
+
+class _Updater:
+    def update(self, flows):
+        pass
+
+
+class _MasterTestCase(TestCase):
+    def setUp(self):
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        self.master = Master(loop, None)
+        self.calls = []
+
+
+class AddonManagerTest(_MasterTestCase):
+    def test_handlers_built_on_add(self):
+        addons = self.master.addons
+        self.assertFalse(addons.handles('request'))
+
+        addons.add(_Addon('one', self.calls), _Responder())
+
+        self.assertTrue(addons.handles('request'))
+        self.assertTrue(addons.handles('response'))
+        self.assertFalse(addons.handles('websocket_message'))
+        self.assertEqual(1, len(addons.handlers['request']))
+
+    def test_handlers_rebuilt_on_remove(self):
+        addons = self.master.addons
+        one, two = _Addon('one', self.calls), _Addon('two', self.calls)
+        addons.add(one, two)
+
+        addons.remove(one)
+        addons.trigger('request', None)
+
+        self.assertEqual(['two'], self.calls)
+        addons.remove(two)
+        self.assertFalse(addons.handles('request'))
+
+    def test_handlers_rebuilt_on_clear(self):
+        addons = self.master.addons
+        addons.add(_Addon('one', self.calls))
+
+        addons.clear()
+
+        self.assertFalse(addons.handles('request'))
+
+    def test_sub_addons(self):
+        addons = self.master.addons
+        addons.add(_Parent('parent', self.calls, [_Addon('child', self.calls)]), _Addon('last', self.calls))
+
+        addons.trigger('request', None)
+
+        # In chain order, with sub-addons after their parent
+        self.assertEqual(['parent', 'child', 'last'], self.calls)
+
+    def test_nested_register(self):
+        addons = self.master.addons
+        parent = _Parent('parent', self.calls)
+        addons.add(parent)
+
+        # Registered by the parent once it is running
+        child = _Addon('child', self.calls)
+        parent.addons.append(child)
+        addons.register(child)
+        addons.trigger('request', None)
+
+        self.assertEqual(['parent', 'child'], self.calls)
+        self.assertIs(child, addons.get('child'))
+
+    def test_halt_stops_dispatch(self):
+        addons = self.master.addons
+        addons.add(_Addon('one', self.calls), _Halt('halt', self.calls), _Addon('two', self.calls))
+
+        addons.trigger('request', None)
+
+        self.assertEqual(['one', 'halt'], self.calls)
+
+    def test_error_logged(self):
+        addons = self.master.addons
+        addons.add(_Error('error', self.calls), _Addon('two', self.calls))
+
+        with patch.object(addonmanager.ctx, 'log') as log:
+            addons.trigger('request', None)
+
+        # Not raised, and the next addon still sees the event
+        self.assertEqual(['error', 'two'], self.calls)
+        log.error.assert_called_once()
+        self.assertIn('broken addon', log.error.call_args[0][0])
+
+    def test_options_error_raised(self):
+        addon = Mock(spec=['name', 'configure'])
+        addon.name = 'options'
+        addon.configure.side_effect = exceptions.OptionsError('bad option')
+        addons = self.master.addons
+        addons.chain.append(addon)
+        addons.lookup['options'] = addon
+        addons._build_handlers()
+
+        with self.assertRaises(exceptions.OptionsError):
+            addons.trigger('configure', set())
+
+    def test_unknown_event(self):
+        with self.assertRaises(exceptions.AddonManagerError):
+            self.master.addons.trigger('unknown')
+
+
+class ChannelTest(_MasterTestCase):
+    def setUp(self):
+        super().setUp()
+        self.channel = self.master.channel
+        patcher = patch('seleniumwire.thirdparty.mitmproxy.controller.asyncio.run_coroutine_threadsafe')
+        self.run_coroutine_threadsafe = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_ask_unhandled(self):
+        m = Mock(spec=[])
+
+        self.assertIs(m, self.channel.ask('request', m))
+
+        # Answered without a trip through the event loop
+        self.assertFalse(hasattr(m, 'reply'))
+        self.run_coroutine_threadsafe.assert_not_called()
+        self.assertEqual(0, self.master.metrics.hooks_pending.value)
+
+    def test_tell_unhandled(self):
+        m = Mock(spec=[])
+
+        self.channel.tell('log', m)
+
+        self.assertFalse(hasattr(m, 'reply'))
+        self.run_coroutine_threadsafe.assert_not_called()
+
+    def test_handled(self):
+        self.master.addons.add(_Addon('one', self.calls))
+        f = flow.Flow('http', Mock(), Mock())
+
+        self.assertTrue(self.channel._handled('request', f))
+        self.assertFalse(self.channel._handled('response', f))
+
+    def test_handled_flow_update(self):
+        self.master.addons.add(_Updater())
+        f = flow.Flow('http', Mock(), Mock())
+
+        # Flows are passed to the update event once handled
+        self.assertTrue(self.channel._handled('response', f))
+        self.assertFalse(self.channel._handled('response', Mock(spec=[])))
+
+    def test_tell_handled(self):
+        self.master.addons.add(_Addon('one', self.calls))
+        m = Mock(spec=[])
+
+        self.channel.tell('request', m)
+
+        self.assertTrue(hasattr(m, 'reply'))
+        self.run_coroutine_threadsafe.assert_called_once()
+        self.run_coroutine_threadsafe.call_args[0][0].close()
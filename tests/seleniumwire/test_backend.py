@@ -1,6 +1,8 @@
 import json
 import os
 import ssl
+import subprocess
+import sys
 import urllib.error
 import urllib.request
 from unittest import TestCase
@@ -437,3 +439,36 @@ class BackendIntegrationTest(TestCase):
             html = response.read()
 
         return html
+
+
+class BackendImportTest(TestCase):
+    def test_protocol_dependencies_not_imported(self):
+        # Run in a new interpreter, as other tests will have imported everything
+        code = (
+            'import sys, seleniumwire.backend; '
+            'print(",".join(m for m in ("h2", "wsproto", "kaitaistruct", "pyasn1", "pyparsing", "pkg_resources", '
+            '"brotli", "zstandard") if m in sys.modules))'
+        )
+
+        out = subprocess.run([sys.executable, '-c', code], check=True, capture_output=True, text=True).stdout
+
+        self.assertEqual('', out.strip())
+
+    def test_protocol_layers_exported_lazily(self):
+        code = (
+            'import sys; from seleniumwire.thirdparty.mitmproxy.server import protocol; '
+            'print("h2" in sys.modules, "wsproto" in sys.modules); '
+            'from seleniumwire.thirdparty.mitmproxy.server.protocol import Http2Layer, WebSocketLayer; '
+            'print(Http2Layer.__module__, WebSocketLayer.__module__)'
+        )
+
+        out = subprocess.run([sys.executable, '-c', code], check=True, capture_output=True, text=True).stdout
+
+        self.assertEqual(
+            [
+                'False False',
+                'seleniumwire.thirdparty.mitmproxy.server.protocol.http2 '
+                'seleniumwire.thirdparty.mitmproxy.server.protocol.websocket',
+            ],
+            out.strip().splitlines(),
+        )
@@ -0,0 +1,58 @@
+import shutil
+import tempfile
+import threading
+from unittest import TestCase
+from unittest.mock import Mock
+
+from seleniumwire.thirdparty.mitmproxy.certs import CertStore
+
+
+class CertStoreTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.path = tempfile.mkdtemp()
+        cls.store = CertStore.from_store(cls.path, 'test', 2048)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.path)
+
+    def setUp(self):
+        self.store.certs = {}
+        self.store.expire_queue = []
+        self.store.generated = 0
+
+    def test_observe_generated(self):
+        observe = Mock()
+
+        cert, _, _ = self.store.get_cert(b'example.com', [b'example.com'], observe=observe)
+
+        self.assertEqual(b'example.com', cert.cn)
+        self.assertEqual(1, observe.call_count)
+        self.assertGreaterEqual(observe.call_args[0][0], 0)
+
+    def test_observe_not_called_for_stored(self):
+        self.store.get_cert(b'example.com', [b'example.com'])
+        observe = Mock()
+
+        self.store.get_cert(b'example.com', [b'example.com'], observe=observe)
+
+        observe.assert_not_called()
+        self.assertEqual(1, self.store.generated)
+
+    def test_concurrent_generated_once(self):
+        observe = Mock()
+        start = threading.Barrier(5)
+
+        def get_cert():
+            start.wait(5)
+            self.store.get_cert(b'example.com', [b'example.com'], observe=observe)
+
+        threads = [threading.Thread(target=get_cert) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(1, self.store.generated)
+        self.assertEqual(1, observe.call_count)
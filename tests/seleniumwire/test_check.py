@@ -0,0 +1,134 @@
+from unittest import TestCase
+
+from seleniumwire.thirdparty.mitmproxy.net.check import HostSuffixMatcher, NoProxyMatcher
+
+
+class HostSuffixMatcherTest(TestCase):
+    def test_suffix(self):
+        matcher = HostSuffixMatcher(['example.com', 'ads.other.net'])
+
+        self.assertTrue(matcher('example.com'))
+        self.assertTrue(matcher('ads.example.com'))
+        self.assertTrue(matcher('a.b.example.com'))
+        self.assertTrue(matcher('Ads.Example.COM.'))
+        self.assertTrue(matcher('x.ads.other.net'))
+        self.assertFalse(matcher('badexample.com'))
+        self.assertFalse(matcher('example.com.evil.net'))
+        self.assertFalse(matcher('other.net'))
+        self.assertFalse(matcher('com'))
+
+    def test_leading_dot_and_wildcard(self):
+        for entry in ['.example.com', '*.example.com', ' Example.com. ']:
+            with self.subTest(entry=entry):
+                matcher = HostSuffixMatcher([entry])
+
+                self.assertTrue(matcher('example.com'))
+                self.assertTrue(matcher('ads.example.com'))
+                self.assertFalse(matcher('other.com'))
+
+    def test_ipv4(self):
+        matcher = HostSuffixMatcher(['10.0.0.1'])
+
+        self.assertTrue(matcher('10.0.0.1'))
+        # Addresses only match exactly
+        self.assertFalse(matcher('1.10.0.0.1'))
+        self.assertFalse(matcher('10.0.0.2'))
+
+    def test_ipv6(self):
+        matcher = HostSuffixMatcher(['::1', '[2001:db8::1]'])
+
+        self.assertTrue(matcher('::1'))
+        self.assertTrue(matcher('[::1]'))
+        self.assertTrue(matcher('2001:db8:0::1'))
+        self.assertTrue(matcher('[2001:DB8::1]'))
+        self.assertFalse(matcher('::2'))
+
+    def test_empty(self):
+        matcher = HostSuffixMatcher(['', '*', '.'])
+
+        self.assertFalse(matcher)
+        self.assertFalse(matcher('example.com'))
+        self.assertFalse(matcher(''))
+
+
+class NoProxyMatcherTest(TestCase):
+    def test_host(self):
+        matcher = NoProxyMatcher(['example.com'])
+
+        self.assertTrue(matcher('example.com', 443))
+        self.assertTrue(matcher('api.example.com', 80))
+        self.assertTrue(matcher('EXAMPLE.COM.', 443))
+        self.assertFalse(matcher('badexample.com', 443))
+        self.assertFalse(matcher('example.com.evil.net', 443))
+
+    def test_leading_dot_and_wildcard(self):
+        for entry in ['.example.com', '*.example.com']:
+            with self.subTest(entry=entry):
+                matcher = NoProxyMatcher([entry])
+
+                self.assertTrue(matcher('example.com', 443))
+                self.assertTrue(matcher('api.example.com', 443))
+                self.assertFalse(matcher('other.com', 443))
+
+    def test_port(self):
+        matcher = NoProxyMatcher(['localhost:8080'])
+
+        self.assertTrue(matcher('localhost', 8080))
+        self.assertFalse(matcher('localhost', 8081))
+
+    def test_port_on_longer_entry(self):
+        matcher = NoProxyMatcher(['example.com:8080', 'api.example.com'])
+
+        self.assertTrue(matcher('api.example.com', 443))
+        self.assertTrue(matcher('www.example.com', 8080))
+        self.assertFalse(matcher('www.example.com', 443))
+
+    def test_ipv4(self):
+        matcher = NoProxyMatcher(['127.0.0.1', '10.0.0.1:8080'])
+
+        self.assertTrue(matcher('127.0.0.1', 443))
+        self.assertTrue(matcher('10.0.0.1', 8080))
+        self.assertFalse(matcher('10.0.0.1', 443))
+        self.assertFalse(matcher('127.0.0.2', 443))
+
+    def test_ipv6(self):
+        matcher = NoProxyMatcher(['::1', '[2001:db8::1]:8080'])
+
+        self.assertTrue(matcher('::1', 443))
+        self.assertTrue(matcher('[::1]', 443))
+        self.assertTrue(matcher('2001:db8:0::1', 8080))
+        self.assertFalse(matcher('2001:db8::1', 443))
+
+    def test_cidr(self):
+        matcher = NoProxyMatcher(['10.0.0.0/8', '192.168.1.0/24:8080', 'fd00::/8'])
+
+        self.assertTrue(matcher('10.1.2.3', 443))
+        self.assertTrue(matcher('192.168.1.20', 8080))
+        self.assertFalse(matcher('192.168.1.20', 443))
+        self.assertTrue(matcher('fd12::1', 443))
+        self.assertFalse(matcher('11.0.0.1', 443))
+        # Host names aren't looked up
+        self.assertFalse(matcher('example.com', 443))
+
+    def test_match_all(self):
+        matcher = NoProxyMatcher(['*'])
+
+        self.assertTrue(matcher('example.com', 443))
+        self.assertTrue(matcher('10.0.0.1', 80))
+
+    def test_empty(self):
+        matcher = NoProxyMatcher(['', ' '])
+
+        self.assertFalse(matcher)
+        self.assertFalse(matcher('example.com', 443))
+        self.assertFalse(matcher('', 443))
+
+    def test_invalid_entries_ignored(self):
+        with self.assertLogs('seleniumwire.thirdparty.mitmproxy.net.check', level='WARNING') as logs:
+            matcher = NoProxyMatcher(['example.com:abc', '10.0.0.0/99', 'localhost:99999', 'other.com'])
+
+        self.assertEqual(3, len(logs.output))
+        self.assertIn('example.com:abc', logs.output[0])
+        self.assertFalse(matcher('example.com', 443))
+        self.assertFalse(matcher('10.0.0.1', 443))
+        self.assertTrue(matcher('other.com', 443))
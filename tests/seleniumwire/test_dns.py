@@ -0,0 +1,310 @@
+import socket
+import threading
+import time
+from unittest import TestCase
+from unittest.mock import patch
+
+from seleniumwire.thirdparty.mitmproxy.coretypes import basethread
+from seleniumwire.thirdparty.mitmproxy.net import dns, tcp
+
+
+def _addrinfo(*addresses):
+    return [
+        (socket.AF_INET6 if ':' in address else socket.AF_INET, socket.SOCK_STREAM, 6, '', (address, 0))
+        for address in addresses
+    ]
+
+
+class ResolverTest(TestCase):
+    def setUp(self):
+        patcher = patch('seleniumwire.thirdparty.mitmproxy.net.dns.socket.getaddrinfo')
+        self.getaddrinfo = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.getaddrinfo.return_value = _addrinfo('10.0.0.1')
+        self.now = 1000.0
+        patcher = patch('seleniumwire.thirdparty.mitmproxy.net.dns.time.monotonic', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_cached(self):
+        resolver = dns.Resolver(ttl=60)
+
+        first = resolver.getaddrinfo('Example.com', 443, 0, socket.SOCK_STREAM)
+        second = resolver.getaddrinfo('example.com.', 80, 0, socket.SOCK_STREAM)
+
+        self.assertEqual(1, self.getaddrinfo.call_count)
+        self.assertEqual(('10.0.0.1', 443), first[0][4])
+        self.assertEqual(('10.0.0.1', 80), second[0][4])
+
+    def test_ttl_expiry(self):
+        resolver = dns.Resolver(ttl=60)
+        resolver.getaddrinfo('example.com', 443)
+
+        self.now += 59
+        resolver.getaddrinfo('example.com', 443)
+        self.assertEqual(1, self.getaddrinfo.call_count)
+
+        self.now += 2
+        resolver.getaddrinfo('example.com', 443)
+        self.assertEqual(2, self.getaddrinfo.call_count)
+
+    def test_no_caching(self):
+        resolver = dns.Resolver(ttl=0)
+
+        resolver.getaddrinfo('example.com', 443)
+        resolver.getaddrinfo('example.com', 443)
+
+        self.assertEqual(2, self.getaddrinfo.call_count)
+
+    def test_negative_caching(self):
+        self.getaddrinfo.side_effect = socket.gaierror(socket.EAI_NONAME, 'Name or service not known')
+        resolver = dns.Resolver(ttl=60, negative_ttl=5)
+
+        for _ in range(2):
+            with self.assertRaises(socket.gaierror):
+                resolver.getaddrinfo('missing.example', 443)
+        self.assertEqual(1, self.getaddrinfo.call_count)
+
+        self.now += 6
+        self.getaddrinfo.side_effect = None
+        self.assertEqual(('10.0.0.1', 443), resolver.getaddrinfo('missing.example', 443)[0][4])
+
+    def test_interrupted_lookup_not_cached(self):
+        self.getaddrinfo.side_effect = [KeyboardInterrupt, _addrinfo('10.0.0.1')]
+        resolver = dns.Resolver()
+
+        with self.assertRaises(KeyboardInterrupt):
+            resolver.getaddrinfo('example.com', 443)
+
+        self.assertEqual(('10.0.0.1', 443), resolver.getaddrinfo('example.com', 443)[0][4])
+
+    def test_concurrent_lookups_share_one(self):
+        release = threading.Event()
+
+        def lookup(*args):
+            release.wait(5)
+            return _addrinfo('10.0.0.1')
+
+        self.getaddrinfo.side_effect = lookup
+        resolver = dns.Resolver()
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(resolver.getaddrinfo('example.com', 443))) for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.1)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(1, self.getaddrinfo.call_count)
+        self.assertEqual(5, len(results))
+
+    def test_override_address(self):
+        resolver = dns.Resolver(overrides={'example.com': '127.0.0.1'})
+
+        resolver.getaddrinfo('EXAMPLE.com', 443, 0, socket.SOCK_STREAM)
+        resolver.getaddrinfo('example.com', 443, 0, socket.SOCK_STREAM)
+
+        # Looked up directly, without caching
+        self.assertEqual(2, self.getaddrinfo.call_count)
+        self.getaddrinfo.assert_called_with('127.0.0.1', 443, 0, socket.SOCK_STREAM, 0, 0)
+
+    def test_override_host(self):
+        resolver = dns.Resolver(overrides=dns.parse_overrides(['www.example.com = staging.example.com']))
+
+        resolver.getaddrinfo('www.example.com', 443)
+
+        self.getaddrinfo.assert_called_once_with('staging.example.com', None, 0, 0)
+
+    def test_parse_overrides_invalid(self):
+        for spec in ['example.com', '=127.0.0.1', 'example.com=']:
+            with self.subTest(spec=spec):
+                with self.assertRaises(ValueError):
+                    dns.parse_overrides([spec])
+
+    def test_eviction(self):
+        resolver = dns.Resolver(ttl=60, max_size=2)
+        resolver.getaddrinfo('a.example', 443)
+        resolver.getaddrinfo('b.example', 443)
+
+        resolver.getaddrinfo('c.example', 443)
+
+        # The oldest answer was dropped
+        self.assertEqual({'b.example', 'c.example'}, {key[0] for key in resolver._cache})
+
+    def test_eviction_prefers_expired(self):
+        resolver = dns.Resolver(ttl=60, negative_ttl=5, max_size=2)
+        resolver.getaddrinfo('a.example', 443)
+        self.getaddrinfo.side_effect = socket.gaierror(socket.EAI_NONAME, 'Name or service not known')
+        with self.assertRaises(socket.gaierror):
+            resolver.getaddrinfo('b.example', 443)
+        self.getaddrinfo.side_effect = None
+        self.now += 10
+
+        resolver.getaddrinfo('c.example', 443)
+
+        self.assertEqual({'a.example', 'c.example'}, {key[0] for key in resolver._cache})
+
+    def test_prefetch(self):
+        release = threading.Event()
+        running = []
+
+        def lookup(host, *args):
+            running.append(host)
+            release.wait(5)
+            return _addrinfo('10.0.0.1')
+
+        self.getaddrinfo.side_effect = lookup
+        resolver = dns.Resolver()
+
+        resolver.prefetch(['host{}.example'.format(i) for i in range(10)])
+        time.sleep(0.2)
+
+        # Only a few lookups are made at once
+        self.assertEqual(dns.Resolver.PREFETCH_WORKERS, len(running))
+        release.set()
+        deadline = time.monotonic() + 5
+        while len(resolver._cache) < 10 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(10, len(resolver._cache))
+        self.assertEqual(10, self.getaddrinfo.call_count)
+
+
+class InterleaveTest(TestCase):
+    def test_interleave(self):
+        addrinfos = _addrinfo('::1', '::2', '::3', '10.0.0.1', '10.0.0.2')
+
+        result = [addrinfo[4][0] for addrinfo in dns.interleave(addrinfos)]
+
+        self.assertEqual(['::1', '10.0.0.1', '::2', '10.0.0.2', '::3'], result)
+
+    def test_single_family(self):
+        addrinfos = _addrinfo('10.0.0.1', '10.0.0.2')
+
+        self.assertEqual(addrinfos, dns.interleave(addrinfos))
+
+
+class WorkerPoolTest(TestCase):
+    def test_max_workers(self):
+        pool = basethread.WorkerPool('test', idle_timeout=1, max_workers=2)
+        release = threading.Event()
+        done = []
+
+        def work(i):
+            release.wait(5)
+            done.append(i)
+
+        for i in range(6):
+            pool.submit(work, i)
+        time.sleep(0.1)
+
+        self.assertEqual(2, pool._workers)
+        release.set()
+        deadline = time.monotonic() + 5
+        while len(done) < 6 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(list(range(6)), sorted(done))
+
+    def test_worker_reused(self):
+        pool = basethread.WorkerPool('test', idle_timeout=5)
+        names = []
+
+        for _ in range(3):
+            done = threading.Event()
+            pool.submit(lambda: (names.append(threading.current_thread().name), done.set()))
+            self.assertTrue(done.wait(5))
+            self._wait_idle(pool)
+
+        self.assertEqual(['test-1'] * 3, names)
+        self.assertEqual(1, pool._started)
+
+    def test_busy_workers_not_reused(self):
+        pool = basethread.WorkerPool('test', idle_timeout=5)
+        release = threading.Event()
+        names = set()
+
+        def work():
+            names.add(threading.current_thread().name)
+            release.wait(5)
+
+        pool.submit(work)
+        pool.submit(work)
+        time.sleep(0.1)
+        release.set()
+
+        self.assertEqual({'test-1', 'test-2'}, names)
+
+    def test_idle_worker_exits(self):
+        pool = basethread.WorkerPool('test', idle_timeout=0.1)
+        done = threading.Event()
+        pool.submit(done.set)
+        self.assertTrue(done.wait(5))
+
+        deadline = time.monotonic() + 5
+        while pool._workers and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        self.assertEqual(0, pool._workers)
+        self.assertEqual(0, pool._idle)
+        done.clear()
+        pool.submit(done.set)
+        self.assertTrue(done.wait(5))
+        self.assertEqual(2, pool._started)
+
+    def _wait_idle(self, pool):
+        deadline = time.monotonic() + 5
+        while not pool._idle and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+
+class HappyEyeballsTest(TestCase):
+    def setUp(self):
+        self.server = socket.create_server(('127.0.0.1', 0))
+        self.addCleanup(self.server.close)
+        self.port = self.server.getsockname()[1]
+
+    def test_falls_back_to_next_address(self):
+        client = self._client('192.0.2.1', '127.0.0.1')
+
+        start = time.monotonic()
+        client.connect()
+        elapsed = time.monotonic() - start
+        self.addCleanup(client.close)
+
+        self.assertEqual(('127.0.0.1', self.port), client.ip_address[:2])
+        # The unreachable address was given up on (or failed), not waited out
+        self.assertLess(elapsed, 2)
+
+    def test_refused_address_skipped(self):
+        closed = socket.socket()
+        closed.bind(('127.0.0.1', 0))
+        refused_port = closed.getsockname()[1]
+        closed.close()
+        client = self._client('127.0.0.1', '127.0.0.1', ports=[refused_port, self.port])
+
+        client.connect()
+        self.addCleanup(client.close)
+
+        self.assertEqual(self.port, client.ip_address[1])
+
+    def test_all_addresses_fail(self):
+        closed = socket.socket()
+        closed.bind(('127.0.0.1', 0))
+        refused_port = closed.getsockname()[1]
+        closed.close()
+        client = self._client('127.0.0.1', '127.0.0.2', ports=[refused_port, refused_port])
+
+        with self.assertRaises(Exception):
+            client.connect()
+
+    def _client(self, *addresses, ports=None):
+        ports = ports or [self.port] * len(addresses)
+        client = tcp.TCPClient(('example.com', self.port))
+        client.resolver = dns.Resolver(overrides={})
+        addrinfos = [
+            (socket.AF_INET, socket.SOCK_STREAM, 6, '', (address, port)) for address, port in zip(addresses, ports)
+        ]
+        client.resolver.getaddrinfo = lambda *args, **kwargs: addrinfos
+        return client
@@ -4,7 +4,9 @@ from unittest.mock import Mock, patch
 
 from seleniumwire.handler import InterceptRequestHandler
 from seleniumwire.request import WebSocketMessage
+from seleniumwire.thirdparty.mitmproxy.metrics import Metrics
 from seleniumwire.thirdparty.mitmproxy.net.http.headers import Headers
+from seleniumwire.utils import DECODE_MAX_SIZE
 
 
 class InterceptRequestHandlerTest(TestCase):
@@ -14,6 +16,7 @@ class InterceptRequestHandlerTest(TestCase):
         self.proxy.scopes = []
         self.proxy.request_interceptor = None
         self.proxy.response_interceptor = None
+        self.proxy.metrics = Metrics()
         self.handler = InterceptRequestHandler(self.proxy)
         self.mock_flow = Mock()
         self.mock_flow.server_conn.via = None
@@ -274,6 +277,21 @@ class InterceptRequestHandlerTest(TestCase):
             WebSocketMessage(from_client=True, content='test message', date=datetime.fromtimestamp(1614069300.0)),
         )
 
+    def test_publish_websocket_message(self):
+        mock_handshake_flow = Mock()
+        mock_handshake_flow.request.id = '12345'
+        mock_handshake_flow.request.url = 'https://server/socket'
+        self.mock_flow.handshake_flow = mock_handshake_flow
+        self.mock_flow.messages = [Mock(from_client=True, content='test message', timestamp=1614069300.0)]
+
+        self.handler.websocket_message(self.mock_flow)
+
+        self.proxy.ws_subscriptions.publish.assert_called_once_with(
+            '12345',
+            'wss://server/socket',
+            WebSocketMessage(from_client=True, content='test message', date=datetime.fromtimestamp(1614069300.0)),
+        )
+
     def test_save_websocket_message_no_request(self):
         """If the handshake request was not saved (has no id) then
         we don't expect the websocket message to be saved.
@@ -287,6 +305,7 @@ class InterceptRequestHandlerTest(TestCase):
             self.handler.websocket_message(self.mock_flow)
 
         self.proxy.storage.save_ws_message.assert_not_called()
+        self.proxy.ws_subscriptions.publish.assert_not_called()
 
     @patch('seleniumwire.handler.har')
     def test_save_har_entry(self, mock_har):
@@ -299,7 +318,7 @@ class InterceptRequestHandlerTest(TestCase):
         self.handler.response(self.mock_flow)
 
         self.proxy.storage.save_har_entry.assert_called_once_with('12345', {'name': 'test_har_entry'})
-        mock_har.create_har_entry.assert_called_once_with(self.mock_flow)
+        mock_har.create_har_entry.assert_called_once_with(self.mock_flow, DECODE_MAX_SIZE)
 
     @patch('seleniumwire.handler.har')
     def test_save_har_entry_disabled(self, mock_har):
@@ -315,10 +334,15 @@ class InterceptRequestHandlerTest(TestCase):
         mock_har.create_har_entry.assert_not_called()
 
     def test_mismatched_upstream_proxy(self):
+        # The proxy layer moves the connection to the new upstream proxy, so the client connection is kept
         self.mock_flow.server_conn.via = Mock(address=('localhost', 8081))
         self.proxy.master.server.config.upstream_server.address = ('localhost', 8082)
+        self.mock_flow.request.url = 'http://somewhere.com/some/path'
+        self.mock_flow.request.method = 'GET'
+        self.mock_flow.request.headers = Headers()
+        self.mock_flow.request.raw_content = b''
 
         self.handler.request(self.mock_flow)
 
-        self.mock_flow.client_conn.finish.assert_called_once_with()
-        self.proxy.storage.save_request.assert_not_called()
+        self.mock_flow.client_conn.finish.assert_not_called()
+        self.proxy.storage.save_request.assert_called_once()
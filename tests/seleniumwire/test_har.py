@@ -1,9 +1,12 @@
+import base64
+import gzip
 import json
 from datetime import datetime, timedelta, timezone
 from unittest.mock import Mock
 
 import seleniumwire
 from seleniumwire.har import create_har_entry, generate_har
+from seleniumwire.thirdparty.mitmproxy import http
 
 
 def test_create_har_entry():
@@ -48,7 +51,7 @@ def test_create_har_entry():
     mock_flow.response.cookies.fields = [('test_res_cookie', ('test', {'path': '/'}))]
     mock_flow.response.headers = {'Content-Type': 'text/plain', 'Location': 'test_location'}
     mock_flow.response.raw_content = b'compressed'
-    mock_flow.response.content = b'helloworld12345'
+    mock_flow.response.get_content.return_value = b'helloworld12345'
     mock_flow.response.get_text.return_value = 'helloworld12345'
 
     mock_flow.server_conn.ip_address = ('10.10.10.1',)
@@ -100,6 +103,40 @@ def test_create_har_entry():
     assert entry['serverIPAddress'] == '10.10.10.1'
 
 
+def test_create_har_entry_decodes_body():
+    flow = _flow(gzip.compress(b'hello world'))
+
+    entry = create_har_entry(flow)
+
+    assert entry['response']['content']['text'] == 'hello world'
+    assert entry['response']['content']['compression'] == 11 - len(flow.response.raw_content)
+
+
+def test_create_har_entry_body_too_large():
+    compressed = gzip.compress(b'\0' * 10_000)
+    flow = _flow(compressed)
+
+    entry = create_har_entry(flow, max_size=1000)
+
+    # Not decoded, so included as received
+    assert entry['response']['content']['compression'] == 0
+    assert entry['response']['content']['encoding'] == 'base64'
+    assert base64.b64decode(entry['response']['content']['text']) == compressed
+
+
+def _flow(response_body):
+    flow = Mock()
+    flow.server_conn.timestamp_start = flow.server_conn.timestamp_tcp_setup = 1
+    flow.server_conn.timestamp_tls_setup = None
+    flow.server_conn.connected.return_value = False
+    flow.request = http.HTTPRequest.make('GET', 'https://example.com/')
+    flow.request.timestamp_start = flow.request.timestamp_end = 2
+    flow.response = http.HTTPResponse.make(200, b'', {'content-encoding': 'gzip', 'content-type': 'text/plain'})
+    flow.response.raw_content = response_body
+    flow.response.timestamp_start = flow.response.timestamp_end = 3
+    return flow
+
+
 def test_generate_har():
     entries = [{'name': 'entry1'}, {'name': 'entry2'}]
 
@@ -0,0 +1,253 @@
+import io
+import socket
+import threading
+import time
+import tracemalloc
+from unittest import TestCase
+from unittest.mock import Mock
+
+from seleniumwire.thirdparty.mitmproxy import exceptions, http
+from seleniumwire.thirdparty.mitmproxy.net import tcp
+from seleniumwire.thirdparty.mitmproxy.net.http.http1 import read
+from seleniumwire.thirdparty.mitmproxy.server.config import OptionsSnapshot
+from seleniumwire.thirdparty.mitmproxy.server.protocol.base import Layer
+from seleniumwire.thirdparty.mitmproxy.server.protocol.http import HttpLayer
+from seleniumwire.thirdparty.mitmproxy.server.protocol.http1 import Http1Layer
+from seleniumwire.thirdparty.mitmproxy.server.root_context import RootContext
+
+
+class ReadHeadTest(TestCase):
+    def test_fast_path(self):
+        rfile = self._rfile(b'GET /path HTTP/1.1\r\nHost: example.com\r\nX-Test:  a b \r\n\r\nbody')
+
+        line, headers = read._read_head(rfile)
+
+        self.assertEqual(b'GET /path HTTP/1.1', line)
+        self.assertEqual([(b'Host', b'example.com'), (b'X-Test', b'a b')], list(headers.fields))
+        # Only the head was consumed
+        self.assertEqual(b'body', rfile.read(4))
+
+    def test_bare_lf_falls_back(self):
+        data = b'GET /path HTTP/1.1\nHost: example.com\r\n\r\n'
+
+        self.assertIsNone(read._read_head(self._rfile(data)))
+
+        request = read.read_request_head(self._rfile(data))
+        self.assertEqual('example.com', request.headers['Host'])
+
+    def test_obs_fold_falls_back(self):
+        data = b'GET /path HTTP/1.1\r\nX-Test: a\r\n  b\r\nHost: example.com\r\n\r\n'
+        rfile = self._rfile(data)
+
+        self.assertIsNone(read._read_head(rfile))
+
+        # Nothing was consumed, so the line by line parser reads it all
+        request = read.read_request_head(rfile)
+        self.assertEqual('a\r\n b', request.headers['X-Test'])
+        self.assertEqual('example.com', request.headers['Host'])
+
+    def test_incomplete_head_falls_back(self):
+        self.assertIsNone(read._read_head(self._rfile(b'GET /path HTTP/1.1\r\nHost: exa')))
+
+    def test_unpeekable_falls_back(self):
+        data = b'GET /path HTTP/1.1\r\nHost: example.com\r\n\r\n'
+
+        self.assertIsNone(read._read_head(tcp.Reader(io.BytesIO(data))))
+        self.assertEqual('example.com', read.read_request_head(tcp.Reader(io.BytesIO(data))).headers['Host'])
+
+    def test_invalid_header(self):
+        rfile = self._rfile(b'GET /path HTTP/1.1\r\nno colon\r\n\r\n')
+
+        with self.assertRaises(exceptions.HttpSyntaxException):
+            read._read_head(rfile)
+
+    def test_same_as_fallback(self):
+        data = b'HTTP/1.1 200 OK\r\nContent-Length: 0\r\nSet-Cookie: a=1\r\nSet-Cookie: b=2\r\n\r\n'
+
+        fast = read.read_response_head(self._rfile(data))
+        slow = read.read_response_head(tcp.Reader(io.BytesIO(data)))
+
+        self.assertEqual(slow.status_code, fast.status_code)
+        self.assertEqual(slow.reason, fast.reason)
+        self.assertEqual(slow.headers.fields, fast.headers.fields)
+
+    def _rfile(self, data):
+        client, server = socket.socketpair()
+        self.addCleanup(client.close)
+        self.addCleanup(server.close)
+        client.sendall(data)
+        return tcp.Reader(socket.SocketIO(server, 'rb'))
+
+
+class ReadBodyTest(TestCase):
+    def test_read_body(self):
+        data = bytes(range(256)) * 1000
+
+        self.assertEqual(data, b''.join(read.read_body(tcp.Reader(io.BytesIO(data)), len(data))))
+
+    def test_fixed_chunk_size(self):
+        chunks = list(read.read_body(tcp.Reader(io.BytesIO(b'x' * 10)), 10, max_chunk_size=4))
+
+        self.assertEqual([b'xxxx', b'xxxx', b'xx'], chunks)
+
+    def test_unexpected_eof(self):
+        with self.assertRaises(exceptions.HttpException):
+            list(read.read_body(tcp.Reader(io.BytesIO(b'hello')), 10))
+
+    def test_read_until_eof(self):
+        self.assertEqual(b'hello world', b''.join(read.read_body(tcp.Reader(io.BytesIO(b'hello world')), -1)))
+
+    def test_trickled_body_forwarded_promptly(self):
+        client, server = socket.socketpair()
+        self.addCleanup(client.close)
+        self.addCleanup(server.close)
+        rfile = tcp.Reader(socket.SocketIO(server, 'rb'))
+        proceed = threading.Event()
+
+        def send():
+            client.sendall(b'x' * 100)
+            proceed.wait(5)
+            client.sendall(b'y' * 100)
+
+        threading.Thread(target=send, daemon=True).start()
+        body = read.read_body(rfile, 200)
+
+        start = time.monotonic()
+        first = next(body)
+        elapsed = time.monotonic() - start
+        proceed.set()
+
+        # Passed on without waiting for the rest of the chunk to arrive
+        self.assertEqual(b'x' * 100, first)
+        self.assertLess(elapsed, 1)
+        self.assertEqual(b'y' * 100, b''.join(body))
+
+    def test_chunk_size_grows(self):
+        data = b'x' * (read.MAX_CHUNK_SIZE * 4)
+
+        chunks = list(read.read_body(tcp.Reader(io.BytesIO(data)), len(data)))
+
+        self.assertEqual(data, b''.join(chunks))
+        self.assertEqual(read.MIN_CHUNK_SIZE, len(chunks[0]))
+        self.assertEqual(read.MAX_CHUNK_SIZE, max(len(chunk) for chunk in chunks))
+
+
+class ReadBodyContentTest(TestCase):
+    def test_read_body(self):
+        body = self._read(b'hello world', 11)
+
+        self.assertEqual(b'hello world', body)
+        self.assertIsInstance(body, bytes)
+
+    def test_read_body_larger_than_preallocation(self):
+        data = bytes(range(256)) * (read.MAX_PREALLOCATE_SIZE // 256 * 3 + 1)
+
+        self.assertEqual(data, self._read(data, len(data)))
+
+    def test_read_body_leaves_rest(self):
+        rfile = tcp.Reader(io.BytesIO(b'hello world'))
+
+        self.assertEqual(b'hello', read.read_body_content(rfile, 5))
+        self.assertEqual(b' world', rfile.read(6))
+
+    def test_unexpected_eof(self):
+        with self.assertRaises(exceptions.HttpException):
+            self._read(b'hello', 10)
+
+    def test_unexpected_eof_after_growing(self):
+        data = b'x' * (read.MAX_PREALLOCATE_SIZE + 10)
+
+        with self.assertRaises(exceptions.HttpException):
+            self._read(data, len(data) + 1)
+
+    def test_huge_content_length_not_preallocated(self):
+        tracemalloc.start()
+        try:
+            with self.assertRaises(exceptions.HttpException):
+                self._read(b'hello', 10_000_000_000)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        self.assertLess(peak, read.MAX_PREALLOCATE_SIZE * 2)
+
+    def test_body_not_copied(self):
+        data = b'x' * (read.MAX_PREALLOCATE_SIZE * 4)
+        rfile = tcp.Reader(io.BytesIO(data))
+
+        tracemalloc.start()
+        try:
+            body = read.read_body_content(rfile, len(data))
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        self.assertEqual(data, body)
+        # Only the body itself, plus a little slack for the buffer growing
+        self.assertLess(peak, len(data) * 1.5)
+
+    def test_limit(self):
+        with self.assertRaises(exceptions.HttpException):
+            self._read(b'hello world', 11, limit=5)
+
+    def test_unknown_size(self):
+        self.assertEqual(b'hello world', self._read(b'hello world', -1))
+
+    def _read(self, data, expected_size, limit=None):
+        return read.read_body_content(tcp.Reader(io.BytesIO(data)), expected_size, limit)
+
+
+class Http1LayerTest(TestCase):
+    def setUp(self):
+        self.ctx = Mock()
+        self.ctx.config.snapshot = self._snapshot(None)
+        self.ctx.client_conn.rfile = tcp.Reader(io.BytesIO(b'hello world'))
+        self.layer = Http1Layer(self.ctx, Mock())
+        self.request = http.HTTPRequest.make('POST', 'http://example.com/')
+        self.request.headers['content-length'] = '11'
+
+    def test_body_read_with_flow_snapshot(self):
+        self.layer.start_flow(self._snapshot(5))
+        # Options updated while the flow is in flight
+        self.ctx.config.snapshot = self._snapshot(None)
+
+        with self.assertRaises(exceptions.HttpException):
+            self.layer.read_request_content(self.request)
+
+    def test_options_updated_between_flows(self):
+        self.layer.start_flow(self._snapshot(5))
+        self.layer.start_flow(self._snapshot(None))
+
+        self.assertEqual(b'hello world', self.layer.read_request_content(self.request))
+
+    def test_options_changed_during_flow(self):
+        config = Mock(snapshot=self._snapshot(5))
+        layer = Http1Layer(RootContext(Mock(), config, Mock()), Mock())
+        http_layer = HttpLayer(layer, Mock())
+        inner_layer = Layer(http_layer)
+        flow_snapshots = []
+
+        def read_request_headers(flow):
+            # Options updated while the flow is in flight
+            config.snapshot = self._snapshot(None)
+            flow_snapshots.extend([layer.snapshot, http_layer.snapshot, inner_layer.snapshot])
+            raise exceptions.HttpReadDisconnect()
+
+        layer.read_request_headers = read_request_headers
+        http_layer._process_flow(Mock())
+
+        # The whole flow, and the layers it starts, see the options it started with
+        self.assertEqual([5, 5, 5], [snapshot.body_size_limit for snapshot in flow_snapshots])
+        http_layer._process_flow(Mock())
+        self.assertEqual([None, None, None], [snapshot.body_size_limit for snapshot in flow_snapshots[3:]])
+
+    def test_connection_keeps_snapshot(self):
+        config = Mock(snapshot=self._snapshot(5))
+        layer = Layer(RootContext(Mock(), config, Mock()))
+
+        config.snapshot = self._snapshot(None)
+
+        self.assertEqual(5, layer.snapshot.body_size_limit)
+
+    def _snapshot(self, body_size_limit):
+        return Mock(spec=OptionsSnapshot, body_size_limit=body_size_limit)
@@ -0,0 +1,101 @@
+import threading
+from unittest import TestCase
+from unittest.mock import Mock
+
+import h2.config
+import h2.connection
+import h2.events
+
+from seleniumwire.thirdparty.mitmproxy.server.protocol.http2 import Http2Layer, Http2SingleStreamLayer
+
+
+class Http2LayerWindowTest(TestCase):
+    def setUp(self):
+        self.ctx = Mock()
+        self.layer = Http2Layer(self.ctx, 'regular')
+        self.client = h2.connection.H2Connection(h2.config.H2Configuration(client_side=True))
+        self.client.initiate_connection()
+        preamble = self.client.data_to_send()
+        self.ctx.client_conn.rfile.read.return_value = preamble[:24]
+
+        self.layer._complete_handshake()
+        self.h2_conn = self.layer.connections[self.ctx.client_conn]
+        self.h2_conn.receive_data(preamble[24:])
+        self.client.receive_data(self._sent())
+
+    def test_window_opened(self):
+        self.assertEqual(Http2Layer.WINDOW_SIZE, self.client.outbound_flow_control_window)
+        stream_id = self.client.get_next_available_stream_id()
+        self.client.send_headers(stream_id, self._headers())
+        self.assertEqual(Http2Layer.WINDOW_SIZE, self.client.local_flow_control_window(stream_id))
+
+    def test_window_updated_for_large_body(self):
+        stream_id = self.client.get_next_available_stream_id()
+        self.client.send_headers(stream_id, self._headers())
+        # Enough to use up over half of the window, when h2 sends an update
+        body = b'x' * (Http2Layer.WINDOW_SIZE * 3 // 4)
+        frame_size = self.client.max_outbound_frame_size
+        # Far more than the protocol default window of 64KB, sent without waiting for updates
+        for position in range(0, len(body), frame_size):
+            end = position + frame_size
+            self.client.send_data(stream_id, body[position:end])
+        self.assertEqual(Http2Layer.WINDOW_SIZE - len(body), self.client.outbound_flow_control_window)
+        stream = Mock(queued_data_length=0)
+        stream.snapshot.body_size_limit = None
+        self.layer.streams[stream_id] = stream
+
+        for event in self.h2_conn.receive_data(self.client.data_to_send()):
+            if isinstance(event, h2.events.DataReceived):
+                self.layer._handle_data_received(stream_id, event, self.ctx.client_conn)
+        self.ctx.client_conn.send.reset_mock()
+        self.h2_conn.flush()
+        events = self.client.receive_data(self._sent())
+
+        # Everything read is acknowledged, in a single write
+        self.assertEqual(1, self.ctx.client_conn.send.call_count)
+        self.assertTrue(any(isinstance(event, h2.events.WindowUpdated) for event in events))
+        # h2 keeps the windows over half open
+        self.assertGreater(self.client.outbound_flow_control_window, Http2Layer.WINDOW_SIZE // 2)
+        self.assertGreater(self.client.local_flow_control_window(stream_id), Http2Layer.WINDOW_SIZE // 2)
+        self.assertEqual(len(body), stream.queued_data_length)
+
+    def _sent(self):
+        return b''.join(call[0][0] for call in self.ctx.client_conn.send.call_args_list)
+
+    def _headers(self):
+        return [(':method', 'POST'), (':path', '/'), (':scheme', 'https'), (':authority', 'example.com')]
+
+
+class MessageTest(TestCase):
+    def test_read_body(self):
+        message = Http2SingleStreamLayer.Message()
+        raise_zombie = Mock()
+        message.data_queue.put(b'hello')
+        message.data_queue.put(b' world')
+        message.end()
+
+        self.assertEqual([b'hello', b' world'], list(message.read_body(raise_zombie)))
+        self.assertTrue(message.stream_ended.is_set())
+        raise_zombie.assert_called_once_with()
+
+    def test_end_wakes_reader(self):
+        message = Http2SingleStreamLayer.Message()
+        chunks = []
+        reader = threading.Thread(target=lambda: chunks.extend(message.read_body(Mock())))
+        reader.start()
+
+        message.data_queue.put(b'hello')
+        message.end()
+        reader.join(5)
+
+        self.assertFalse(reader.is_alive())
+        self.assertEqual([b'hello'], chunks)
+
+    def test_end_once(self):
+        message = Http2SingleStreamLayer.Message()
+
+        message.end()
+        message.end()
+
+        # A single end-of-body marker, so a reader never sees an empty body after the real one
+        self.assertEqual(1, message.data_queue.qsize())
@@ -0,0 +1,194 @@
+import json
+import socket
+import ssl
+import threading
+import time
+from pathlib import Path
+from unittest import TestCase
+
+import h2.config
+import h2.connection
+import h2.events
+
+from seleniumwire.thirdparty.mitmproxy import http, options
+from seleniumwire.thirdparty.mitmproxy.net.http import Headers
+from seleniumwire.thirdparty.mitmproxy.server import http2_upstream
+
+CERT = Path(__file__).parent.parent / 'server.crt'
+KEY = Path(__file__).parent.parent / 'server.key'
+
+
+class Http2Origin:
+    """A server that answers each HTTP/2 request, once it has ended, with a
+    JSON description of what it received.
+    """
+
+    def __init__(self, alpn=('h2',)):
+        self.context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        self.context.load_cert_chain(str(CERT), str(KEY))
+        self.context.set_alpn_protocols(list(alpn))
+        self.sock = socket.create_server(('127.0.0.1', 0))
+        self.address = self.sock.getsockname()[:2]
+        # The number of connections accepted
+        self.accepted = 0
+        self.connections = []
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                sock, _ = self.sock.accept()
+            except OSError:
+                return
+            self.accepted += 1
+            threading.Thread(target=self._serve, args=(sock,), daemon=True).start()
+
+    def _serve(self, sock):
+        try:
+            sock = self.context.wrap_socket(sock, server_side=True)
+        except (OSError, ssl.SSLError):
+            return
+        self.connections.append(sock)
+        if sock.selected_alpn_protocol() != 'h2':
+            sock.close()
+            return
+
+        try:
+            self._serve_h2(sock)
+        except OSError:
+            # The proxy closed the connection
+            pass
+
+    def _serve_h2(self, sock):
+        conn = h2.connection.H2Connection(h2.config.H2Configuration(client_side=False, header_encoding='utf-8'))
+        conn.initiate_connection()
+        sock.sendall(conn.data_to_send())
+        requests = {}
+
+        while True:
+            data = sock.recv(65536)
+            if not data:
+                return
+            for event in conn.receive_data(data):
+                if isinstance(event, h2.events.RequestReceived):
+                    requests[event.stream_id] = {'headers': dict(event.headers), 'body': '', 'trailers': {}}
+                elif isinstance(event, h2.events.DataReceived):
+                    conn.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+                    requests[event.stream_id]['body'] += event.data.decode()
+                elif isinstance(event, h2.events.TrailersReceived):
+                    requests[event.stream_id]['trailers'] = dict(event.headers)
+                elif isinstance(event, h2.events.StreamEnded):
+                    body = json.dumps(requests.pop(event.stream_id)).encode()
+                    conn.send_headers(event.stream_id, [(':status', '200'), ('content-length', str(len(body)))])
+                    conn.send_data(event.stream_id, body, end_stream=True)
+            sock.sendall(conn.data_to_send())
+
+    def close_connections(self):
+        for sock in self.connections:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def shutdown(self):
+        self.sock.close()
+        self.close_connections()
+
+
+class Http2UpstreamPoolTest(TestCase):
+    def setUp(self):
+        self.origin = Http2Origin()
+        opts = options.Options()
+        opts.ssl_insecure = True
+        self.pool = http2_upstream.Http2UpstreamPool(opts)
+
+    def tearDown(self):
+        self.pool.close()
+        self.origin.shutdown()
+
+    def test_request(self):
+        response = self._send(self._request('POST', b'hello'))
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('POST', response.json['headers'][':method'])
+        self.assertEqual('hello', response.json['body'])
+
+    def test_streams_share_connection(self):
+        self._send(self._request('GET'))
+        self._send(self._request('GET'))
+
+        self.assertEqual(1, self.origin.accepted)
+        self.assertEqual(1, len(self.pool.connections))
+
+    def test_empty_body_with_trailers(self):
+        request = self._request('POST', b'')
+        request.trailers = Headers(x_checksum='abc')
+
+        response = self._send(request)
+
+        self.assertEqual('', response.json['body'])
+        self.assertEqual({'x-checksum': 'abc'}, response.json['trailers'])
+
+    def test_close(self):
+        self._send(self._request('GET'))
+        conn = self.pool.find(self.origin.address, 'localhost')
+
+        self.pool.close()
+
+        conn.thread.join(5)
+        self.assertFalse(conn.thread.is_alive())
+        self.assertFalse(conn.server_conn.connected())
+        self.assertEqual({}, self.pool.connections)
+        self.assertIsNone(self.pool.get(self.origin.address, 'localhost'))
+
+    def test_closed_connection_evicted(self):
+        self._send(self._request('GET'))
+        conn = self.pool.find(self.origin.address, 'localhost')
+
+        self.origin.close_connections()
+
+        conn.thread.join(5)
+        self.assertFalse(conn.thread.is_alive())
+        self.assertEqual({}, self.pool.connections)
+        # A new connection is made for the next request
+        self.assertEqual(200, self._send(self._request('GET')).status_code)
+        self.assertEqual(2, self.origin.accepted)
+
+    def test_http1_only(self):
+        origin = Http2Origin(alpn=('http/1.1',))
+        self.addCleanup(origin.shutdown)
+
+        self.assertIsNone(self.pool.get(origin.address, 'localhost'))
+        self.assertIsNone(self.pool.get(origin.address, 'localhost'))
+        # Remembered, so the second request didn't try to connect
+        self.assertEqual(1, origin.accepted)
+
+        key = (tuple(origin.address), 'localhost')
+        self.pool.http1_only[key] = time.monotonic() - 1
+        self.assertIsNone(self.pool.get(origin.address, 'localhost'))
+        self.assertEqual(2, origin.accepted)
+
+    def _request(self, method, content=b''):
+        return http.HTTPRequest.make(
+            method, 'https://{}:{}/'.format(*self.origin.address), content, {'host': 'localhost'}
+        )
+
+    def _send(self, request):
+        conn = self.pool.get(self.origin.address, 'localhost')
+        stream = conn.send_request_headers(request)
+        stream.send_body([request.content])
+
+        result = {}
+
+        def read():
+            result['response'] = stream.read_response_headers()
+            result['body'] = b''.join(stream.read_response_body())
+
+        thread = threading.Thread(target=read, daemon=True)
+        thread.start()
+        thread.join(5)
+        self.assertFalse(thread.is_alive(), 'Timed out waiting for the response')
+
+        response = result['response']
+        response.json = json.loads(result['body'])
+        return response
@@ -3,6 +3,7 @@ from unittest import TestCase
 from unittest.mock import Mock, patch
 
 from seleniumwire.inspect import InspectRequestsMixin, TimeoutException
+from seleniumwire.request import Request
 
 
 class Driver(InspectRequestsMixin):
@@ -70,6 +71,41 @@ class InspectRequestsMixinTest(TestCase):
         self.assertTrue(self.mock_backend.storage.find.call_count > 0)
         self.assertTrue(self.mock_backend.storage.find.call_count <= 5)
 
+    def test_iter_ws_messages(self):
+        self.driver.iter_ws_messages('/socket', timeout=5)
+
+        self.mock_backend.ws_subscriptions.subscribe.assert_called_once_with(pat='/socket', timeout=5, maxsize=1000)
+
+    def test_iter_ws_messages_request(self):
+        request = Request(method='GET', url='wss://server/socket', headers=[])
+        request.id = '12345'
+
+        self.driver.iter_ws_messages(request)
+
+        self.mock_backend.ws_subscriptions.subscribe.assert_called_once_with(
+            request_id='12345', timeout=10, maxsize=1000
+        )
+
+    def test_on_ws_message(self):
+        callback = Mock()
+
+        self.driver.on_ws_message('/socket', callback)
+
+        self.mock_backend.ws_subscriptions.subscribe.assert_called_once_with(pat='/socket', callback=callback)
+
+    def test_proxy_stats(self):
+        self.mock_backend.stats.return_value = {'connections_accepted_total': 1}
+
+        stats = self.driver.proxy_stats()
+
+        self.assertEqual({'connections_accepted_total': 1}, stats)
+        self.mock_backend.stats.assert_called_once_with()
+
+    def test_prefetch_dns(self):
+        self.driver.prefetch_dns(['example.com'])
+
+        self.mock_backend.prefetch_dns.assert_called_once_with(['example.com'])
+
     @patch('seleniumwire.inspect.har')
     def test_har(self, mock_har):
         self.mock_backend.storage.load_har_entries.return_value = [
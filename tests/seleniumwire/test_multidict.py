@@ -0,0 +1,208 @@
+import copy
+import random
+from unittest import TestCase
+
+from seleniumwire.thirdparty.mitmproxy.coretypes.multidict import MultiDict, _MultiDict
+from seleniumwire.thirdparty.mitmproxy.net.http.cookies import CookieAttrs
+from seleniumwire.thirdparty.mitmproxy.net.http.headers import Headers
+
+
+class _CaseInsensitive(MultiDict):
+    @staticmethod
+    def _kconv(key):
+        return key.lower()
+
+
+class _Reference(_MultiDict):
+    """The multidict as it was before the index, which rebuilds a tuple of
+    all the fields on every change.
+    """
+
+    def __init__(self, fields=()):
+        self.fields = tuple(fields)
+
+    @staticmethod
+    def _reduce_values(values):
+        return values[0]
+
+    @staticmethod
+    def _kconv(key):
+        return key.lower()
+
+
+class MultiDictTest(TestCase):
+    def test_set_all_shrink(self):
+        md = MultiDict([('a', 1), ('b', 2), ('a', 3), ('a', 4)])
+
+        md.set_all('a', [5])
+
+        self.assertEqual((('a', 5), ('b', 2)), md.fields)
+        self.assertEqual([5], md.get_all('a'))
+
+    def test_set_all_grow(self):
+        md = MultiDict([('a', 1), ('b', 2)])
+
+        md.set_all('a', [3, 4, 5])
+
+        self.assertEqual((('a', 3), ('b', 2), ('a', 4), ('a', 5)), md.fields)
+        self.assertEqual([3, 4, 5], md.get_all('a'))
+
+    def test_set_all_empty(self):
+        md = MultiDict([('a', 1), ('b', 2)])
+
+        md.set_all('a', [])
+
+        self.assertEqual((('b', 2),), md.fields)
+        self.assertNotIn('a', md)
+        self.assertEqual(1, len(md))
+
+    def test_insert(self):
+        md = MultiDict([('a', 1), ('b', 2)])
+
+        md.insert(1, 'c', 3)
+        md.insert(0, 'a', 4)
+
+        self.assertEqual((('a', 4), ('a', 1), ('c', 3), ('b', 2)), md.fields)
+        self.assertEqual([4, 1], md.get_all('a'))
+
+    def test_insert_after_deletions(self):
+        md = MultiDict([('a', 1), ('b', 2), ('c', 3), ('d', 4)])
+        md.get_all('a')  # build the index
+        del md['b']
+
+        md.insert(1, 'e', 5)
+        md.insert(10, 'f', 6)
+
+        self.assertEqual((('a', 1), ('e', 5), ('c', 3), ('d', 4), ('f', 6)), md.fields)
+        self.assertEqual([3], md.get_all('c'))
+        self.assertEqual([6], md.get_all('f'))
+
+    def test_add_after_deletions(self):
+        md = MultiDict([('a', 1), ('b', 2)])
+        del md['a']
+
+        md.add('a', 3)
+
+        self.assertEqual((('b', 2), ('a', 3)), md.fields)
+        self.assertEqual([3], md.get_all('a'))
+
+    def test_delete_compacts(self):
+        md = MultiDict([(str(i), i) for i in range(12)])
+
+        for i in range(8):
+            del md[str(i)]
+        self.assertEqual(8, md._deleted)
+
+        # More than 8 deleted and over half the list, so compacted
+        del md['8']
+
+        self.assertEqual(0, md._deleted)
+        self.assertEqual([('9', 9), ('10', 10), ('11', 11)], md._fields)
+        self.assertEqual((('9', 9), ('10', 10), ('11', 11)), md.fields)
+        self.assertEqual([11], md.get_all('11'))
+        md.add('12', 12)
+        self.assertEqual((('9', 9), ('10', 10), ('11', 11), ('12', 12)), md.fields)
+
+    def test_delete_missing(self):
+        md = MultiDict([('a', 1)])
+
+        with self.assertRaises(KeyError):
+            del md['b']
+
+    def test_case_insensitive(self):
+        md = _CaseInsensitive([('Content-Type', 1), ('content-type', 2), ('Host', 3)])
+
+        self.assertIn('CONTENT-TYPE', md)
+        self.assertEqual([1, 2], md.get_all('Content-type'))
+        self.assertEqual(2, len(md))
+        self.assertEqual(['Content-Type', 'Host'], list(md))
+
+        md.set_all('CONTENT-TYPE', [4])
+
+        # The existing field keeps its name
+        self.assertEqual((('Content-Type', 4), ('Host', 3)), md.fields)
+
+    def test_headers(self):
+        headers = Headers(host='example.com')
+        headers.add('Set-Cookie', 'a=1')
+        headers.add('set-cookie', 'b=2')
+
+        self.assertIn('SET-COOKIE', headers)
+        self.assertEqual(['a=1', 'b=2'], headers.get_all('Set-Cookie'))
+        self.assertEqual(2, len(headers))
+
+        del headers['Set-Cookie']
+
+        self.assertEqual(b'host: example.com\r\n', bytes(headers))
+
+    def test_cookie_attrs(self):
+        attrs = CookieAttrs([('Path', '/'), ('path', '/foo')])
+
+        self.assertEqual('/foo', attrs['PATH'])
+        self.assertEqual(1, len(attrs))
+
+    def test_copy_independent(self):
+        md = MultiDict([('a', 1), ('b', 2)])
+
+        for copied in (md.copy(), copy.copy(md)):
+            copied['a'] = 3
+            copied.add('c', 4)
+            del copied['b']
+
+            self.assertEqual((('a', 1), ('b', 2)), md.fields)
+            self.assertEqual([1], md.get_all('a'))
+
+    def test_fields_wire_order(self):
+        md = MultiDict([('a', 1), ('b', 2), ('a', 3)])
+
+        md['b'] = 4
+        md.add('c', 5)
+        md.set_all('a', [6])
+        md.insert(0, 'd', 7)
+
+        self.assertEqual((('d', 7), ('a', 6), ('b', 4), ('c', 5)), md.fields)
+        self.assertIsInstance(md.fields, tuple)
+
+    def test_fields_cached(self):
+        md = MultiDict([('a', 1)])
+
+        self.assertIs(md.fields, md.fields)
+        fields = md.fields
+        md.add('b', 2)
+        self.assertIsNot(fields, md.fields)
+
+    def test_matches_reference(self):
+        rnd = random.Random(0)
+        keys = ['a', 'A', 'b', 'B', 'c', 'd']
+
+        for _ in range(200):
+            fields = [(rnd.choice(keys), rnd.randrange(100)) for _ in range(rnd.randrange(12))]
+            md = _CaseInsensitive(fields)
+            ref = _Reference(fields)
+
+            for _ in range(40):
+                op = rnd.randrange(5)
+                key = rnd.choice(keys)
+                if op == 0:
+                    values = [rnd.randrange(100) for _ in range(rnd.randrange(4))]
+                    md.set_all(key, list(values))
+                    ref.set_all(key, list(values))
+                elif op == 1:
+                    index = rnd.randrange(len(ref.fields) + 2)
+                    md.insert(index, key, 1)
+                    ref.insert(index, key, 1)
+                elif op == 2:
+                    md.add(key, 2)
+                    ref.add(key, 2)
+                elif op == 3 and key in ref:
+                    del md[key]
+                    del ref[key]
+                elif op == 4:
+                    md[key] = 3
+                    ref[key] = 3
+
+                self.assertEqual(ref.fields, md.fields)
+                self.assertEqual(len(ref), len(md))
+                for k in keys:
+                    self.assertEqual(ref.get_all(k), md.get_all(k))
+                    self.assertEqual(k in ref, k in md)
@@ -1,8 +1,13 @@
 import functools
+import logging
+import socket
 from unittest import TestCase
-from unittest.mock import call, patch
+from unittest.mock import Mock, call, patch
+from urllib.request import ProxyHandler, build_opener
 
-from seleniumwire.server import MitmProxy
+from seleniumwire.server import MitmProxy, ScopePassthrough, SendToLogger
+from seleniumwire.thirdparty.mitmproxy.log import LogEntry
+from seleniumwire.thirdparty.mitmproxy.metrics import Metrics
 
 
 class MitmProxyTest(TestCase):
@@ -14,6 +19,10 @@ class MitmProxyTest(TestCase):
         listen_port=12345,
         ssl_insecure=True,
         stream_websockets=True,
+        websocket_message_history=1,
+        http2_upstream=False,
+        block_hosts=[],
+        listen_backlog=None,
         suppress_connection_errors=True,
     )
 
@@ -27,7 +36,9 @@ class MitmProxyTest(TestCase):
         )
 
         self.assertEqual(self.mock_storage.create.return_value, proxy.storage)
-        self.mock_storage.create.assert_called_once_with(memory_only=False, base_dir='/some/dir', maxsize=None)
+        self.mock_storage.create.assert_called_once_with(
+            memory_only=False, base_dir='/some/dir', maxsize=None, ws_max_messages=None, ws_max_bytes=None
+        )
 
     def test_creates_in_memory_storage(self):
         proxy = MitmProxy(
@@ -37,7 +48,9 @@ class MitmProxyTest(TestCase):
         )
 
         self.assertEqual(self.mock_storage.create.return_value, proxy.storage)
-        self.mock_storage.create.assert_called_once_with(memory_only=True, base_dir='/some/dir', maxsize=10)
+        self.mock_storage.create.assert_called_once_with(
+            memory_only=True, base_dir='/some/dir', maxsize=10, ws_max_messages=None, ws_max_bytes=None
+        )
 
     def test_extracts_cert(self):
         self.mock_storage.create.return_value.home_dir = '/some/dir/.seleniumwire'
@@ -82,6 +95,7 @@ class MitmProxyTest(TestCase):
             [call(), call(self.mock_logger.return_value), call(self.mock_handler.return_value)]
         )
         self.mock_addons.default_addons.assert_called_once_with()
+        self.assertEqual(self.mock_logger.return_value.enabled, self.mock_master.return_value.log.level_filter)
         self.mock_handler.assert_called_once_with(proxy)
         self.mock_get_upstream_proxy.assert_called_once_with(
             {
@@ -152,6 +166,39 @@ class MitmProxyTest(TestCase):
         self.mock_master.return_value.shutdown.assert_called_once_with()
         self.mock_storage.create.return_value.cleanup.assert_called_once_with()
 
+    def test_stats(self):
+        self.mock_master.return_value.metrics = Metrics()
+        proxy = MitmProxy('somehost', 12345, {})
+
+        stats = proxy.stats()
+
+        self.assertEqual(0, stats['connections_accepted_total'])
+        self.assertEqual(0, stats['storage_write_seconds']['count'])
+
+    def test_metrics_server(self):
+        self.mock_master.return_value.metrics = Metrics()
+        proxy = MitmProxy('127.0.0.1', 12345, {'metrics_port': 0})
+        proxy.metrics.connections_accepted.inc()
+        proxy.metrics.storage_write.observe(0.002)
+
+        try:
+            host, port = proxy._metrics_server.server_address[:2]
+            # Bypass any proxy configured in the environment
+            opener = build_opener(ProxyHandler({}))
+            with opener.open('http://{}:{}/metrics'.format(host, port)) as response:
+                body = response.read().decode('utf-8')
+        finally:
+            proxy.shutdown()
+
+        self.assertIn('seleniumwire_connections_accepted_total 1\n', body)
+        self.assertIn('seleniumwire_storage_write_seconds_bucket{le="0.0025"} 1\n', body)
+        self.assertIn('seleniumwire_storage_write_seconds_count 1\n', body)
+
+    def test_no_metrics_server(self):
+        proxy = MitmProxy('somehost', 12345, {})
+
+        self.assertIsNone(proxy._metrics_server)
+
     def test_verify_ssl(self):
         MitmProxy('somehost', 12345, {'verify_ssl': True})
 
@@ -163,6 +210,97 @@ class MitmProxyTest(TestCase):
             ]
         )
 
+    def test_http2_upstream(self):
+        MitmProxy('somehost', 12345, {'http2_upstream': True})
+
+        self.mock_options.return_value.update.assert_has_calls(
+            [
+                self.base_options_update(
+                    http2_upstream=True,
+                ),
+            ]
+        )
+
+    def test_block_hosts(self):
+        MitmProxy('somehost', 12345, {'block_hosts': ['example.com']})
+
+        self.mock_options.return_value.update.assert_has_calls(
+            [
+                self.base_options_update(
+                    block_hosts=['example.com'],
+                ),
+            ]
+        )
+
+    def test_listen_backlog(self):
+        MitmProxy('somehost', 12345, {'listen_backlog': 1024})
+
+        self.mock_options.return_value.update.assert_has_calls(
+            [
+                self.base_options_update(
+                    listen_backlog=1024,
+                ),
+            ]
+        )
+
+    def test_socket_options(self):
+        MitmProxy('somehost', 12345, {'socket_options': {'nodelay': False, 'keepalive_idle': 60}})
+
+        self.mock_options.return_value.update.assert_has_calls(
+            [
+                self.base_options_update(
+                    tcp_nodelay=False,
+                    tcp_keepalive_idle=60,
+                ),
+            ]
+        )
+
+    def test_dns_options(self):
+        MitmProxy('somehost', 12345, {'dns_cache_ttl': 0, 'dns_overrides': {'example.com': '10.0.0.5'}})
+
+        self.mock_options.return_value.update.assert_has_calls(
+            [
+                self.base_options_update(
+                    dns_cache_ttl=0,
+                    dns_overrides=['example.com=10.0.0.5'],
+                ),
+            ]
+        )
+
+    def test_prefetch_dns(self):
+        proxy = MitmProxy('somehost', 12345, {})
+
+        proxy.prefetch_dns(['example.com'])
+
+        self.mock_master.return_value.server.config.resolver.prefetch.assert_called_once_with(['example.com'])
+
+    def test_passthrough_hosts(self):
+        MitmProxy('somehost', 12345, {'passthrough_hosts': ['example.com'], 'mitm_ignore_hosts': ['other']})
+
+        self.mock_options.return_value.update.assert_has_calls(
+            [
+                self.base_options_update(
+                    ignore_hosts=[r'(^|\.)example\.com:\d+$', 'other'],
+                ),
+            ]
+        )
+
+    def test_check_passthrough(self):
+        proxy = MitmProxy('somehost', 12345, {})
+
+        self.assertIs(proxy.passthrough, self.mock_proxy_server.return_value.config.check_passthrough)
+
+    def test_scopes_update_passthrough(self):
+        proxy = MitmProxy('somehost', 12345, {})
+
+        proxy.scopes = [r'^https://example\.com/']
+
+        self.assertIsNotNone(proxy.passthrough.hosts)
+
+        proxy.scopes = []
+
+        self.assertIsNone(proxy.passthrough.hosts)
+
     def setUp(self):
         patcher = patch('seleniumwire.server.storage')
         self.mock_storage = patcher.start()
@@ -213,3 +351,76 @@ class MitmProxyTest(TestCase):
         self.mock_build_proxy_args = patcher.start()
         self.addCleanup(patcher.stop)
         self.mock_build_proxy_args.return_value = {}
+
+
+class SendToLoggerTest(TestCase):
+    def setUp(self):
+        self.send_to_logger = SendToLogger()
+
+    @patch('seleniumwire.server.logger')
+    def test_log(self, mock_logger):
+        self.send_to_logger.log(LogEntry('test message', 'warn'))
+
+        mock_logger.log.assert_called_once_with(logging.WARNING, 'test message')
+
+    @patch('seleniumwire.server.logger')
+    def test_enabled(self, mock_logger):
+        mock_logger.isEnabledFor.side_effect = lambda level: level >= logging.INFO
+
+        self.assertTrue(self.send_to_logger.enabled('info'))
+        self.assertTrue(self.send_to_logger.enabled('alert'))
+        self.assertFalse(self.send_to_logger.enabled('debug'))
+
+
+class ScopePassthroughTest(TestCase):
+    def setUp(self):
+        self.proxy = Mock()
+        self.proxy.master.options.mode = 'regular'
+        self.proxy.modifier.is_active.return_value = False
+        self.passthrough = ScopePassthrough(self.proxy)
+
+    def test_no_scopes(self):
+        self.passthrough.update([])
+
+        self.assertFalse(self.passthrough)
+
+    def test_unanchored_scopes(self):
+        self.passthrough.update([r'^https://example\.com/', '.*foo.*'])
+
+        self.assertFalse(self.passthrough)
+
+    def test_out_of_scope(self):
+        self.passthrough.update([r'^https://example\.com/'])
+
+        self.assertTrue(self.passthrough)
+        self.assertTrue(self.passthrough(('other.com', 443), Mock()))
+        self.assertFalse(self.passthrough(('example.com', 443), Mock()))
+
+    def test_disabled(self):
+        passthrough = ScopePassthrough(self.proxy, enabled=False)
+        passthrough.update([r'^https://example\.com/'])
+
+        self.assertFalse(passthrough)
+
+    def test_modifier_active(self):
+        self.passthrough.update([r'^https://example\.com/'])
+        self.proxy.modifier.is_active.return_value = True
+
+        self.assertFalse(self.passthrough)
+
+    def test_upstream_mode(self):
+        self.passthrough.update([r'^https://example\.com/'])
+        self.proxy.master.options.mode = 'upstream:http://proxyserver:8080'
+
+        self.assertFalse(self.passthrough)
+
+    def test_closes_connections_now_in_scope(self):
+        self.passthrough.update([r'^https://example\.com/'])
+        client_conn, other_conn = Mock(), Mock()
+        self.passthrough(('other.com', 443), client_conn)
+        self.passthrough(('another.com', 443), other_conn)
+
+        self.passthrough.update([r'^https://example\.com/', r'^https://other\.com/'])
+
+        client_conn.connection.shutdown.assert_called_once_with(socket.SHUT_RDWR)
+        other_conn.connection.shutdown.assert_not_called()
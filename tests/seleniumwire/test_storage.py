@@ -259,6 +259,43 @@ class RequestStorageTest(TestCase):
         self.assertEqual('websocket test message', requests[0].ws_messages[0].content)
         self.assertTrue(len(requests[1].ws_messages) == 0)
 
+    def test_load_request_with_ws_messages_max_messages(self):
+        self.storage = RequestStorage(base_dir=self.base_dir, ws_max_messages=3)
+        request = self._create_request()
+        self.storage.save_request(request)
+
+        for i in range(10):
+            self.storage.save_ws_message(
+                request.id, WebSocketMessage(from_client=True, content=str(i), date=datetime.now())
+            )
+
+        ws_messages = self.storage.load_requests()[0].ws_messages
+
+        self.assertEqual(['7', '8', '9'], [m.content for m in ws_messages])
+
+    def test_load_request_with_ws_messages_max_bytes(self):
+        self.storage = RequestStorage(base_dir=self.base_dir, ws_max_bytes=10)
+        request = self._create_request()
+        self.storage.save_request(request)
+
+        for i in range(10):
+            self.storage.save_ws_message(
+                request.id, WebSocketMessage(from_client=False, content=b'12345', date=datetime.now())
+            )
+
+        ws_messages = self.storage.load_requests()[0].ws_messages
+
+        self.assertEqual(2, len(ws_messages))
+
+    def test_ws_messages_not_held_in_memory(self):
+        request = self._create_request()
+        self.storage.save_request(request)
+        self.storage.save_ws_message(
+            request.id, WebSocketMessage(from_client=True, content='websocket test message', date=datetime.now())
+        )
+
+        self.assertTrue(self._get_stored_path(request.id, 'ws_messages'))
+
     def test_load_request_cert_data(self):
         request = self._create_request()
         self.storage.save_request(request)
@@ -479,6 +516,34 @@ class InMemoryRequestStorageTest(TestCase):
         self.assertEqual('websocket test message', requests[0].ws_messages[0].content)
         self.assertTrue(len(requests[1].ws_messages) == 0)
 
+    def test_save_ws_message_max_messages(self):
+        self.storage = InMemoryRequestStorage(ws_max_messages=3)
+        request = self._create_request()
+        self.storage.save_request(request)
+
+        for i in range(10):
+            self.storage.save_ws_message(
+                request.id, WebSocketMessage(from_client=True, content=str(i), date=datetime.now())
+            )
+
+        ws_messages = self.storage.load_requests()[0].ws_messages
+
+        self.assertEqual(['7', '8', '9'], [m.content for m in ws_messages])
+
+    def test_save_ws_message_max_bytes(self):
+        self.storage = InMemoryRequestStorage(ws_max_bytes=10)
+        request = self._create_request()
+        self.storage.save_request(request)
+
+        for i in range(10):
+            self.storage.save_ws_message(
+                request.id, WebSocketMessage(from_client=False, content=b'12345', date=datetime.now())
+            )
+
+        ws_messages = self.storage.load_requests()[0].ws_messages
+
+        self.assertEqual(2, len(ws_messages))
+
     def test_clear_requests(self):
         request_1 = self._create_request()
         request_2 = self._create_request()
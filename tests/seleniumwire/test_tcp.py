@@ -0,0 +1,273 @@
+import io
+import select
+import socket
+import threading
+import time
+from unittest import TestCase
+from unittest.mock import Mock, patch
+
+from OpenSSL import SSL
+
+from seleniumwire.thirdparty.mitmproxy import exceptions
+from seleniumwire.thirdparty.mitmproxy.net import tcp
+
+
+class _PartialSocket:
+    """Sends at most a few bytes per sendmsg() call, as a full socket buffer would."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.calls = []
+        self.data = b''
+
+    def sendmsg(self, buffers):
+        self.calls.append(len(buffers))
+        sent = b''.join(bytes(b) for b in buffers)[: self.limit]
+        self.data += sent
+        return len(sent)
+
+
+class SendmsgAllTest(TestCase):
+    def test_partial_sends_resent(self):
+        for limit in (1, 3, 5, 7, 100):
+            with self.subTest(limit=limit):
+                sock = _PartialSocket(limit)
+
+                tcp._sendmsg_all(sock, [b'hello', b' ', b'big', b' world'])
+
+                self.assertEqual(b'hello big world', sock.data)
+
+    def test_iov_max(self):
+        sock = _PartialSocket(1000000)
+        buffers = [b'x'] * (tcp.IOV_MAX + 5)
+
+        tcp._sendmsg_all(sock, buffers)
+
+        self.assertEqual([tcp.IOV_MAX, 5], sock.calls)
+        self.assertEqual(b''.join(buffers), sock.data)
+
+
+class WriterTest(TestCase):
+    def test_writev_socket(self):
+        client, server = socket.socketpair()
+        self.addCleanup(client.close)
+        self.addCleanup(server.close)
+        writer = tcp.Writer(socket.SocketIO(client, 'wb'))
+        writer.counter = Mock()
+        # More than the socket buffers hold, so sendmsg() only sends part of it
+        buffers = [b'head', bytes(range(256)) * 4096, b'', b'tail' * 1000]
+        expected = b''.join(buffers)
+        received = []
+
+        def receive():
+            size = 0
+            while size < len(expected):
+                data = server.recv(65536)
+                if not data:
+                    break
+                received.append(data)
+                size += len(data)
+
+        thread = threading.Thread(target=receive)
+        thread.start()
+        writer.writev(buffers)
+        thread.join(5)
+
+        self.assertEqual(expected, b''.join(received))
+        writer.counter.inc.assert_called_once_with(len(expected))
+
+    def test_writev_coalesces_without_sendmsg(self):
+        o = Mock(spec=['write'])
+        o.write.side_effect = len
+        writer = tcp.Writer(o)
+
+        writer.writev([b'a' * 10, b'b' * 10, b'c' * tcp.Writer.COALESCE_SIZE, b'd'])
+
+        self.assertEqual(
+            [b'a' * 10 + b'b' * 10, b'c' * tcp.Writer.COALESCE_SIZE, b'd'],
+            [c[0][0] for c in o.write.call_args_list],
+        )
+
+    def test_writev_disconnect(self):
+        client, server = socket.socketpair()
+        self.addCleanup(client.close)
+        server.close()
+        writer = tcp.Writer(socket.SocketIO(client, 'wb'))
+
+        with self.assertRaises(exceptions.TcpDisconnect):
+            writer.writev([b'x' * 65536] * 100)
+
+    def test_writev_log(self):
+        writer = tcp.Writer(io.BytesIO())
+        writer.start_log()
+
+        writer.writev([b'a', b'', b'b'])
+
+        self.assertEqual(b'ab', writer.get_log())
+
+
+class ReaderTest(TestCase):
+    def setUp(self):
+        self.client, server = socket.socketpair()
+        self.addCleanup(self.client.close)
+        self.addCleanup(server.close)
+        self.rfile = tcp.Reader(socket.SocketIO(server, 'rb'))
+
+    def test_read_available(self):
+        self.client.sendall(b'hello')
+
+        # Returns what has arrived rather than waiting for the rest
+        self.assertEqual(b'hello', self.rfile.read_available(1024))
+        self.client.sendall(b'hello world')
+        self.assertEqual(b'hello', self.rfile.read_available(5))
+        self.assertEqual(b' world', self.rfile.read_available(1024))
+
+    def test_read_available_closed(self):
+        self.client.close()
+
+        self.assertEqual(b'', self.rfile.read_available(1024))
+
+
+class WaitForSocketTest(TestCase):
+    def setUp(self):
+        self.client, self.server = socket.socketpair()
+        self.addCleanup(self.client.close)
+        self.addCleanup(self.server.close)
+
+    def test_read(self):
+        start = time.monotonic()
+        self.assertFalse(tcp.wait_for_socket(self.server, False, 0.1))
+        self.assertGreaterEqual(time.monotonic() - start, 0.05)
+
+        self.client.sendall(b'x')
+
+        self.assertTrue(tcp.wait_for_socket(self.server, False, 5))
+
+    def test_write(self):
+        self.assertTrue(tcp.wait_for_socket(self.server, True, 5))
+
+    def test_wakes_when_data_arrives(self):
+        threading.Timer(0.1, self.client.sendall, args=(b'x',)).start()
+        start = time.monotonic()
+
+        self.assertTrue(tcp.wait_for_socket(self.server, False, None))
+        self.assertLess(time.monotonic() - start, 5)
+
+    def test_without_poll(self):
+        with patch('seleniumwire.thirdparty.mitmproxy.net.tcp.select', Mock(spec=['select'], select=select.select)):
+            self.assertFalse(tcp.wait_for_socket(self.server, False, 0.01))
+            self.assertTrue(tcp.wait_for_socket(self.server, True, 5))
+            self.client.sendall(b'x')
+            self.assertTrue(tcp.wait_for_socket(self.server, False, 5))
+
+
+class TlsRetryTest(TestCase):
+    def setUp(self):
+        self.conn = Mock(spec=SSL.Connection)
+        self.conn.gettimeout = Mock(return_value=5)
+        self.conn.pending.return_value = 0
+        patcher = patch('seleniumwire.thirdparty.mitmproxy.net.tcp.wait_for_socket', return_value=True)
+        self.wait_for_socket = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.rfile = tcp.Reader(self.conn)
+
+    def test_peek_waits_and_retries(self):
+        self.conn.recv.side_effect = [SSL.WantReadError(), SSL.WantWriteError(), b'data']
+
+        self.assertEqual(b'data', self.rfile.peek(4))
+
+        self.assertEqual(3, self.conn.recv.call_count)
+        self.assertEqual(
+            [((self.conn, False, 5),), ((self.conn, True, 5),)],
+            [c[:1] for c in self.wait_for_socket.call_args_list],
+        )
+
+    def test_peek_timeout(self):
+        self.conn.recv.side_effect = SSL.WantReadError()
+        self.wait_for_socket.return_value = False
+
+        with self.assertRaises(exceptions.TlsException):
+            self.rfile.peek(4)
+
+        self.assertEqual(1, self.conn.recv.call_count)
+
+    def test_read_waits_and_retries(self):
+        self.conn.read.side_effect = [SSL.WantReadError(), b'data']
+
+        self.assertEqual(b'data', self.rfile.read(4))
+
+        self.assertEqual(self.conn, self.wait_for_socket.call_args[0][0])
+        self.assertFalse(self.wait_for_socket.call_args[0][1])
+
+    def test_read_timeout(self):
+        self.conn.read.side_effect = SSL.WantReadError()
+        self.wait_for_socket.return_value = False
+
+        with self.assertRaises(exceptions.TcpTimeout):
+            self.rfile.read(4)
+
+
+class _Server(tcp.TCPServer):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.handled = []
+        self.timeouts = []
+        self.lock = threading.Lock()
+
+    def handle_client_connection(self, conn, client_address):
+        with self.lock:
+            self.handled.append(client_address)
+            self.timeouts.append(conn.gettimeout())
+        conn.sendall(b'hello')
+
+
+class TCPServerTest(TestCase):
+    def setUp(self):
+        self.server = _Server(('127.0.0.1', 0))
+
+    def test_accept_burst(self):
+        clients = [socket.create_connection(self.server.address[:2]) for _ in range(20)]
+        for client in clients:
+            self.addCleanup(client.close)
+
+        # A single wakeup takes every connection in the backlog, then returns
+        self.server._accept_pending()
+
+        for client in clients:
+            client.settimeout(5)
+            self.assertEqual(b'hello', client.recv(5))
+        self.assertEqual(20, len(self.server.handled))
+        # Handled in blocking mode, whatever the listening socket's
+        self.assertEqual({socket.getdefaulttimeout()}, set(self.server.timeouts))
+        self.server.socket.close()
+
+    def test_serve_and_shutdown(self):
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.start()
+
+        with socket.create_connection(self.server.address[:2], timeout=5) as client:
+            self.assertEqual(b'hello', client.recv(5))
+
+        start = time.monotonic()
+        self.server.shutdown()
+        thread.join(5)
+
+        # Woken at once, although serve_forever() doesn't poll
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertFalse(thread.is_alive())
+        with self.assertRaises(OSError):
+            socket.create_connection(self.server.address[:2], timeout=1)
+
+    def test_handler_error(self):
+        self.server.handle_client_connection = Mock(side_effect=ValueError('broken'))
+        self.server.handle_error = Mock()
+        client = socket.create_connection(self.server.address[:2])
+        self.addCleanup(client.close)
+
+        self.server._accept_pending()
+        client.settimeout(5)
+
+        # The connection is closed once the error has been handled
+        self.assertEqual(b'', client.recv(5))
+        self.server.handle_error.assert_called_once()
+        self.server.socket.close()
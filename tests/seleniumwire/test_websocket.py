@@ -0,0 +1,188 @@
+import queue
+import socket
+import threading
+import time
+from datetime import datetime
+from unittest import TestCase
+from unittest.mock import Mock
+
+from seleniumwire.request import WebSocketMessage
+from seleniumwire.thirdparty.mitmproxy import http
+from seleniumwire.thirdparty.mitmproxy.net import tcp
+from seleniumwire.thirdparty.mitmproxy.server.protocol.websocket import WebSocketLayer
+from seleniumwire.websocket import SubscriptionClosed, TimeoutException, WebSocketSubscriptions
+
+
+class WebSocketSubscriptionsTest(TestCase):
+    def setUp(self):
+        self.subscriptions = WebSocketSubscriptions()
+
+    def test_iterate_messages(self):
+        subscription = self.subscriptions.subscribe(pat='/socket', timeout=1)
+        self.subscriptions.publish('1', 'wss://server/socket', self._message('hello'))
+        self.subscriptions.publish('1', 'wss://server/socket', self._message('world'))
+
+        self.assertEqual('hello', next(subscription).content)
+        self.assertEqual('world', next(subscription).content)
+
+    def test_pattern_not_matched(self):
+        subscription = self.subscriptions.subscribe(pat='/other', timeout=0.1)
+        self.subscriptions.publish('1', 'wss://server/socket', self._message('hello'))
+
+        with self.assertRaises(TimeoutException):
+            next(subscription)
+
+    def test_request_id(self):
+        subscription = self.subscriptions.subscribe(request_id='2', timeout=1)
+        self.subscriptions.publish('1', 'wss://server/socket', self._message('hello'))
+        self.subscriptions.publish('2', 'wss://server/socket', self._message('world'))
+
+        self.assertEqual('world', next(subscription).content)
+
+    def test_callback(self):
+        messages = queue.Queue()
+        self.subscriptions.subscribe(pat=None, callback=messages.put)
+        self.subscriptions.publish('1', 'wss://server/socket', self._message('hello'))
+
+        self.assertEqual('hello', messages.get(timeout=1).content)
+
+    def test_callback_error(self):
+        messages = queue.Queue()
+
+        def callback(message):
+            messages.put(message)
+            raise RuntimeError('oops')
+
+        self.subscriptions.subscribe(callback=callback)
+
+        self.subscriptions.publish('1', 'wss://server/socket', self._message('hello'))
+        self.subscriptions.publish('1', 'wss://server/socket', self._message('world'))
+
+        # The callback carries on being called after an error
+        self.assertEqual('hello', messages.get(timeout=1).content)
+        self.assertEqual('world', messages.get(timeout=1).content)
+
+    def test_slow_callback_does_not_block_publish(self):
+        release = threading.Event()
+        messages = queue.Queue()
+
+        def callback(message):
+            release.wait(5)
+            messages.put(message)
+
+        subscription = self.subscriptions.subscribe(callback=callback)
+
+        for content in ('hello', 'world'):
+            self.subscriptions.publish('1', 'wss://server/socket', self._message(content))
+
+        release.set()
+        self.assertEqual('hello', messages.get(timeout=1).content)
+        self.assertEqual('world', messages.get(timeout=1).content)
+        subscription.close()
+
+    def test_close(self):
+        with self.subscriptions.subscribe(timeout=1) as subscription:
+            self.subscriptions.publish('1', 'wss://server/socket', self._message('hello'))
+
+        self.subscriptions.publish('1', 'wss://server/socket', self._message('world'))
+
+        self.assertEqual(['hello'], [m.content for m in subscription])
+
+    def test_get_after_close(self):
+        subscription = self.subscriptions.subscribe(timeout=1)
+        self.subscriptions.publish('1', 'wss://server/socket', self._message('hello'))
+        subscription.close()
+
+        # Queued messages can still be read
+        self.assertEqual('hello', subscription.get(timeout=1).content)
+        with self.assertRaises(SubscriptionClosed):
+            subscription.get(timeout=1)
+        with self.assertRaises(StopIteration):
+            next(subscription)
+
+    def test_close_releases_waiting_consumer(self):
+        subscription = self.subscriptions.subscribe(timeout=None)
+        threading.Timer(0.1, self.subscriptions.close).start()
+
+        self.assertEqual([], list(subscription))
+
+    def test_full_queue_drops_oldest(self):
+        subscription = self.subscriptions.subscribe(timeout=0.1, maxsize=2)
+
+        for content in ('one', 'two', 'three'):
+            # Never waits for the consumer
+            self.subscriptions.publish('1', 'wss://server/socket', self._message(content))
+
+        self.assertEqual('two', next(subscription).content)
+        self.assertEqual('three', next(subscription).content)
+        self.assertEqual(1, subscription.dropped)
+
+    def _message(self, content):
+        return WebSocketMessage(from_client=False, content=content, date=datetime.now())
+
+
+class WebSocketLayerTest(TestCase):
+    def setUp(self):
+        self.client, client_conn = socket.socketpair()
+        self.server, server_conn = socket.socketpair()
+        for sock in (self.client, client_conn, self.server, server_conn):
+            self.addCleanup(sock.close)
+        self.ctx = Mock()
+        self.ctx.channel.should_exit = threading.Event()
+        self.ctx.client_conn = self._conn(client_conn)
+        self.ctx.server_conn = self._conn(server_conn)
+        handshake_flow = http.HTTPFlow(self.ctx.client_conn, self.ctx.server_conn)
+        handshake_flow.request = http.HTTPRequest.make(
+            'GET', 'http://example.com/socket', headers={'sec-websocket-key': 'dGhlIHNhbXBsZSBub25jZQ=='}
+        )
+        handshake_flow.response = http.HTTPResponse.make(101)
+        self.layer = WebSocketLayer(self.ctx, handshake_flow)
+        # Long enough that only a wakeup gets injected messages out in time
+        self.layer.EXIT_CHECK_INTERVAL = 30
+        self.thread = threading.Thread(target=self.layer, daemon=True)
+        self.thread.start()
+        deadline = time.monotonic() + 5
+        while (self.layer.flow is None or self.layer.flow._wakeup is None) and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def tearDown(self):
+        self.client.close()
+        self.thread.join(5)
+
+    def test_inject_message_wakes_layer(self):
+        self.client.settimeout(5)
+        start = time.monotonic()
+
+        self.layer.flow.inject_message(self.ctx.client_conn, 'hello')
+        data = self.client.recv(1024)
+
+        self.assertLess(time.monotonic() - start, 5)
+        # An unmasked, final text frame
+        self.assertEqual(b'\x81\x05hello', data)
+
+    def test_inject_message_to_server(self):
+        self.server.settimeout(5)
+
+        self.layer.flow.inject_message(self.ctx.server_conn, b'hello')
+        data = self.server.recv(1024)
+
+        # A masked, final binary frame
+        self.assertEqual(0x82, data[0])
+        self.assertEqual(0x80 | 5, data[1])
+
+    def test_inject_message_after_end(self):
+        flow = self.layer.flow
+
+        self.client.close()
+        self.thread.join(5)
+
+        self.assertTrue(flow.ended)
+        # The wakeup has been closed, which is ignored
+        flow.inject_message(self.ctx.client_conn, 'hello')
+
+    def _conn(self, sock):
+        conn = Mock()
+        conn.connection = sock
+        conn.rfile = tcp.Reader(socket.SocketIO(sock, 'rb'))
+        conn.send.side_effect = sock.sendall
+        return conn